@@ -0,0 +1,193 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from inicializacao import importacao_preguicosa
+from correspondencia import ComparadorRostos, DIMENSAO_CODIFICACAO
+from detectores_rosto import DetectorAdaptativo, criar_detector, para_quadro, TIPOS_DETECTOR
+from galeria import obter_galeria, PASTA_GALERIA
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+EXTENSOES_FOTO = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+DETECTOR_ROSTOS = 'hog'
+FRACAO_ROSTO_MINIMO = 0.15  # Fotos de cadastro: o rosto ocupa boa parte da altura
+LIMIAR_DUPLICADO = 0.4      # Abaixo disso (mais rígido que a tolerância de 0.6), provavelmente é a mesma pessoa
+CONSULTAS_POR_BLOCO = 1024  # Limita a matriz de distâncias da busca de duplicados
+
+# Motivos de rejeição
+ILEGIVEL = 'ilegivel'
+SEM_ROSTO = 'sem_rosto'
+VARIOS_ROSTOS = 'varios_rostos'
+
+# --- Estado de cada processo worker ---
+_detector_worker = None
+
+
+def listar_fotos_pasta(pasta):
+    """Fotos `<codigo>_<nome>.jpg` de uma pasta (o formato de `fotos_registro/`) -> [(codigo, nome, caminho)]."""
+    fotos, ignoradas = [], []
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in sorted(arquivos):
+            base, extensao = os.path.splitext(arquivo)
+            if extensao.lower() not in EXTENSOES_FOTO:
+                continue
+            codigo, _, nome = base.partition('_')
+            if not codigo or not nome:
+                ignoradas.append(arquivo)
+                continue
+            fotos.append((codigo, nome.replace('_', ' '), os.path.join(raiz, arquivo)))
+    if ignoradas:
+        print(f"[Cadastro] {len(ignoradas)} fotos ignoradas por não seguirem '<codigo>_<nome>': {', '.join(ignoradas[:5])}...")
+    return fotos
+
+
+def listar_fotos_csv(caminho_csv):
+    """Linhas `codigo,nome,photo_path` de um CSV; caminhos relativos partem da pasta do CSV."""
+    pasta = os.path.dirname(os.path.abspath(caminho_csv))
+    with open(caminho_csv, newline='', encoding='utf-8-sig') as f:
+        leitor = csv.DictReader(f)
+        faltando = {'codigo', 'nome', 'photo_path'} - set(leitor.fieldnames or [])
+        if faltando:
+            raise ValueError(f"O CSV '{caminho_csv}' precisa das colunas codigo,nome,photo_path (faltando: {', '.join(sorted(faltando))}).")
+        # Linhas curtas vêm com None nas colunas que faltam; sem nome, a pessoa fica com o código
+        return [(linha['codigo'].strip(), (linha['nome'] or '').strip() or linha['codigo'].strip(),
+                 os.path.join(pasta, linha['photo_path'].strip()))
+                for linha in leitor if linha['codigo'] and linha['photo_path']]
+
+
+def _inicializar_worker(tipo_detector):
+    global _detector_worker
+    import face_recognition  # Carrega os modelos do dlib uma única vez por worker
+    cv2.setNumThreads(1)
+    _detector_worker = DetectorAdaptativo(criar_detector(tipo_detector), FRACAO_ROSTO_MINIMO, retentar_a_cada=0)
+
+
+def codificar_foto(caminho):
+    """(codificação, None) do único rosto da foto, ou (None, motivo da rejeição). Roda no worker."""
+    import face_recognition
+    frame = cv2.imread(caminho)
+    if frame is None:
+        return None, ILEGIVEL
+    # Detecta na foto reduzida (retentando ampliada se não achar) e codifica na foto inteira
+    _, locations, escala = _detector_worker.detectar(frame, retentar=True)
+    if not locations:
+        return None, SEM_ROSTO
+    if len(locations) > 1:
+        return None, VARIOS_ROSTOS
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return face_recognition.face_encodings(rgb, [para_quadro(locations[0], escala)])[0], None
+
+
+def vizinho_de_outro_codigo(consultas, codigos_consultas, base, codigos_base):
+    """Para cada consulta, (índice, distância) da linha mais próxima de `base` com outro código."""
+    n = len(consultas)
+    indices, distancias = np.full(n, -1, dtype=np.intp), np.full(n, np.inf)
+    if n == 0 or len(base) == 0:
+        return indices, distancias
+    comparador = ComparadorRostos.de_codificacoes(base)
+    codigos_base = np.asarray(codigos_base, dtype=object)
+    for inicio in range(0, n, CONSULTAS_POR_BLOCO):
+        fim = min(n, inicio + CONSULTAS_POR_BLOCO)
+        bloco = comparador.distancias(consultas[inicio:fim])
+        bloco[codigos_base[None, :] == np.asarray(codigos_consultas[inicio:fim], dtype=object)[:, None]] = np.inf
+        melhores = np.argmin(bloco, axis=1)
+        indices[inicio:fim] = melhores
+        distancias[inicio:fim] = bloco[np.arange(fim - inicio), melhores]
+    return indices, distancias
+
+
+def cadastrar_lote(fotos, galeria, workers=None, tipo_detector=DETECTOR_ROSTOS, limiar_duplicado=LIMIAR_DUPLICADO,
+                   rejeitar_duplicados=False, simular=False):
+    """Codifica as fotos em paralelo, confere duplicados e grava tudo na galeria de uma vez.
+
+    `fotos` é uma lista de (codigo, nome, caminho). Fotos sem rosto, com mais de um rosto
+    ou ilegíveis são rejeitadas. Uma foto a menos de `limiar_duplicado` de uma pessoa com
+    outro código (na galeria ou, no próprio lote, as duas fotos do par) é marcada como
+    possível duplicado e, com `rejeitar_duplicados`, fica de fora. Várias fotos com o
+    mesmo código viram amostras da pessoa. Retorna uma lista de dicts, um por foto, com
+    'status' e o motivo/distância.
+    """
+    workers = workers or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker, initargs=(tipo_detector,)) as executor:
+        resultados = list(executor.map(codificar_foto, [caminho for _, _, caminho in fotos],
+                                       chunksize=max(1, min(16, len(fotos) // (4 * workers)))))
+    tempo_codificacao = time.perf_counter() - inicio
+
+    relatorio = []
+    aceitas, codificacoes = [], []
+    for (codigo, nome, caminho), (codificacao, motivo) in zip(fotos, resultados):
+        item = {'codigo': codigo, 'nome': nome, 'foto': caminho}
+        if motivo is not None:
+            item.update(status='rejeitada', motivo=motivo)
+        else:
+            item['status'] = 'aceita'
+            aceitas.append(item)
+            codificacoes.append(codificacao)
+        relatorio.append(item)
+
+    # Possíveis duplicados: contra a galeria (protótipos) e entre as fotos do próprio lote
+    consultas = np.asarray(codificacoes).reshape(-1, DIMENSAO_CODIFICACAO)
+    codigos = [item['codigo'] for item in aceitas]
+    na_galeria = vizinho_de_outro_codigo(consultas, codigos, galeria.codificacoes, galeria.codigos)
+    no_lote = vizinho_de_outro_codigo(consultas, codigos, consultas, codigos)
+    pessoas = {}
+    for i, item in enumerate(aceitas):
+        if na_galeria[1][i] < limiar_duplicado:
+            item['duplicado_de'] = galeria.codigos[na_galeria[0][i]]
+            item['distancia'] = round(float(na_galeria[1][i]), 4)
+        elif no_lote[1][i] < limiar_duplicado:
+            item['duplicado_de'] = codigos[no_lote[0][i]]
+            item['distancia'] = round(float(no_lote[1][i]), 4)
+        if 'duplicado_de' in item and rejeitar_duplicados:
+            item.update(status='rejeitada', motivo='duplicado')
+            continue
+        pessoas.setdefault(item['codigo'], (item['nome'], []))[1].append(codificacoes[i])
+
+    if pessoas and not simular:
+        galeria.adicionar_lote([(codigo, nome, lista) for codigo, (nome, lista) in pessoas.items()])
+    decorrido = time.perf_counter() - inicio
+
+    rejeitadas = {}
+    for item in relatorio:
+        if item['status'] == 'rejeitada':
+            rejeitadas[item['motivo']] = rejeitadas.get(item['motivo'], 0) + 1
+    duplicados = sum('duplicado_de' in item for item in relatorio)
+    print(f"[Cadastro] {len(fotos)} fotos em {decorrido:.1f}s ({len(fotos) / tempo_codificacao if tempo_codificacao > 0 else 0:.1f} fotos/s "
+          f"na codificação, {workers} processos).")
+    print(f"[Cadastro] {len(pessoas)} pessoas {'seriam gravadas' if simular else 'gravadas'}; "
+          f"rejeitadas: {json.dumps(rejeitadas) if rejeitadas else 'nenhuma'}; possíveis duplicados: {duplicados}.")
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Cadastra pessoas em lote a partir de uma pasta de fotos ou de um CSV.",
+        epilog="Ex.: python cadastro_lote.py funcionarios.csv --workers 8 --relatorio cadastro.jsonl")
+    parser.add_argument('entrada', help="Pasta com fotos '<codigo>_<nome>.jpg' ou CSV com as colunas codigo,nome,photo_path")
+    parser.add_argument('--galeria', default=PASTA_GALERIA)
+    parser.add_argument('--workers', type=int, default=None, help="Processos de codificação (padrão: nº de CPUs)")
+    parser.add_argument('--detector', choices=TIPOS_DETECTOR, default=DETECTOR_ROSTOS)
+    parser.add_argument('--limiar-duplicado', type=float, default=LIMIAR_DUPLICADO)
+    parser.add_argument('--rejeitar-duplicados', action='store_true', help="Não grava as fotos marcadas como possíveis duplicados")
+    parser.add_argument('--simular', action='store_true', help="Só codifica e confere; não grava na galeria")
+    parser.add_argument('--relatorio', help="Grava o resultado de cada foto em JSONL")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.entrada):
+        fotos = listar_fotos_pasta(args.entrada)
+    else:
+        fotos = listar_fotos_csv(args.entrada)
+    if not fotos:
+        raise SystemExit("Nenhuma foto encontrada.")
+    relatorio = cadastrar_lote(fotos, obter_galeria(args.galeria), args.workers, args.detector,
+                               args.limiar_duplicado, args.rejeitar_duplicados, args.simular)
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in relatorio)
+        print(f"[Cadastro] Relatório gravado em '{args.relatorio}'.")
@@ -0,0 +1,114 @@
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from inicializacao import importacao_preguicosa
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+MAX_INDICES = 10            # Índices testados quando não há como enumerar os dispositivos
+TIMEOUT_SONDAGEM = 3.0      # Segundos; câmeras que não respondem a tempo são ignoradas
+TTL_CACHE = 300             # Segundos
+ARQUIVO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'reconhecimento_cameras.json')
+
+_cache_memoria = {'cameras': None, 'em': 0.0}
+_trava = threading.Lock()
+
+
+def backend_captura():
+    """Backend do OpenCV mais rápido para abrir câmeras em cada sistema."""
+    if sys.platform.startswith('win'):
+        return cv2.CAP_DSHOW
+    if sys.platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+def indices_candidatos():
+    """No Linux, só os índices de /dev/video*; nos demais sistemas, 0..MAX_INDICES-1."""
+    if sys.platform.startswith('linux'):
+        indices = []
+        for caminho in glob.glob('/dev/video*'):
+            achado = re.fullmatch(r'/dev/video(\d+)', caminho)
+            if achado:
+                indices.append(int(achado.group(1)))
+        return sorted(indices)
+    return list(range(MAX_INDICES))
+
+
+def _testar_camera(indice, backend, resultados):
+    cap = cv2.VideoCapture(indice, backend)
+    resultados[indice] = cap.isOpened()
+    cap.release()
+
+
+def sondar_cameras(indices, timeout=TIMEOUT_SONDAGEM):
+    """Testa todos os índices ao mesmo tempo; o tempo total é o da câmera mais lenta (até `timeout`)."""
+    backend = backend_captura()
+    resultados = {}
+    threads = [threading.Thread(target=_testar_camera, args=(i, backend, resultados), daemon=True) for i in indices]
+    for thread in threads:
+        thread.start()
+    limite = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, limite - time.monotonic()))
+    return sorted(i for i, aberta in list(resultados.items()) if aberta)
+
+
+def _ler_cache_disco(ttl):
+    """(câmeras, momento da sondagem) do cache em disco, ou (None, None) se ausente ou vencido."""
+    try:
+        with open(ARQUIVO_CACHE, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        if time.time() - dados['em'] <= ttl:
+            return dados['cameras'], dados['em']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None, None
+
+
+def _gravar_cache_disco(cameras):
+    try:
+        os.makedirs(os.path.dirname(ARQUIVO_CACHE), exist_ok=True)
+        with open(ARQUIVO_CACHE, 'w', encoding='utf-8') as f:
+            json.dump({'em': time.time(), 'cameras': cameras}, f)
+    except OSError:
+        pass
+
+
+def listar_cameras(ttl=TTL_CACHE, forcar=False):
+    """Índices das câmeras disponíveis, com cache em memória e em disco válido por `ttl` segundos."""
+    with _trava:
+        if not forcar:
+            if _cache_memoria['cameras'] is not None and time.time() - _cache_memoria['em'] <= ttl:
+                return list(_cache_memoria['cameras'])
+            cameras, em = _ler_cache_disco(ttl)
+            if cameras is not None:
+                # Vale até o fim do prazo da sondagem original, não um `ttl` a partir de agora
+                _cache_memoria.update(cameras=cameras, em=em)
+                return list(cameras)
+
+        inicio = time.perf_counter()
+        cameras = sondar_cameras(indices_candidatos())
+        print(f"[Câmeras] {len(cameras)} câmera(s) encontrada(s) em {(time.perf_counter() - inicio) * 1000:.0f} ms: {cameras}")
+        _cache_memoria.update(cameras=cameras, em=time.time())
+        _gravar_cache_disco(cameras)
+        return list(cameras)
+
+
+def listar_cameras_async(ttl=TTL_CACHE, forcar=False):
+    """Roda `listar_cameras` em uma thread de fundo e devolve um Future com a lista."""
+    futuro = Future()
+
+    def executar():
+        try:
+            futuro.set_result(listar_cameras(ttl, forcar))
+        except Exception as e:
+            futuro.set_exception(e)
+    threading.Thread(target=executar, name='descoberta_cameras', daemon=True).start()
+    return futuro
@@ -1,10 +1,36 @@
+from inicializacao import importacao_preguicosa, perfil, reportar_janela_pronta
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk
-import cv2
 import os
-from datetime import datetime
 import threading
+from gravador_recortes import GravadorRecortes, MODO_JPG
+from motor_deteccao_carros import MotorDeteccaoCarros, carregar_roi
+from detector_mudanca import DetectorMudanca
+from metricas import metricas, adicionar_argumentos_metricas, configurar_metricas
+from modelos import emprestar_cascade, CASCADE_CARROS
+from pipeline_video import PipelineVideo
+from rastreamento import RastreadorTrilhas, de_xywh, para_xywh
+from registro_eventos import RegistroEventos
+from renderizador import RenderizadorVideo
+
+# Importações pesadas só acontecem no primeiro uso
+cv2 = importacao_preguicosa('cv2')
+
+# --- Configurações do Detector ---
+CLASSIFICADOR_PATH = CASCADE_CARROS  # Relativo à pasta do projeto (ver modelos.py)
+PASTA_SAIDA = 'carros_detectados'
+SCALE_FACTOR = 1.05
+MIN_NEIGHBORS = 5
+INTERVALO_DETECCAO = 5  # Cascade a cada N quadros, rastreamento entre eles (1 = desligado)
+MODO_GRAVACAO = MODO_JPG  # 'jpg' (um arquivo por carro) ou 'tar' (pacotes rotativos + índice)
+FPS_EXIBICAO = 30  # Limite de FPS da tela; a detecção continua no próprio ritmo
+ARQUIVO_EVENTOS = 'eventos.db'  # Um evento por carro rastreado (ver registro_eventos.py); None desliga
+
+# --- Motor de detecção (ver motor_deteccao_carros.py; os valores abaixo equivalem à detecção original) ---
+ESCALA_CASCADE = 1.0      # < 1.0 roda a cascade em um quadro reduzido (mínimo útil: 0.4)
+ARQUIVO_ROI = 'roi_estrada.json'  # Polígono da estrada [[x, y], ...]; sem o arquivo, usa o quadro inteiro
+USAR_MOVIMENTO = False    # Pula as regiões sem movimento (subtração de fundo)
+PULAR_CENA_PARADA = True  # Não roda a cascade quando a miniatura do quadro não mudou (ver detector_mudanca.py)
 
 class CarDetectorApp:
     def __init__(self, root):
@@ -17,7 +43,13 @@ class CarDetectorApp:
         self.video_source = None
         self.is_running = False
         self.detection_thread = None
+        self.rastreador = None
+        self.detector_mudanca = None
+        self.ultimos_carros = []
+        self.gravador = None
+        self.eventos = None
         self.save_images = tk.BooleanVar(value=True)
+        self.salvar_imagens = True  # Cópia do checkbox lida pela thread do pipeline (a BooleanVar é do Tk)
 
         # --- Estilos TTK ---
         style = ttk.Style(self.root)
@@ -33,6 +65,7 @@ class CarDetectorApp:
         # Painel de Vídeo
         self.video_label = ttk.Label(main_frame, text="Selecione uma fonte de vídeo para começar", anchor=tk.CENTER, background="black")
         self.video_label.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.renderizador = RenderizadorVideo(self.video_label, FPS_EXIBICAO, nome='carros')
 
         # Painel de Controle
         control_frame = ttk.Frame(main_frame, padding="5")
@@ -52,7 +85,8 @@ class CarDetectorApp:
         self.btn_stop.pack(side=tk.LEFT, padx=5, pady=5)
         
         # Checkbox para salvar imagens
-        self.check_save = ttk.Checkbutton(control_frame, text="Salvar Imagens Detectadas", variable=self.save_images)
+        self.check_save = ttk.Checkbutton(control_frame, text="Salvar Imagens Detectadas", variable=self.save_images,
+                                          command=self.on_save_toggle)
         self.check_save.pack(side=tk.RIGHT, padx=10, pady=5)
 
         # Rótulo de Status
@@ -72,6 +106,9 @@ class CarDetectorApp:
             self.status_label.config(text=f"Vídeo: {os.path.basename(filepath)}")
             self.btn_start.config(state=tk.NORMAL)
 
+    def on_save_toggle(self):
+        self.salvar_imagens = self.save_images.get()
+
     def use_webcam(self):
         """Configura a fonte de vídeo para a webcam padrão."""
         self.video_source = 0  # 0 para a webcam padrão
@@ -86,6 +123,10 @@ class CarDetectorApp:
 
         self.is_running = True
         self.toggle_controls(is_running=True)
+        self.renderizador.retomar()
+        self.rastreador = RastreadorTrilhas(INTERVALO_DETECCAO) if INTERVALO_DETECCAO > 1 else None
+        self.detector_mudanca = DetectorMudanca('carros') if PULAR_CENA_PARADA else None
+        self.ultimos_carros = []
         
         # Usamos uma thread para não travar a GUI
         self.detection_thread = threading.Thread(target=self.video_loop)
@@ -96,8 +137,7 @@ class CarDetectorApp:
         """Para a detecção de vídeo."""
         self.is_running = False
         self.toggle_controls(is_running=False)
-        self.video_label.config(image='', text="Detecção parada. Selecione uma fonte de vídeo.")
-        self.video_label.image = None
+        self.renderizador.limpar("Detecção parada. Selecione uma fonte de vídeo.")
 
     def toggle_controls(self, is_running):
         """Habilita/desabilita os botões com base no estado da detecção."""
@@ -114,79 +154,111 @@ class CarDetectorApp:
 
     def video_loop(self):
         """O loop principal que processa o vídeo."""
-        # --- Configurações do Detector ---
-        CLASSIFICADOR_PATH = 'detection_haarcascades/cars.xml'
-        PASTA_SAIDA = 'carros_detectados'
-        SCALE_FACTOR = 1.05
-        MIN_NEIGHBORS = 5
-
         try:
-            classificador_carro = cv2.CascadeClassifier(CLASSIFICADOR_PATH)
-            if classificador_carro.empty():
-                raise IOError("Não foi possível carregar o classificador Haar Cascade.")
-            
-            cap = cv2.VideoCapture(self.video_source)
-            if not cap.isOpened():
-                raise IOError(f"Não foi possível abrir a fonte de vídeo: {self.video_source}")
-
-            if not os.path.exists(PASTA_SAIDA):
-                os.makedirs(PASTA_SAIDA)
-
-            self.status_label.config(text="Detectando...")
-
-            while self.is_running:
-                ret, frame = cap.read()
-                if not ret:
-                    self.status_label.config(text="Fim do vídeo.")
-                    break
-
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                carros_detectados = classificador_carro.detectMultiScale(
-                    gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=(50, 50))
-
-                for (x, y, w, h) in carros_detectados:
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    cv2.putText(frame, 'Carro', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    
-                    if self.save_images.get():
-                        carro_recortado = frame[y:y+h, x:x+w]
-                        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')
-                        nome_arquivo = f'carro_{timestamp}.jpg'
-                        caminho_completo = os.path.join(PASTA_SAIDA, nome_arquivo)
-                        cv2.imwrite(caminho_completo, carro_recortado)
-
-                # Converte o frame para exibição no Tkinter
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(rgb_frame)
-                
-                # Redimensiona a imagem para caber no label, mantendo a proporção
-                w, h = pil_image.size
-                max_w = self.video_label.winfo_width()
-                max_h = self.video_label.winfo_height()
-                if w > max_w or h > max_h:
-                    pil_image.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
-                
-                tk_image = ImageTk.PhotoImage(image=pil_image)
-
-                self.video_label.config(image=tk_image, text="")
-                self.video_label.image = tk_image # Mantém a referência
-
-            cap.release()
+            # O classificador é carregado uma vez por processo e reaproveitado entre execuções
+            with emprestar_cascade(CLASSIFICADOR_PATH) as classificador_carro:
+                self.motor = MotorDeteccaoCarros(
+                    classificador_carro, escala=ESCALA_CASCADE, roi=carregar_roi(ARQUIVO_ROI), usar_movimento=USAR_MOVIMENTO,
+                    scale_factor=SCALE_FACTOR, min_neighbors=MIN_NEIGHBORS)
+
+                # Roda na thread de vídeo: widgets e diálogos só na thread do Tk
+                self.root.after(0, lambda: self.status_label.config(text="Detectando..."))
+
+                # Os recortes são codificados e gravados em segundo plano, um por trilha
+                self.gravador = GravadorRecortes(PASTA_SAIDA, prefixo='carro', modo=MODO_GRAVACAO)
+                self.eventos = RegistroEventos(ARQUIVO_EVENTOS, fonte=self.video_source) if ARQUIVO_EVENTOS else None
+                try:
+                    # Captura, detecção e exibição rodam em threads separadas
+                    pipeline = PipelineVideo(self.video_source, [
+                        ('deteccao', self.etapa_deteccao),
+                        ('exibicao', self.etapa_exibicao),
+                    ], nome='carros')
+                    pipeline.executar(continuar=lambda: self.is_running)
+                finally:
+                    self.gravador.encerrar()
+                    if self.eventos is not None:
+                        self.eventos.encerrar()
+                    if self.detector_mudanca is not None:
+                        self.detector_mudanca.imprimir_resumo()
+
             if self.is_running: # Se parou por fim de vídeo, e não por botão
+                self.root.after(0, lambda: self.status_label.config(text="Fim do vídeo."))
                 self.root.after(100, self.stop_detection)
 
         except Exception as e:
-            messagebox.showerror("Erro", str(e))
+            self.root.after(0, messagebox.showerror, "Erro", str(e))
             if self.is_running:
                 self.root.after(100, self.stop_detection)
+
+    def etapa_deteccao(self, quadro):
+        """Detecta os carros do quadro, desenha as caixas e salva os recortes."""
+        frame = quadro['frame']
+        if self.detector_mudanca is not None and not self.detector_mudanca.deve_detectar(frame):
+            # Estrada parada: repete as últimas caixas, sem cascade nem rastreamento
+            self.desenhar_carros(frame, self.ultimos_carros)
+            return quadro
+
+        quadro_chave = self.rastreador is None or self.rastreador.proximo_e_quadro_chave()
+        if quadro_chave:
+            with metricas.medir('carros.cascade'):
+                carros_detectados = self.motor.detectar(frame)
+            if self.rastreador is not None:
+                self.rastreador.associar([de_xywh(c) for c in carros_detectados], frame)
+        else:
+            # Entre quadros-chave as caixas são apenas seguidas
+            with metricas.medir('carros.rastreamento'):
+                self.rastreador.seguir(frame)
+        if self.rastreador is not None:
+            carros = [(para_xywh(trilha.caixa), trilha.id) for trilha in self.rastreador.trilhas]
+        else:
+            carros = [(caixa, None) for caixa in carros_detectados]
+
+        if quadro_chave and self.eventos is not None:
+            for (x, y, w, h), id_trilha in carros:
+                self.eventos.registrar('carro', quadro['capturado_em'], trilha=id_trilha, rotulo='Carro',
+                                       caixa=(x, y, x + w, y + h))
+
+        if quadro_chave and self.salvar_imagens:
+            # Recorta antes de desenhar; o gravador ignora trilhas já salvas
+            for (x, y, w, h), id_trilha in carros:
+                carro_recortado = frame[max(y, 0):y+h, max(x, 0):x+w]
+                if carro_recortado.size:
+                    self.gravador.enfileirar(carro_recortado, quadro['capturado_em'], id_trilha)
+
+        self.ultimos_carros = carros
+        self.desenhar_carros(frame, carros)
+        return quadro
+
+    def desenhar_carros(self, frame, carros):
+        for (x, y, w, h), _ in carros:
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            cv2.putText(frame, 'Carro', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+    def etapa_exibicao(self, quadro):
+        """Envia o frame ao renderizador, que o reduz aqui e o desenha na thread do Tkinter."""
+        self.renderizador.enviar(quadro['frame'])
+        return quadro
     
     def on_closing(self):
         """Garante que a thread pare ao fechar a janela."""
         self.stop_detection()
+        self.renderizador.parar()
         self.root.destroy()
 
 # --- Ponto de Entrada da Aplicação ---
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Detector de Carros")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Imprime o tempo de cada importação/etapa até a janela aparecer")
+    adicionar_argumentos_metricas(parser)
+    args = parser.parse_args()
+    exportador = configurar_metricas(args)
+
     root = tk.Tk()
-    app = CarDetectorApp(root)
-    root.mainloop()
\ No newline at end of file
+    with perfil.etapa("montar interface"):
+        app = CarDetectorApp(root)
+    reportar_janela_pronta(root, "cars_detection.py", detalhar=args.profile_startup)
+    root.mainloop()
+    if exportador is not None:
+        exportador.encerrar()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import numpy as np
+
+# --- Constantes ---
+DIMENSAO_CODIFICACAO = 128
+CAPACIDADE_INICIAL = 1024
+DTYPE_PADRAO = np.float32  # Metade da memória do float64, mesma identificação (ver README)
+
+
+class ComparadorRostos:
+    """Vizinho mais próximo vetorizado sobre a galeria de rostos conhecidos.
+
+    Mantém a galeria em uma única matriz C-contígua pré-alocada (float32 por padrão;
+    cresce dobrando a capacidade), junto com as normas ao quadrado de cada linha,
+    calculadas uma vez na inserção. Todos os rostos de um frame são resolvidos com
+    ||a||² + ||b||² - 2a·b, ou seja, uma única multiplicação de matrizes (GEMM, no BLAS)
+    rostos x galeria, em vez de um `compare_faces` + `face_distance` por rosto.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_INICIAL, dtype=DTYPE_PADRAO):
+        self._matriz = np.empty((capacidade, DIMENSAO_CODIFICACAO), dtype=dtype)
+        self._normas = np.empty(capacidade, dtype=dtype)
+        self.tamanho = 0
+
+    @classmethod
+    def de_codificacoes(cls, codificacoes, dtype=DTYPE_PADRAO):
+        comparador = cls(capacidade=max(CAPACIDADE_INICIAL, len(codificacoes)), dtype=dtype)
+        comparador.carregar(codificacoes)
+        return comparador
+
+    def __len__(self):
+        return self.tamanho
+
+    @property
+    def codificacoes(self):
+        return self._matriz[:self.tamanho]
+
+    @property
+    def normas(self):
+        """||b||² de cada codificação da galeria."""
+        return self._normas[:self.tamanho]
+
+    @property
+    def dtype(self):
+        return self._matriz.dtype
+
+    @property
+    def memoria_bytes(self):
+        return self._matriz.nbytes + self._normas.nbytes
+
+    def carregar(self, codificacoes):
+        """Substitui toda a galeria (lista de arrays ou matriz N x 128)."""
+        n = len(codificacoes)
+        self._garantir_capacidade(n)
+        if n:
+            self._matriz[:n] = np.asarray(codificacoes)
+            np.einsum('ij,ij->i', self._matriz[:n], self._matriz[:n], out=self._normas[:n])
+        self.tamanho = n
+
+    def adicionar(self, codificacao):
+        """Acrescenta uma codificação ao fim da galeria e retorna o seu índice."""
+        self._garantir_capacidade(self.tamanho + 1)
+        self._gravar_linha(self.tamanho, codificacao)
+        self.tamanho += 1
+        return self.tamanho - 1
+
+    def atualizar(self, indice, codificacao):
+        """Insere no fim (se `indice` for o próximo) ou sobrescreve uma linha existente."""
+        if indice == self.tamanho:
+            return self.adicionar(codificacao)
+        self._gravar_linha(indice, codificacao)
+        return indice
+
+    def _gravar_linha(self, indice, codificacao):
+        self._matriz[indice] = codificacao
+        self._normas[indice] = self._matriz[indice] @ self._matriz[indice]
+
+    def _garantir_capacidade(self, necessario):
+        if necessario <= self._matriz.shape[0]:
+            return
+        capacidade = max(necessario, self._matriz.shape[0] * 2)
+        nova = np.empty((capacidade, DIMENSAO_CODIFICACAO), dtype=self._matriz.dtype)
+        nova[:self.tamanho] = self._matriz[:self.tamanho]
+        novas_normas = np.empty(capacidade, dtype=self._matriz.dtype)
+        novas_normas[:self.tamanho] = self._normas[:self.tamanho]
+        self._matriz, self._normas = nova, novas_normas
+
+    def distancias_quadradas(self, consultas, ids=None):
+        """||a||² + ||b||² - 2a·b (rostos x galeria, ou só as linhas `ids`), já limitada a >= 0."""
+        consultas = np.ascontiguousarray(consultas, dtype=self._matriz.dtype).reshape(-1, DIMENSAO_CODIFICACAO)
+        galeria, normas = self.codificacoes, self.normas
+        if ids is not None:
+            galeria, normas = galeria[ids], normas[ids]
+        d2 = consultas @ galeria.T  # A GEMM: todo o custo do cálculo fica no BLAS
+        d2 *= -2.0
+        d2 += np.einsum('ij,ij->i', consultas, consultas)[:, None]
+        d2 += normas[None, :]
+        return np.maximum(d2, 0.0, out=d2)  # Arredondamento pode dar valores levemente negativos
+
+    def distancias(self, codificacoes):
+        """Matriz de distâncias euclidianas (rostos x galeria)."""
+        return np.sqrt(self.distancias_quadradas(codificacoes))
+
+    def melhores(self, codificacoes):
+        """Para cada rosto, retorna (índice, distância) do mais próximo na galeria.
+
+        Com a galeria vazia, o índice é -1 e a distância é infinita.
+        """
+        n = len(codificacoes)
+        if n == 0 or self.tamanho == 0:
+            return np.full(n, -1, dtype=np.intp), np.full(n, np.inf)
+        distancias = self.distancias(codificacoes)
+        indices = np.argmin(distancias, axis=1)
+        return indices, distancias[np.arange(n), indices]
+
+    def candidatos(self, codificacoes, k):
+        """Os `k` mais próximos de cada rosto, do mais próximo ao mais distante.
+
+        Retorna matrizes (rostos x k) de índices e distâncias, completadas com -1 e
+        infinito quando a galeria tem menos de `k` codificações.
+        """
+        n = len(codificacoes)
+        indices, distancias = np.full((n, k), -1, dtype=np.intp), np.full((n, k), np.inf)
+        if n == 0 or self.tamanho == 0:
+            return indices, distancias
+        todas = self.distancias(codificacoes)
+        m = min(k, self.tamanho)
+        proximos = np.argpartition(todas, m - 1, axis=1)[:, :m]
+        d = np.take_along_axis(todas, proximos, axis=1)
+        ordem = np.argsort(d, axis=1)
+        indices[:, :m] = np.take_along_axis(proximos, ordem, axis=1)
+        distancias[:, :m] = np.take_along_axis(d, ordem, axis=1)
+        return indices, distancias
+
+    def identificar(self, codificacoes, tolerancia):
+        """Como `melhores`, mas com índice -1 para quem ficou acima da tolerância."""
+        indices, distancias = self.melhores(codificacoes)
+        return np.where(distancias <= tolerancia, indices, -1), distancias
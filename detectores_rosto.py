@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from inicializacao import importacao_preguicosa
+from metricas import metricas
+from modelos import caminho_modelo
+from rastreamento import matriz_iou, de_location
+
+cv2 = importacao_preguicosa('cv2')
+face_recognition = importacao_preguicosa('face_recognition')
+
+# --- Constantes ---
+DETECTOR_PADRAO = 'hog'
+FRACAO_ROSTO_MINIMO = 0.15    # Menor rosto esperado, em fração da altura do quadro (em 1080p, ~o antigo 0.25 fixo)
+ESCALA_MINIMA = 0.05
+ESCALA_MAXIMA = 2.0           # Limite da ampliação na retentativa
+RETENTAR_A_CADA = 10          # Em vídeo, no máximo uma retentativa a cada N detecções vazias
+MODELO_YUNET = os.path.join('modelos', 'face_detection_yunet_2023mar.onnx')
+URL_YUNET = 'https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet'
+LIMIAR_YUNET = 0.8
+
+
+# --- Detectores (todos recebem RGB e devolvem locations (top, right, bottom, left)) ---
+
+class DetectorDlib:
+    """HOG (padrão) ou CNN do dlib, via face_recognition.face_locations."""
+
+    def __init__(self, modelo='hog', upsample=1):
+        self.nome = modelo
+        self.modelo = modelo
+        self.upsample = upsample
+        # A janela do dlib tem ~80 px; cada upsample dobra a imagem antes da varredura
+        self.tamanho_minimo = 80 / (2 ** upsample)
+
+    def detectar(self, rgb):
+        return face_recognition.face_locations(rgb, self.upsample, self.modelo)
+
+
+class DetectorYuNet:
+    """Detector YuNet (DNN do OpenCV, cv2.FaceDetectorYN): rápido na CPU e bom com rostos pequenos.
+
+    O modelo .onnx não vem com o projeto; baixe-o de URL_YUNET para `modelo`.
+    """
+
+    def __init__(self, modelo=MODELO_YUNET, limiar=LIMIAR_YUNET):
+        caminho = caminho_modelo(modelo)
+        if not os.path.exists(caminho):
+            raise IOError(f"Modelo YuNet não encontrado em '{caminho}'. Baixe o .onnx em {URL_YUNET}")
+        self.nome = 'yunet'
+        self.tamanho_minimo = 20
+        self._detector = cv2.FaceDetectorYN.create(caminho, "", (320, 320), limiar)
+        self._trava = threading.Lock()  # Uma instância pode ser chamada pelo pipeline e pelo registro
+
+    def detectar(self, rgb):
+        altura, largura = rgb.shape[:2]
+        with self._trava:
+            self._detector.setInputSize((largura, altura))
+            _, rostos = self._detector.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if rostos is None:
+            return []
+        locations = []
+        for x, y, w, h in rostos[:, :4]:
+            top, left = max(0, int(y)), max(0, int(x))
+            bottom, right = min(altura, int(y + h)), min(largura, int(x + w))
+            if bottom > top and right > left:
+                locations.append((top, right, bottom, left))
+        return locations
+
+
+TIPOS_DETECTOR = ('hog', 'cnn', 'yunet')
+
+def criar_detector(tipo=DETECTOR_PADRAO, **parametros):
+    """Cria o detector `tipo` ('hog', 'cnn' ou 'yunet')."""
+    if tipo in ('hog', 'cnn'):
+        return DetectorDlib(tipo, **parametros)
+    if tipo == 'yunet':
+        return DetectorYuNet(**parametros)
+    raise ValueError(f"Tipo de detector desconhecido: '{tipo}'. Opções: {', '.join(TIPOS_DETECTOR)}")
+
+
+# --- Resolução adaptativa ---
+
+def escala_adaptativa(altura, tamanho_minimo_detector, fracao_rosto_minimo=FRACAO_ROSTO_MINIMO):
+    """Maior redução em que o menor rosto esperado ainda tem o tamanho mínimo que o detector acha."""
+    rosto_minimo = fracao_rosto_minimo * altura
+    return round(min(1.0, max(ESCALA_MINIMA, tamanho_minimo_detector / rosto_minimo)), 3)
+
+
+def para_quadro(location, escala):
+    """Location no quadro reduzido por `escala` -> location no quadro original."""
+    return tuple(int(round(v / escala)) for v in location)
+
+
+class DetectorAdaptativo:
+    """Reduz o quadro conforme a resolução da fonte antes de detectar.
+
+    A escala sai de `escala_adaptativa` (uma vez por resolução) em vez de um 0.25 fixo:
+    uma câmera 4K é reduzida bem mais que uma 480p, e o menor rosto esperado
+    (`fracao_rosto_minimo` da altura) continua detectável. Quando nenhum rosto é achado,
+    tenta de novo com o quadro ampliado 2x, em vídeo no máximo a cada `retentar_a_cada`
+    detecções vazias (uma sala vazia não dobra o custo de todo quadro). Com `escala`, a
+    redução é fixa.
+    """
+
+    def __init__(self, detector=None, fracao_rosto_minimo=FRACAO_ROSTO_MINIMO, escala=None,
+                 retentar_a_cada=RETENTAR_A_CADA, prefixo_metricas='rostos'):
+        self.detector = detector or criar_detector()
+        self.fracao_rosto_minimo = fracao_rosto_minimo
+        self.escala_fixa = escala
+        self.retentar_a_cada = retentar_a_cada
+        self.prefixo_metricas = prefixo_metricas
+        self.retentativas = 0
+        self.retentativas_com_rosto = 0
+        self._escalas = {}
+        self._vazios = 0
+
+    def escala_para(self, forma):
+        if self.escala_fixa is not None:
+            return self.escala_fixa
+        altura = forma[0]
+        escala = self._escalas.get(altura)
+        if escala is None:
+            escala = self._escalas[altura] = escala_adaptativa(altura, self.detector.tamanho_minimo, self.fracao_rosto_minimo)
+        return escala
+
+    def reduzir(self, frame, escala):
+        """O quadro BGR na `escala` pedida (INTER_AREA para reduzir)."""
+        if escala == 1.0:
+            return frame
+        interpolacao = cv2.INTER_AREA if escala < 1.0 else cv2.INTER_LINEAR
+        return cv2.resize(frame, (0, 0), fx=escala, fy=escala, interpolation=interpolacao)
+
+    def detectar(self, frame, retentar=None):
+        """Detecta em um quadro BGR. Retorna (rgb, locations, escala).
+
+        As locations estão nas coordenadas de `rgb`, o quadro reduzido por `escala`
+        (`para_quadro` as leva para o original). `retentar` força (True) ou impede
+        (False) a retentativa ampliada; None segue `retentar_a_cada`.
+        """
+        escala = self.escala_para(frame.shape)
+        with metricas.medir(f"{self.prefixo_metricas}.redimensionar"):
+            rgb = cv2.cvtColor(self.reduzir(frame, escala), cv2.COLOR_BGR2RGB)
+        with metricas.medir(f"{self.prefixo_metricas}.deteccao"):
+            locations = self.detector.detectar(rgb)
+        if locations:
+            self._vazios = 0
+            return rgb, locations, escala
+
+        self._vazios += 1
+        if retentar is None:
+            retentar = bool(self.retentar_a_cada) and (self._vazios - 1) % self.retentar_a_cada == 0
+        ampliada = min(escala * 2, ESCALA_MAXIMA)
+        if not retentar or ampliada <= escala:
+            return rgb, locations, escala
+        self.retentativas += 1
+        metricas.contar(f"{self.prefixo_metricas}.retentativas")
+        with metricas.medir(f"{self.prefixo_metricas}.retentativa"):
+            rgb_ampliado = cv2.cvtColor(self.reduzir(frame, ampliada), cv2.COLOR_BGR2RGB)
+            locations = self.detector.detectar(rgb_ampliado)
+        if not locations:
+            return rgb, locations, escala
+        self.retentativas_com_rosto += 1
+        self._vazios = 0
+        return rgb_ampliado, locations, ampliada
+
+
+# --- Velocidade e recall de cada configuração ---
+
+def comparar_com_referencia(quadros, configuracoes, limiar_iou=0.5):
+    """FPS, recall e precisão (IoU >= limiar) de cada configuração contra o HOG no quadro inteiro.
+
+    `configuracoes` é uma lista de dicts com 'detector' e 'escala' (None = adaptativa)
+    e, opcionalmente, 'retentar' (False desliga a retentativa ampliada).
+    """
+    referencia = DetectorAdaptativo(criar_detector('hog'), escala=1.0, retentar_a_cada=0)
+    caixas_ref, inicio = [], time.perf_counter()
+    for frame in quadros:
+        caixas_ref.append([de_location(l) for l in referencia.detectar(frame)[1]])
+    tempo_ref = time.perf_counter() - inicio
+    total_ref = sum(len(c) for c in caixas_ref)
+
+    resultados = []
+    for configuracao in configuracoes:
+        try:
+            modelo = criar_detector(configuracao['detector'])
+        except IOError as e:
+            resultados.append({**configuracao, 'erro': str(e)})  # Ex.: modelo do YuNet não baixado
+            continue
+        detector = DetectorAdaptativo(modelo, escala=configuracao.get('escala'),
+                                      retentar_a_cada=RETENTAR_A_CADA if configuracao.get('retentar', True) else 0)
+        verdadeiros = total = 0
+        inicio = time.perf_counter()
+        for frame, ref in zip(quadros, caixas_ref):
+            _, locations, escala = detector.detectar(frame)
+            caixas = [de_location(para_quadro(l, escala)) for l in locations]
+            total += len(caixas)
+            if ref and caixas:
+                verdadeiros += int(np.sum(matriz_iou(ref, caixas).max(axis=1) >= limiar_iou))
+        tempo = time.perf_counter() - inicio
+        resultados.append({
+            **configuracao,
+            'escala_usada': detector.escala_para(quadros[0].shape),
+            'quadros': len(quadros),
+            'resolucao': f"{quadros[0].shape[1]}x{quadros[0].shape[0]}",
+            'fps_referencia': round(len(quadros) / tempo_ref, 2) if tempo_ref else 0.0,
+            'fps': round(len(quadros) / tempo, 2) if tempo else 0.0,
+            'recall': round(verdadeiros / total_ref, 4) if total_ref else 1.0,
+            'precisao': round(verdadeiros / total, 4) if total else 1.0,
+            'retentativas': detector.retentativas,
+            'retentativas_com_rosto': detector.retentativas_com_rosto,
+        })
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    from pool_codificacao import ler_quadros
+
+    parser = argparse.ArgumentParser(description="Compara velocidade e recall dos detectores de rosto e das escalas.")
+    parser.add_argument('video')
+    parser.add_argument('--detectores', nargs='+', default=['hog', 'yunet'], choices=TIPOS_DETECTOR)
+    parser.add_argument('--escalas', nargs='+', default=['auto', '0.25', '0.5'],
+                        help="Escalas fixas e/ou 'auto' (adaptativa pela resolução)")
+    parser.add_argument('--sem-retentativa', action='store_true', help="Também avalia sem a retentativa ampliada")
+    parser.add_argument('--quadros', type=int, default=100)
+    args = parser.parse_args()
+
+    quadros = ler_quadros(args.video, args.quadros)
+    if not quadros:
+        raise SystemExit(f"Nenhum quadro lido de '{args.video}'.")
+    configuracoes = []
+    for detector in args.detectores:
+        for escala in args.escalas:
+            for retentar in ([True, False] if args.sem_retentativa else [True]):
+                configuracoes.append({'detector': detector, 'escala': None if escala == 'auto' else float(escala), 'retentar': retentar})
+    for resultado in comparar_com_referencia(quadros, configuracoes):
+        print(json.dumps(resultado))
@@ -1,70 +1,80 @@
+from inicializacao import importacao_preguicosa, aquecer_em_segundo_plano, perfil, reportar_janela_pronta
 import tkinter as tk
 from tkinter import ttk, filedialog, simpledialog, messagebox
-from PIL import Image, ImageTk
-import cv2
-import face_recognition
-import numpy as np
-import json
 import os
 import threading
+from cameras import listar_cameras_async
+from galeria import obter_galeria
+from metricas import metricas, adicionar_argumentos_metricas, configurar_metricas
+from pipeline_video import PipelineVideo
+from pool_codificacao import PoolCodificacao
+from detectores_rosto import DetectorAdaptativo, criar_detector, para_quadro, TIPOS_DETECTOR
+from detector_mudanca import DetectorMudanca
+from prototipos import criar_comparador
+from registro_eventos import RegistroEventos
+from rastreamento import RastreadorTrilhas, de_location, para_location
+from renderizador import RenderizadorVideo
+
+# Importações pesadas só acontecem no primeiro uso (a janela aparece antes do dlib carregar)
+cv2 = importacao_preguicosa('cv2')
+face_recognition = importacao_preguicosa('face_recognition')
 
 # --- Constantes ---
 ARQUIVO_DADOS = 'dados_registrados.json'
 PASTA_FOTOS = 'fotos_registro'
 TOLERANCIA = 0.6
-
-# --- Funções Auxiliares (sem alteração) ---
+TIPO_INDICE = 'exato'  # 'exato', 'ivf' ou 'hnsw' (ver indices_busca.py)
+DETECTOR_ROSTOS = 'hog'  # 'hog', 'cnn' ou 'yunet' (ver detectores_rosto.py)
+ESCALA_DETECCAO = None  # None = adaptativa pela resolução da fonte; ou fixa (ex.: 0.25)
+WORKERS_CODIFICACAO = 0  # > 0 distribui detecção e codificação em um pool de processos
+INTERVALO_DETECCAO = 5  # Detecção completa a cada N quadros, rastreamento entre eles (1 = desligado)
+PULAR_CENA_PARADA = True  # Não detecta quando a miniatura do quadro não mudou (ver detector_mudanca.py)
+FPS_EXIBICAO = 30  # Limite de FPS da tela; o processamento continua no próprio ritmo
+INTERVALO_ACOMPANHAMENTO = 2000  # ms entre verificações de cadastros feitos por outros processos
+ARQUIVO_EVENTOS = 'eventos.db'  # Quem foi visto e quando (ver registro_eventos.py); None desliga
+
+# --- Funções Auxiliares ---
 
 def carregar_dados_salvos():
-    if not os.path.exists(ARQUIVO_DADOS): return [], [], []
-    try:
-        with open(ARQUIVO_DADOS, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-        rostos_codificados = [np.array(item['codificacao']) for item in dados]
-        codigos = [item['codigo'] for item in dados]
-        nomes = [item['nome'] for item in dados]
-        return rostos_codificados, codigos, nomes
-    except (json.JSONDecodeError, KeyError, FileNotFoundError):
-        return [], [], []
-
-def carregar_dados_para_edicao():
-    if not os.path.exists(ARQUIVO_DADOS): return []
-    try:
-        with open(ARQUIVO_DADOS, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
-
-def salvar_dados(codigo, nome, codificacao_rosto):
-    dados_atuais = carregar_dados_para_edicao()
-    item_encontrado = False
-    for item in dados_atuais:
-        if item['codigo'] == codigo:
-            item.update({'nome': nome, 'codificacao': codificacao_rosto.tolist()})
-            item_encontrado = True
-            break
-    if not item_encontrado:
-        dados_atuais.append({
-            'codigo': codigo, 'nome': nome, 'codificacao': codificacao_rosto.tolist()
-        })
-    with open(ARQUIVO_DADOS, 'w', encoding='utf-8') as f:
-        json.dump(dados_atuais, f, indent=4, ensure_ascii=False)
+    # A matriz de codificações é uma visão mapeada em memória: abrir não lê as codificações
+    galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+    return galeria.codificacoes, list(galeria.codigos), list(galeria.nomes)
+
+def salvar_dados(codigo, nome, codificacao_rosto, nova_amostra=False):
+    # Upsert direto na galeria binária, sem reescrever as demais pessoas. Retorna o índice.
+    # Com nova_amostra, a foto se soma às anteriores da pessoa em vez de substituí-las.
+    galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+    if nova_amostra:
+        return galeria.adicionar_amostra(codigo, nome, codificacao_rosto)
+    return galeria.adicionar(codigo, nome, codificacao_rosto)
 
 
 # --- Classe Principal da Aplicação ---
 class FaceRecognitionApp:
-    def __init__(self, root):
+    def __init__(self, root, workers=WORKERS_CODIFICACAO, intervalo_deteccao=INTERVALO_DETECCAO, detector=DETECTOR_ROSTOS):
         self.root = root
         self.root.title("Sistema de Reconhecimento Facial")
         self.root.geometry("900x700")
 
+        self.workers = workers
+        self.intervalo_deteccao = intervalo_deteccao
+        self.rastreador = None
+        self.detector_mudanca = None
+        self.ultimo_resultado = ([], [])  # (locations, identidades) reaproveitados quando a cena não muda
+        self.estado_registro = None       # Último estado do botão de registro pedido à thread do Tk
+        self.eventos = None
         self.video_source = None
         self.is_running = False
         self.detection_thread = None
         self.current_frame = None
         self.save_photo = tk.BooleanVar(value=True)
+        self.tipo_detector = detector
+        self.detector = DetectorAdaptativo(criar_detector(detector), escala=ESCALA_DETECCAO)
 
-        self.carregar_dados_conhecidos()
+        with perfil.etapa("carregar galeria + índice"):
+            self.carregar_dados_conhecidos()
+        # Carrega os modelos do dlib enquanto o usuário ainda escolhe a fonte de vídeo
+        aquecer_em_segundo_plano(cv2, face_recognition)
 
         style = ttk.Style(self.root)
         style.configure('TButton', font=('Helvetica', 10))
@@ -77,6 +87,7 @@ class FaceRecognitionApp:
 
         self.video_label = ttk.Label(main_frame, text="Selecione uma fonte de vídeo para começar", anchor=tk.CENTER, background="black")
         self.video_label.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.renderizador = RenderizadorVideo(self.video_label, FPS_EXIBICAO, nome='rostos')
 
         control_frame = ttk.Frame(main_frame, padding="5")
         control_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -88,16 +99,11 @@ class FaceRecognitionApp:
         #Label para o Combobox de câmeras
         ttk.Label(control_frame, text="Câmera:").pack(side=tk.LEFT, padx=(10, 0), pady=5)
 
-        #Combobox para listar as câmeras
-        self.camera_options = self.listar_cameras_disponiveis()
-        self.camera_combobox = ttk.Combobox(control_frame, values=self.camera_options, width=15)
-
-        if not self.camera_options:
-            self.camera_combobox['values'] = ["Nenhuma câmera encontrada"]
-            self.camera_combobox.set("Nenhuma câmera encontrada")
-            self.camera_combobox.config(state=tk.DISABLED)
-        else:
-             self.camera_combobox.set("Selecione a câmera")
+        #Combobox para listar as câmeras (preenchido quando a busca em segundo plano terminar)
+        self.camera_options = []
+        self.camera_combobox = ttk.Combobox(control_frame, values=["Procurando câmeras..."], width=15)
+        self.camera_combobox.set("Procurando câmeras...")
+        self.camera_combobox.config(state=tk.DISABLED)
         self.camera_combobox.pack(side=tk.LEFT, padx=5, pady=5)
         self.camera_combobox.bind("<<ComboboxSelected>>", self.on_camera_select)
 
@@ -117,23 +123,39 @@ class FaceRecognitionApp:
         self.check_save.pack(side=tk.RIGHT, padx=10, pady=5)
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-
-    # Função para detectar as câmeras
-    def listar_cameras_disponiveis(self):
-        cameras_disponiveis = []
-        print("Procurando câmeras disponíveis...")
-        for i in range(10): # Testa os primeiros 10 índices
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW) # Usar CAP_DSHOW no Windows ajuda a acelerar           
-            # cap = cv2.VideoCapture(i, cv2.CAP_MSMF) # Mude de CAP_DSHOW para CAP_MSMF
-            if cap.isOpened():
-                cameras_disponiveis.append(f"Câmera {i}")
-                cap.release()
-        print(f"Câmeras encontradas: {cameras_disponiveis}")
-        return cameras_disponiveis
+        # Os `after` são do interpretador, não da janela: on_closing os cancela (ex.: Toplevel no Home)
+        self._agendamentos = {}
+        self._agendamentos['acompanhar'] = self.root.after(INTERVALO_ACOMPANHAMENTO, self.acompanhar_galeria)
+
+        # A busca de câmeras roda em segundo plano (e usa o cache); a janela não espera por ela
+        self.descoberta_cameras = listar_cameras_async()
+        self._agendamentos['cameras'] = self.root.after(100, self.verificar_descoberta_cameras)
+
+    # Verifica (na thread do Tk) se a busca de câmeras terminou e preenche o Combobox
+    def verificar_descoberta_cameras(self):
+        if not self.descoberta_cameras.done():
+            self._agendamentos['cameras'] = self.root.after(100, self.verificar_descoberta_cameras)
+            return
+        self._agendamentos.pop('cameras', None)
+        try:
+            indices = self.descoberta_cameras.result()
+        except Exception as e:
+            print(f"Erro ao procurar câmeras: {e}")
+            indices = []
+        self.camera_options = [f"Câmera {i}" for i in indices]
+        if not self.camera_options:
+            self.camera_combobox['values'] = ["Nenhuma câmera encontrada"]
+            self.camera_combobox.set("Nenhuma câmera encontrada")
+            return
+        self.camera_combobox['values'] = self.camera_options
+        self.camera_combobox.set("Selecione a câmera")
+        if not self.is_running:
+            self.camera_combobox.config(state=tk.NORMAL)
     
     # Evento para quando uma câmera é selecionada no Combobox
     def on_camera_select(self, event):
         selecao = self.camera_combobox.get() # Pega o texto, ex: "Câmera 1"
+        if selecao not in self.camera_options: return # Ex.: "Procurando câmeras..."
         # Extrai apenas o número do índice
         indice_camera = int(selecao.split(' ')[1])
         self.video_source = indice_camera
@@ -150,14 +172,18 @@ class FaceRecognitionApp:
         if self.video_source is None: return
         self.is_running = True
         self.toggle_controls(is_running=True)
+        self.renderizador.retomar()
+        self.rastreador = RastreadorTrilhas(self.intervalo_deteccao) if self.intervalo_deteccao > 1 else None
+        self.detector_mudanca = DetectorMudanca('rostos') if PULAR_CENA_PARADA else None
+        self.ultimo_resultado = ([], [])
+        self.estado_registro = None
         self.detection_thread = threading.Thread(target=self.video_loop, daemon=True)
         self.detection_thread.start()
 
     def stop_detection(self):
         self.is_running = False
         self.toggle_controls(is_running=False)
-        self.video_label.config(image='', text="Detecção parada.")
-        self.video_label.image = None
+        self.renderizador.limpar("Detecção parada.")
 
     def toggle_controls(self, is_running):
         state_if_running = tk.DISABLED if is_running else tk.NORMAL
@@ -171,48 +197,175 @@ class FaceRecognitionApp:
 
     def video_loop(self):
         try:
-            cap = cv2.VideoCapture(self.video_source)
-            if not cap.isOpened(): raise IOError("Não foi possível abrir a fonte de vídeo.")
-
-            while self.is_running:
-                ret, frame = cap.read()
-                if not ret: break
-                
-                self.current_frame = frame.copy()
-                processed_frame, unknown_face_found = self.process_frame(frame)
-                
-                self.btn_register.config(state=tk.NORMAL if unknown_face_found else tk.DISABLED)
-
-                self.update_video_label(processed_frame)
-
-            cap.release()
+            # Os eventos (uma linha por pessoa que aparece) são gravados em lote, em segundo plano
+            self.eventos = RegistroEventos(ARQUIVO_EVENTOS, fonte=self.video_source) if ARQUIVO_EVENTOS else None
+            try:
+                if self.workers > 0:
+                    self.video_loop_com_pool()
+                else:
+                    # Captura, detecção, codificação e exibição rodam em threads separadas
+                    pipeline = PipelineVideo(self.video_source, [
+                        ('deteccao', self.etapa_deteccao),
+                        ('codificacao', self.etapa_reconhecimento),
+                        ('exibicao', self.etapa_exibicao),
+                    ], nome='rostos')
+                    pipeline.executar(continuar=lambda: self.is_running)
+            finally:
+                if self.eventos is not None:
+                    self.eventos.encerrar()
         except Exception as e:
-            messagebox.showerror("Erro no Vídeo", str(e))
+            # Widgets e diálogos só na thread do Tk
+            self.root.after(0, messagebox.showerror, "Erro no Vídeo", str(e))
+        if self.detector_mudanca is not None:
+            self.detector_mudanca.imprimir_resumo()
         
         if self.is_running:
              self.root.after(10, self.stop_detection)
 
+    def video_loop_com_pool(self):
+        # Detecção e codificação vão para o pool; a coleta consome os resultados na ordem dos quadros
+        with PoolCodificacao(self.workers, ESCALA_DETECCAO, self.tipo_detector) as pool:
+            def etapa_despacho(quadro):
+                if self.cena_parada(quadro):
+                    return quadro
+                quadro['futuro'] = pool.submeter(quadro['frame'])
+                return quadro
+
+            pipeline = PipelineVideo(self.video_source, [
+                ('despacho', etapa_despacho),
+                ('codificacao', self.etapa_coleta_pool),
+                ('exibicao', self.etapa_exibicao),
+            ], tamanho_fila=pool.n_slots, nome='rostos')
+            pipeline.executar(continuar=lambda: self.is_running)
+
+    # --- Estágios do pipeline ---
+    def cena_parada(self, quadro):
+        # Quadro igual ao último detectado: os estágios seguintes repetem o último resultado
+        if self.detector_mudanca is None or self.detector_mudanca.deve_detectar(quadro['frame']):
+            return False
+        quadro['cena_parada'] = True
+        return True
+
+    def etapa_deteccao(self, quadro):
+        if self.cena_parada(quadro):
+            return quadro
+        if self.rastreador is not None:
+            return self.etapa_deteccao_rastreada(quadro)
+        quadro['rgb_reduzido'], quadro['locations'], quadro['escala'] = self.detectar_rostos(quadro['frame'])
+        return quadro
+
+    def etapa_deteccao_rastreada(self, quadro):
+        # Detecção completa só nos quadros-chave; entre eles as caixas são seguidas. As trilhas
+        # vivem no quadro reduzido, então aqui a escala é a da fonte, sem retentativa ampliada.
+        escala = self.detector.escala_para(quadro['frame'].shape)
+        with metricas.medir('rostos.redimensionar'):
+            small_frame = self.detector.reduzir(quadro['frame'], escala)
+        if self.rastreador.proximo_e_quadro_chave():
+            rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+            with metricas.medir('rostos.deteccao'):
+                locations = self.detector.detector.detectar(rgb_small_frame)
+            quadro['rgb_reduzido'] = rgb_small_frame
+            quadro['a_identificar'] = self.rastreador.associar([de_location(l) for l in locations], small_frame)
+        else:
+            with metricas.medir('rostos.rastreamento'):
+                self.rastreador.seguir(small_frame)
+            quadro['a_identificar'] = []
+        quadro['trilhas'] = [(trilha, para_quadro(para_location(trilha.caixa), escala)) for trilha in self.rastreador.trilhas]
+        return quadro
+
+    def etapa_reconhecimento(self, quadro):
+        if 'cena_parada' in quadro:
+            return self.etapa_desenho(quadro, *self.ultimo_resultado)
+        if 'trilhas' in quadro:
+            return self.etapa_reconhecimento_rastreado(quadro)
+        with metricas.medir('rostos.codificacao_dlib'):
+            encodings = face_recognition.face_encodings(quadro['rgb_reduzido'], quadro['locations'])
+        locations = [para_quadro(location, quadro['escala']) for location in quadro['locations']]
+        return self.etapa_anotacao(quadro, locations, encodings)
+
+    def etapa_reconhecimento_rastreado(self, quadro):
+        # Só trilhas novas (ou ainda desconhecidas) passam por codificação + comparação
+        novas = quadro['a_identificar']
+        if novas:
+            with metricas.medir('rostos.codificacao_dlib'):
+                encodings = face_recognition.face_encodings(quadro['rgb_reduzido'], [para_location(t.caixa) for t in novas])
+            with metricas.medir('rostos.comparacao'):
+                best_match_indices, distancias = self.comparador.identificar(encodings, TOLERANCIA)
+            for trilha, best_match_index, distancia in zip(novas, best_match_indices, distancias):
+                trilha.identidade, trilha.distancia = int(best_match_index), float(distancia)
+
+        locations = [location for _, location in quadro['trilhas']]
+        identidades = [-1 if trilha.identidade is None else trilha.identidade for trilha, _ in quadro['trilhas']]
+        self.registrar_eventos(quadro, locations, identidades, [trilha.distancia for trilha, _ in quadro['trilhas']],
+                               [trilha.id for trilha, _ in quadro['trilhas']])
+        return self.etapa_desenho(quadro, locations, identidades)
+
+    def etapa_coleta_pool(self, quadro):
+        if 'cena_parada' in quadro:
+            return self.etapa_desenho(quadro, *self.ultimo_resultado)
+        locations, encodings = quadro.pop('futuro').result()
+        return self.etapa_anotacao(quadro, locations, encodings)
+
+    def etapa_anotacao(self, quadro, locations, encodings):
+        # Uma única comparação (rostos x galeria) resolve todos os rostos do frame
+        with metricas.medir('rostos.comparacao'):
+            best_match_indices, distancias = self.comparador.identificar(encodings, TOLERANCIA)
+        self.registrar_eventos(quadro, locations, best_match_indices, distancias)
+        return self.etapa_desenho(quadro, locations, best_match_indices)
+
+    def registrar_eventos(self, quadro, locations, identidades, distancias, trilhas=None):
+        # Só deduplicação e enfileiramento; a gravação fica com a thread do RegistroEventos
+        if self.eventos is None:
+            return
+        for i, (identidade, (top, right, bottom, left)) in enumerate(zip(identidades, locations)):
+            identidade = int(identidade)
+            conhecido = identidade >= 0
+            self.eventos.registrar(
+                'rosto', quadro['capturado_em'], trilha=trilhas[i] if trilhas else None, identidade=identidade,
+                codigo=self.codigos_conhecidos[identidade] if conhecido else None,
+                rotulo=self.nomes_conhecidos[identidade] if conhecido else "Desconhecido",
+                distancia=distancias[i], caixa=(left, top, right, bottom))
+
+    def etapa_desenho(self, quadro, locations, identidades):
+        self.ultimo_resultado = (locations, identidades)
+        self.current_frame = quadro['frame'].copy()
+        quadro['frame'], unknown_face_found = self.desenhar_rostos(quadro['frame'], locations, identidades)
+        # Roda na thread do pipeline: o botão é atualizado pela thread do Tk, e só quando o estado muda
+        estado = tk.NORMAL if unknown_face_found else tk.DISABLED
+        if estado != self.estado_registro:
+            self.estado_registro = estado
+            self.root.after(0, lambda: self.btn_register.config(state=estado))
+        return quadro
+
+    def etapa_exibicao(self, quadro):
+        self.update_video_label(quadro['frame'])
+        return quadro
+
     def process_frame(self, frame):
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        
-        locations = face_recognition.face_locations(rgb_small_frame)
-        encodings = face_recognition.face_encodings(rgb_small_frame, locations)
-        
+        rgb_small_frame, locations, escala = self.detectar_rostos(frame)
+        with metricas.medir('rostos.codificacao_dlib'):
+            encodings = face_recognition.face_encodings(rgb_small_frame, locations)
+        return self.reconhecer_rostos(frame, [para_quadro(location, escala) for location in locations], encodings)
+
+    def detectar_rostos(self, frame, retentar=None):
+        # Escala escolhida pela resolução da fonte; locations nas coordenadas do quadro reduzido
+        return self.detector.detectar(frame, retentar)
+
+    def reconhecer_rostos(self, frame, locations, encodings):
+        # Uma única comparação (rostos x galeria) resolve todos os rostos do frame
+        with metricas.medir('rostos.comparacao'):
+            best_match_indices, _ = self.comparador.identificar(encodings, TOLERANCIA)
+        return self.desenhar_rostos(frame, locations, best_match_indices)
+
+    def desenhar_rostos(self, frame, locations, best_match_indices):
         unknown_face_found = False
-        for encoding, (top, right, bottom, left) in zip(encodings, locations):
-            matches = face_recognition.compare_faces(self.rostos_conhecidos_codificados, encoding, tolerance=TOLERANCIA)
+        for best_match_index, (top, right, bottom, left) in zip(best_match_indices, locations):
             name = "Desconhecido"
-            if True in matches:
-                # Encontra o melhor match em vez de apenas o primeiro
-                face_distances = face_recognition.face_distance(self.rostos_conhecidos_codificados, encoding)
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.nomes_conhecidos[best_match_index]
+            if best_match_index >= 0:
+                name = self.nomes_conhecidos[best_match_index]
             else:
                 unknown_face_found = True
 
-            top, right, bottom, left = top*4, right*4, bottom*4, left*4
             color = (0, 0, 255) if name == "Desconhecido" else (0, 255, 0)
             cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
             cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
@@ -220,53 +373,58 @@ class FaceRecognitionApp:
         return frame, unknown_face_found
 
     def update_video_label(self, frame):
-        try:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(rgb_frame)
-            
-            w, h = pil_image.size
-            max_w = self.video_label.winfo_width()
-            max_h = self.video_label.winfo_height()
-            if w > max_w or h > max_h:
-                pil_image.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
-            
-            tk_image = ImageTk.PhotoImage(image=pil_image)
-            self.video_label.config(image=tk_image, text="")
-            self.video_label.image = tk_image
-        except:
-             pass
+        # Chamado da thread de vídeo: o renderizador reduz o quadro aqui e só o desenha na thread do Tk
+        self.renderizador.enviar(frame)
 
     def registrar_rosto(self):
         if self.current_frame is None: return
 
+        # Detecta no quadro reduzido (rápido mesmo em 1080p/4K, com retentativa ampliada se não
+        # achar ninguém) e codifica no quadro inteiro, para a amostra guardada ter a melhor qualidade
+        _, locations, escala = self.detectar_rostos(self.current_frame, retentar=True)
+        locations = [para_quadro(location, escala) for location in locations]
         rgb_frame = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2RGB)
-        locations = face_recognition.face_locations(rgb_frame)
         encodings = face_recognition.face_encodings(rgb_frame, locations)
 
         face_to_register = None
-        for encoding, location in zip(encodings, locations):
-            matches = face_recognition.compare_faces(self.rostos_conhecidos_codificados, encoding, tolerance=TOLERANCIA)
-            if not any(matches):
+        rosto_conhecido = None
+        best_match_indices, _ = self.comparador.identificar(encodings, TOLERANCIA)
+        for best_match_index, encoding, location in zip(best_match_indices, encodings, locations):
+            if best_match_index < 0:
                 face_to_register = (encoding, location)
                 break
-        
-        if face_to_register is None:
-            messagebox.showwarning("Registro", "Nenhum rosto desconhecido encontrado para registrar.")
-            return
-
-        nome = simpledialog.askstring("Registro", "Digite o nome completo:", parent=self.root)
-        if not nome: return
-        codigo = simpledialog.askstring("Registro", "Digite o codigo:", parent=self.root)
-        if not codigo: return
+            if rosto_conhecido is None:
+                rosto_conhecido = (best_match_index, encoding, location)
 
-        encoding, location = face_to_register
-        salvar_dados(codigo, nome, encoding)
+        if face_to_register is None:
+            if rosto_conhecido is None:
+                messagebox.showwarning("Registro", "Nenhum rosto desconhecido encontrado para registrar.")
+                return
+            # Só rostos conhecidos: a foto pode reforçar o cadastro com outra luz/pose
+            indice, encoding, location = rosto_conhecido
+            codigo, nome = self.codigos_conhecidos[indice], self.nomes_conhecidos[indice]
+            if not messagebox.askyesno("Registro", f"Nenhum rosto desconhecido. Adicionar esta foto como nova amostra de '{nome}'?"):
+                return
+            nova_amostra = True
+        else:
+            nome = simpledialog.askstring("Registro", "Digite o nome completo:", parent=self.root)
+            if not nome: return
+            codigo = simpledialog.askstring("Registro", "Digite o codigo:", parent=self.root)
+            if not codigo: return
+            encoding, location = face_to_register
+            nova_amostra = False
+            if obter_galeria(arquivo_json=ARQUIVO_DADOS).indice_do_codigo(codigo) is not None:
+                nova_amostra = messagebox.askyesno(
+                    "Registro", f"O código '{codigo}' já está cadastrado. Adicionar esta foto como nova amostra?\n"
+                                "(Não substitui o cadastro pela foto nova.)")
+
+        indice = salvar_dados(codigo, nome, encoding, nova_amostra)
         
         if self.save_photo.get():
             self.salvar_referencia_foto(codigo, nome, location)
 
         messagebox.showinfo("Sucesso", f"Pessoa '{nome}' registrada com sucesso!")
-        self.carregar_dados_conhecidos()
+        self.adicionar_conhecido(indice, codigo, nome)
 
     def salvar_referencia_foto(self, codigo, nome, location):
         if not os.path.exists(PASTA_FOTOS):
@@ -278,9 +436,41 @@ class FaceRecognitionApp:
         print(f"Foto de referência salva em: {caminho_foto}")
 
     def carregar_dados_conhecidos(self):
-        self.rostos_conhecidos_codificados, self.codigos_conhecidos, self.nomes_conhecidos = carregar_dados_salvos()
+        _, self.codigos_conhecidos, self.nomes_conhecidos = carregar_dados_salvos()
+        self.comparador = criar_comparador(TIPO_INDICE, obter_galeria(arquivo_json=ARQUIVO_DADOS))
         print(f"[Sistema] {len(self.nomes_conhecidos)} rostos conhecidos carregados.")
 
+    def acompanhar_galeria(self):
+        # Cadastros feitos por outros processos chegam pelo log da galeria, sem recarregar tudo
+        galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+        alterados = galeria.acompanhar()
+        if alterados is None:
+            self.carregar_dados_conhecidos()  # O log foi compactado por outro processo
+        else:
+            for indice in alterados:
+                self.adicionar_conhecido(indice, galeria.codigos[indice], galeria.nomes[indice])
+        self._agendamentos['acompanhar'] = self.root.after(INTERVALO_ACOMPANHAMENTO, self.acompanhar_galeria)
+
+    def adicionar_conhecido(self, indice, codigo, nome):
+        # Atualiza o índice em memória (protótipo e amostras da pessoa) sem recarregar a galeria inteira
+        galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+        # O `adicionar` de um cadastro local pode ter lido antes pessoas cadastradas por outros
+        # processos (que `acompanhar` ainda não entregou): elas entram primeiro, em ordem
+        for anterior in range(len(self.nomes_conhecidos), indice):
+            self._aplicar_conhecido(galeria, anterior, galeria.codigos[anterior], galeria.nomes[anterior])
+        self._aplicar_conhecido(galeria, indice, codigo, nome)
+        if self.rastreador is not None:
+            self.rastreador.reidentificar_desconhecidas()
+
+    def _aplicar_conhecido(self, galeria, indice, codigo, nome):
+        if indice == len(self.nomes_conhecidos):
+            self.codigos_conhecidos.append(codigo)
+            self.nomes_conhecidos.append(nome)
+        else:
+            self.codigos_conhecidos[indice] = codigo
+            self.nomes_conhecidos[indice] = nome
+        self.comparador.atualizar(indice, galeria.codificacoes[indice], galeria.amostras_da_pessoa(indice))
+
     def listar_pessoas(self):
         _, codigos, nomes = carregar_dados_salvos()
         if not nomes:
@@ -291,6 +481,10 @@ class FaceRecognitionApp:
 
     def on_closing(self):
         self.is_running = False
+        for agendamento in self._agendamentos.values():
+            self.root.after_cancel(agendamento)
+        self._agendamentos.clear()
+        self.renderizador.parar()
         if self.detection_thread:
             self.detection_thread.join(timeout=1)
         self.root.destroy()
@@ -298,6 +492,22 @@ class FaceRecognitionApp:
 
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sistema de Reconhecimento Facial")
+    parser.add_argument('--workers', type=int, default=WORKERS_CODIFICACAO,
+                        help="Processos para detecção/codificação de rostos (0 = na thread do pipeline)")
+    parser.add_argument('--detector', choices=TIPOS_DETECTOR, default=DETECTOR_ROSTOS,
+                        help="Detector de rostos (o 'yunet' precisa do modelo .onnx, ver detectores_rosto.py)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Imprime o tempo de cada importação/etapa até a janela aparecer")
+    adicionar_argumentos_metricas(parser)
+    args = parser.parse_args()
+    exportador = configurar_metricas(args)
+
     root = tk.Tk()
-    app = FaceRecognitionApp(root)
-    root.mainloop()
\ No newline at end of file
+    with perfil.etapa("montar interface"):
+        app = FaceRecognitionApp(root, workers=args.workers, detector=args.detector)
+    reportar_janela_pronta(root, "faces_detection.py", detalhar=args.profile_startup)
+    root.mainloop()
+    if exportador is not None:
+        exportador.encerrar()
\ No newline at end of file
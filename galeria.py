@@ -0,0 +1,417 @@
+import json
+import os
+import numpy as np
+
+# --- Constantes ---
+ARQUIVO_DADOS = 'dados_registrados.json'
+PASTA_GALERIA = 'galeria_rostos'
+ARQUIVO_CODIFICACOES = 'codificacoes.npy'
+ARQUIVO_PESSOAS = 'pessoas.jsonl'
+ARQUIVO_AMOSTRAS = 'amostras.npy'
+DIMENSAO_CODIFICACAO = 128
+CAPACIDADE_INICIAL = 1024
+LIMITE_LINHAS_LOG = 1000  # Compacta o log quando ele passa disso (e do dobro de pessoas)
+MAX_AMOSTRAS_POR_PESSOA = 10  # Acima disso a amostra mais antiga sai do protótipo
+
+
+class GaleriaRostos:
+    """Galeria de rostos em disco: matriz de codificações mapeada em memória + sidecar de pessoas.
+
+    As codificações ficam em uma única matriz contígua (`codificacoes.npy`) aberta com
+    `mmap_mode`, então abrir a galeria não lê as codificações. Códigos e nomes ficam em
+    `pessoas.jsonl`, um arquivo só de acréscimo: cada linha associa uma linha da matriz a
+    um código/nome, e a última linha de um mesmo índice vence. Uma linha só é escrita
+    depois que a codificação correspondente foi gravada, então ela é o ponto de commit.
+    Ao atualizar quem já está cadastrado, a linha da pessoa na matriz não é sobrescrita
+    antes do log: o protótipo novo vai para uma linha livre de `amostras.npy`, o log
+    aponta para ela (`'prototipo'`) e quem aplica o registro a copia para a linha da
+    pessoa (o próprio escritor, os outros processos ou quem reabre depois de uma queda).
+
+    O sidecar funciona como log: `compactar` (chamado por `adicionar` quando o log cresce
+    demais) o reescreve com uma linha por pessoa e troca o arquivo atomicamente, e outros
+    processos (ex.: o login) recebem os cadastros chamando `acompanhar` periodicamente.
+    Vários leitores são suportados; escritores devem se revezar, não escrever ao mesmo tempo.
+
+    Uma pessoa pode ter várias amostras (fotos com luz/pose diferentes, via
+    `adicionar_amostra`). Elas ficam em uma segunda matriz (`amostras.npy`) e a linha
+    do log lista as linhas dela (`'amostras': [...]`); a linha da pessoa em
+    `codificacoes.npy` passa a guardar o protótipo (a média das amostras). Assim os
+    índices de busca continuam com uma linha por pessoa e só olham as amostras dos
+    candidatos mais próximos (ver prototipos.py). Pessoas com uma única foto não
+    usam a matriz de amostras.
+    """
+
+    def __init__(self, pasta=PASTA_GALERIA, dtype=np.float64, somente_leitura=False):
+        self.pasta = pasta
+        self.dtype = np.dtype(dtype)
+        self.somente_leitura = somente_leitura
+        self.caminho_codificacoes = os.path.join(pasta, ARQUIVO_CODIFICACOES)
+        self.caminho_pessoas = os.path.join(pasta, ARQUIVO_PESSOAS)
+        self.caminho_amostras = os.path.join(pasta, ARQUIVO_AMOSTRAS)
+
+        self.codigos = []
+        self.nomes = []
+        self.amostras = []         # Por pessoa: linhas de `amostras.npy`, ou None (só o protótipo)
+        self._indice_por_codigo = {}
+        self._matriz = None
+        self._matriz_amostras = None
+        self._proxima_amostra = 0  # Primeira linha livre de `amostras.npy`
+        self._posicao_log = 0      # Bytes do log já aplicados (fim da última linha completa)
+        self._linhas_log = 0
+        self._geracao = None       # Muda a cada compactação (linha de cabeçalho do log)
+        self._pendentes = []       # Índices alterados por outros processos ainda não entregues por `acompanhar`
+        self._relida = False
+        self.abrir()
+
+    def abrir(self):
+        """Mapeia a matriz de codificações e lê o sidecar de pessoas."""
+        if not os.path.exists(self.caminho_codificacoes):
+            if self.somente_leitura:
+                self._matriz = np.empty((0, DIMENSAO_CODIFICACAO), dtype=self.dtype)
+                return
+            os.makedirs(self.pasta, exist_ok=True)
+            self._criar_matriz(self.caminho_codificacoes, CAPACIDADE_INICIAL).flush()
+
+        self._mapear_matriz()
+        self._ler_pessoas()
+
+    def _mapear_matriz(self):
+        modo = 'r' if self.somente_leitura else 'r+'
+        self._matriz = np.load(self.caminho_codificacoes, mmap_mode=modo)
+        self.dtype = self._matriz.dtype
+        self._matriz_amostras = None
+        if os.path.exists(self.caminho_amostras):
+            self._matriz_amostras = np.load(self.caminho_amostras, mmap_mode=modo)
+
+    def _criar_matriz(self, caminho, capacidade):
+        return np.lib.format.open_memmap(
+            caminho, mode='w+', dtype=self.dtype, shape=(capacidade, DIMENSAO_CODIFICACAO))
+
+    def _ler_pessoas(self):
+        self.codigos, self.nomes, self.amostras, self._indice_por_codigo = [], [], [], {}
+        self._proxima_amostra = 0
+        self._posicao_log, self._linhas_log, self._geracao = 0, 0, None
+        if not os.path.exists(self.caminho_pessoas):
+            return
+        self._ler_log()
+
+    def _ler_log(self):
+        """Aplica as linhas completas a partir de `_posicao_log`. Retorna os índices alterados."""
+        alterados = []
+        with open(self.caminho_pessoas, 'rb') as f:
+            f.seek(self._posicao_log)
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break  # Linha incompleta: ainda sendo escrita, ou o processo caiu no meio da escrita
+                try:
+                    registro = json.loads(linha)
+                    if self._posicao_log == 0 and 'geracao' in registro:
+                        self._geracao = registro['geracao']
+                        self._posicao_log += len(linha)
+                        continue
+                    self._aplicar_registro(registro['indice'], registro['codigo'], registro['nome'],
+                                           registro.get('amostras'), registro.get('prototipo'))
+                except (json.JSONDecodeError, KeyError):
+                    break
+                self._posicao_log += len(linha)
+                self._linhas_log += 1
+                alterados.append(registro['indice'])
+        return alterados
+
+    def _aplicar_registro(self, indice, codigo, nome, amostras=None, prototipo=None):
+        if indice == len(self.codigos):
+            self.codigos.append(codigo)
+            self.nomes.append(nome)
+            self.amostras.append(amostras)
+        else:
+            antigo = self.codigos[indice]
+            if self._indice_por_codigo.get(antigo) == indice:
+                del self._indice_por_codigo[antigo]
+            self.codigos[indice] = codigo
+            self.nomes[indice] = nome
+            self.amostras[indice] = amostras
+        self._indice_por_codigo[codigo] = indice
+        if amostras:
+            self._proxima_amostra = max(self._proxima_amostra, max(amostras) + 1)
+        if prototipo is not None:
+            self._proxima_amostra = max(self._proxima_amostra, prototipo + 1)
+            self._copiar_prototipo(indice, prototipo)
+
+    def _copiar_prototipo(self, indice, linha):
+        """Copia para a linha da pessoa o protótipo que o registro guardou em `amostras.npy`.
+
+        Idempotente; uma galeria somente leitura fica com a linha que o escritor copiar.
+        """
+        if self.somente_leitura or self._matriz_amostras is None or linha >= len(self._matriz_amostras):
+            return
+        if not np.array_equal(self._matriz[indice], self._matriz_amostras[linha]):
+            self._matriz[indice] = self._matriz_amostras[linha]
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def capacidade(self):
+        return self._matriz.shape[0]
+
+    @property
+    def codificacoes(self):
+        """Visão (sem cópia) das linhas ocupadas da matriz."""
+        return self._matriz[:len(self.codigos)]
+
+    def indice_do_codigo(self, codigo):
+        return self._indice_por_codigo.get(codigo)
+
+    def amostras_da_pessoa(self, indice):
+        """Cópia das amostras de uma pessoa (k x 128); só o protótipo para quem tem uma foto."""
+        linhas = self.amostras[indice]
+        if not linhas:
+            return np.array(self._matriz[indice:indice + 1])
+        return self._matriz_amostras[linhas]
+
+    def adicionar(self, codigo, nome, codificacao_rosto):
+        """Insere ou atualiza (upsert) uma pessoa sem reescrever a galeria. Retorna o índice.
+
+        Substitui todas as amostras da pessoa por esta codificação; para acumular fotos
+        use `adicionar_amostra`.
+        """
+        if self.somente_leitura:
+            raise IOError("A galeria foi aberta somente para leitura.")
+        self._sincronizar()  # Outro processo pode ter cadastrado pessoas desde a última leitura
+        return self._gravar(codigo, nome, codificacao_rosto, None)
+
+    def adicionar_amostra(self, codigo, nome, codificacao_rosto):
+        """Acrescenta uma foto a uma pessoa (ou a cadastra) e recalcula o protótipo. Retorna o índice.
+
+        Guarda até MAX_AMOSTRAS_POR_PESSOA amostras; a mais antiga sai quando passa disso.
+        """
+        if self.somente_leitura:
+            raise IOError("A galeria foi aberta somente para leitura.")
+        self._sincronizar()
+        indice = self._indice_por_codigo.get(codigo)
+        if indice is None:
+            return self._gravar(codigo, nome, codificacao_rosto, None)
+
+        linhas = list(self.amostras[indice] or [])
+        if not linhas:
+            # Pessoa com uma foto só: o protótipo atual vira a primeira amostra
+            linhas.append(self._nova_amostra(self._matriz[indice]))
+        linhas.append(self._nova_amostra(codificacao_rosto))
+        linhas = linhas[-MAX_AMOSTRAS_POR_PESSOA:]
+        self._matriz_amostras.flush()
+        prototipo = self._matriz_amostras[linhas].mean(axis=0)
+        return self._gravar(codigo, nome, prototipo, linhas)
+
+    def adicionar_lote(self, pessoas):
+        """Insere ou atualiza várias pessoas com um único flush e um único write no log.
+
+        `pessoas` é uma lista de (codigo, nome, codificacoes), com uma ou mais codificações
+        (k x 128) por pessoa; com mais de uma, elas viram as amostras e o protótipo é a
+        média, como em `adicionar_amostra`. Como em `adicionar`, as amostras anteriores de
+        quem já estava cadastrado são substituídas. Retorna os índices, na ordem de `pessoas`.
+        """
+        if self.somente_leitura:
+            raise IOError("A galeria foi aberta somente para leitura.")
+        self._sincronizar()
+        indice_por_codigo = dict(self._indice_por_codigo)
+        for codigo, _, _ in pessoas:
+            indice_por_codigo.setdefault(codigo, len(indice_por_codigo))
+        self._garantir_capacidade(len(indice_por_codigo))
+
+        registros = []
+        for codigo, nome, codificacoes in pessoas:
+            codificacoes = np.asarray(codificacoes, dtype=self.dtype).reshape(-1, DIMENSAO_CODIFICACAO)
+            codificacoes = codificacoes[-MAX_AMOSTRAS_POR_PESSOA:]
+            registro = {'indice': indice_por_codigo[codigo], 'codigo': codigo, 'nome': nome}
+            if len(codificacoes) > 1:
+                registro['amostras'] = [self._nova_amostra(c) for c in codificacoes]
+            if registro['indice'] < len(self.codigos):
+                registro['prototipo'] = self._nova_amostra(codificacoes.mean(axis=0))  # Ver `_gravar`
+            else:
+                self._matriz[registro['indice']] = codificacoes.mean(axis=0)
+            registros.append(registro)
+        if self._matriz_amostras is not None:
+            self._matriz_amostras.flush()
+        self._matriz.flush()
+
+        # O log vem por último: é o ponto de commit de todas as pessoas do lote
+        self._anexar_log(registros)
+        for registro in registros:
+            self._aplicar_registro(registro['indice'], registro['codigo'], registro['nome'],
+                                   registro.get('amostras'), registro.get('prototipo'))
+        self._matriz.flush()
+        if self._linhas_log > max(LIMITE_LINHAS_LOG, 2 * len(self.codigos)):
+            self.compactar()
+        return [registro['indice'] for registro in registros]
+
+    def _gravar(self, codigo, nome, prototipo, amostras):
+        indice = self._indice_por_codigo.get(codigo)
+        registro = {'indice': len(self.codigos) if indice is None else indice, 'codigo': codigo, 'nome': nome}
+        if amostras:
+            registro['amostras'] = amostras
+        if indice is None:
+            # Pessoa nova: a linha fica depois das ocupadas, ninguém a lê antes do log
+            indice = registro['indice']
+            self._garantir_capacidade(indice + 1)
+            self._matriz[indice] = prototipo
+            self._matriz.flush()
+        else:
+            # Pessoa existente: a linha atual vale até o log; o protótipo novo só é copiado para ela depois
+            registro['prototipo'] = self._nova_amostra(prototipo)
+            self._matriz_amostras.flush()
+        self._anexar_log([registro])
+        self._aplicar_registro(indice, codigo, nome, amostras, registro.get('prototipo'))
+        self._matriz.flush()
+        if self._linhas_log > max(LIMITE_LINHAS_LOG, 2 * len(self.codigos)):
+            self.compactar()
+        return indice
+
+    def _nova_amostra(self, codificacao_rosto):
+        """Grava uma codificação na próxima linha livre de `amostras.npy` e retorna a linha."""
+        linha = self._proxima_amostra
+        if self._matriz_amostras is None:
+            self._criar_matriz(self.caminho_amostras, CAPACIDADE_INICIAL).flush()
+            self._matriz_amostras = np.load(self.caminho_amostras, mmap_mode='r+')
+        self._matriz_amostras = self._crescer('_matriz_amostras', self.caminho_amostras, linha, linha + 1)
+        self._matriz_amostras[linha] = codificacao_rosto
+        self._proxima_amostra = linha + 1
+        return linha
+
+    def _anexar_log(self, registros):
+        linhas = b''.join((json.dumps(r, ensure_ascii=False) + '\n').encode('utf-8') for r in registros)
+        with open(self.caminho_pessoas, 'r+b' if os.path.exists(self.caminho_pessoas) else 'wb') as f:
+            # Escreve logo após a última linha completa, descartando o resto de uma escrita interrompida
+            f.seek(self._posicao_log)
+            f.write(linhas)
+            f.truncate()
+            self._posicao_log = f.tell()
+        self._linhas_log += len(registros)
+
+    def compactar(self):
+        """Reescreve o log com uma linha por pessoa e o troca atomicamente (os.replace)."""
+        caminho_tmp = self.caminho_pessoas + '.tmp'
+        geracao = os.urandom(8).hex()
+        with open(caminho_tmp, 'wb') as f:
+            # O cabeçalho identifica esta versão do log para quem o acompanha
+            f.write((json.dumps({'geracao': geracao}) + '\n').encode('utf-8'))
+            for indice, (codigo, nome, amostras) in enumerate(zip(self.codigos, self.nomes, self.amostras)):
+                registro = {'indice': indice, 'codigo': codigo, 'nome': nome}
+                if amostras:
+                    registro['amostras'] = amostras
+                f.write((json.dumps(registro, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            posicao = f.tell()
+        os.replace(caminho_tmp, self.caminho_pessoas)
+        self._posicao_log, self._linhas_log, self._geracao = posicao, len(self.codigos), geracao
+
+    def _sincronizar(self):
+        try:
+            tamanho = os.path.getsize(self.caminho_pessoas)
+            geracao = _geracao_do_log(self.caminho_pessoas)
+        except FileNotFoundError:
+            return
+        if geracao != self._geracao or tamanho < self._posicao_log:
+            # Log compactado (ou recriado) por outro processo: relê tudo
+            self.abrir()
+            self._pendentes, self._relida = [], True
+        elif tamanho > self._posicao_log:
+            # As matrizes podem ter crescido (arquivo novo) no outro processo, e o log novo aponta para elas
+            self._mapear_matriz()
+            self._pendentes.extend(self._ler_log())
+
+    def acompanhar(self):
+        """Aplica o que outros processos acrescentaram ao log desde a última leitura.
+
+        Retorna os índices alterados (na ordem do log; as codificações já estão em
+        `codificacoes`), ou None se o log foi compactado por outro processo: nesse caso a
+        galeria foi relida por inteiro e quem mantém um índice em memória deve reconstruí-lo.
+        """
+        self._sincronizar()
+        if self._relida:
+            self._relida, self._pendentes = False, []
+            return None
+        alterados, self._pendentes = self._pendentes, []
+        return alterados
+
+    def _garantir_capacidade(self, necessario):
+        self._matriz = self._crescer('_matriz', self.caminho_codificacoes, len(self.codigos), necessario)
+
+    def _crescer(self, atributo, caminho, usadas, necessario):
+        """Dobra a capacidade de uma das matrizes quando ela enche (custo amortizado O(1) por inserção)."""
+        matriz = getattr(self, atributo)
+        if necessario <= matriz.shape[0]:
+            return matriz
+        caminho_tmp = caminho + '.tmp'
+        nova_matriz = self._criar_matriz(caminho_tmp, max(necessario, matriz.shape[0] * 2))
+        nova_matriz[:usadas] = matriz[:usadas]
+        nova_matriz.flush()
+        # Solta os mapeamentos antes de trocar o arquivo (necessário no Windows)
+        del nova_matriz, matriz
+        setattr(self, atributo, None)
+        os.replace(caminho_tmp, caminho)
+        return np.load(caminho, mmap_mode='r+')
+
+
+def _geracao_do_log(caminho):
+    """Geração gravada no cabeçalho por `compactar` (None se o log nunca foi compactado)."""
+    with open(caminho, 'rb') as f:
+        primeira = f.readline()
+    try:
+        return json.loads(primeira).get('geracao')
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def migrar_json(arquivo_json=ARQUIVO_DADOS, pasta=PASTA_GALERIA, dtype=np.float64):
+    """Converte o antigo `dados_registrados.json` para a galeria binária em uma única escrita."""
+    with open(arquivo_json, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+
+    # Deduplica por código mantendo a última ocorrência, como o antigo salvar_dados
+    por_codigo = {}
+    for item in dados:
+        por_codigo[item['codigo']] = item
+    itens = list(por_codigo.values())
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho_codificacoes = os.path.join(pasta, ARQUIVO_CODIFICACOES)
+    capacidade = max(CAPACIDADE_INICIAL, len(itens))
+    matriz = np.lib.format.open_memmap(
+        caminho_codificacoes, mode='w+', dtype=np.dtype(dtype), shape=(capacidade, DIMENSAO_CODIFICACAO))
+    for i, item in enumerate(itens):
+        matriz[i] = item['codificacao']
+    matriz.flush()
+    del matriz
+
+    with open(os.path.join(pasta, ARQUIVO_PESSOAS), 'w', encoding='utf-8') as f:
+        for i, item in enumerate(itens):
+            f.write(json.dumps({'indice': i, 'codigo': item['codigo'], 'nome': item['nome']}, ensure_ascii=False) + '\n')
+
+    print(f"[Galeria] {len(itens)} rostos migrados de '{arquivo_json}' para '{pasta}'.")
+    return len(itens)
+
+
+_galerias_abertas = {}
+
+def obter_galeria(pasta=PASTA_GALERIA, arquivo_json=ARQUIVO_DADOS, somente_leitura=False):
+    """Retorna a galeria do processo, migrando o JSON antigo na primeira execução.
+
+    Com `somente_leitura` (ex.: workers de um pool), nada é migrado nem criado em disco.
+    """
+    chave = (os.path.abspath(pasta), somente_leitura)
+    if chave not in _galerias_abertas:
+        if not somente_leitura and not os.path.exists(os.path.join(pasta, ARQUIVO_CODIFICACOES)) and os.path.exists(arquivo_json):
+            try:
+                migrar_json(arquivo_json, pasta)
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"[Galeria] Não foi possível migrar '{arquivo_json}': {e}")
+        _galerias_abertas[chave] = GaleriaRostos(pasta, somente_leitura=somente_leitura)
+    return _galerias_abertas[chave]
+
+
+if __name__ == "__main__":
+    import sys
+    origem = sys.argv[1] if len(sys.argv) > 1 else ARQUIVO_DADOS
+    destino = sys.argv[2] if len(sys.argv) > 2 else PASTA_GALERIA
+    migrar_json(origem, destino)
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import queue
+import tarfile
+import threading
+import time
+from datetime import datetime
+from inicializacao import importacao_preguicosa
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+MODO_JPG = 'jpg'   # Um arquivo .jpg por recorte (formato original)
+MODO_TAR = 'tar'   # Recortes empacotados em arquivos .tar rotativos + índice JSONL
+TAMANHO_FILA = 256
+WORKERS_CODIFICACAO = 2
+SEGUNDOS_POR_ARQUIVO = 60
+QUALIDADE_JPEG = 90
+ARQUIVO_INDICE = 'indice.jsonl'
+LIMITE_TRILHAS_LEMBRADAS = 10000
+
+
+class GravadorRecortes:
+    """Grava recortes de detecções em segundo plano, fora da thread de detecção.
+
+    `enfileirar` só copia o recorte para uma fila limitada (se a fila encher, o recorte
+    é descartado e contado). Um pool de threads faz o `cv2.imencode` (que libera o GIL)
+    e grava em disco: arquivos .jpg soltos ou, no modo 'tar', pacotes .tar que giram a
+    cada `segundos_por_arquivo`, com um índice JSONL. Com `id_trilha`, cada trilha é
+    salva no máximo uma vez a cada `intervalo_por_trilha` segundos (None = só uma vez).
+    """
+
+    def __init__(self, pasta, prefixo='carro', modo=MODO_JPG, workers=WORKERS_CODIFICACAO,
+                 tamanho_fila=TAMANHO_FILA, segundos_por_arquivo=SEGUNDOS_POR_ARQUIVO, intervalo_por_trilha=None):
+        self.pasta = pasta
+        self.prefixo = prefixo
+        self.modo = modo
+        self.segundos_por_arquivo = segundos_por_arquivo
+        self.intervalo_por_trilha = intervalo_por_trilha
+        self.salvos = 0
+        self.descartados = 0
+        self.duplicados = 0
+
+        os.makedirs(pasta, exist_ok=True)
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._ultimo_por_trilha = {}
+        self._trava_pacote = threading.Lock()
+        self._trava_contagem = threading.Lock()  # `salvos` é incrementado por várias threads
+        self._pacote = None
+        self._pacote_nome = None
+        self._pacote_inicio = 0.0
+        self._indice = open(os.path.join(pasta, ARQUIVO_INDICE), 'a', encoding='utf-8') if modo == MODO_TAR else None
+        self._threads = [threading.Thread(target=self._trabalhar, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def enfileirar(self, recorte, timestamp=None, id_trilha=None):
+        """Agenda a gravação de um recorte BGR. Retorna False se foi descartado ou duplicado."""
+        timestamp = time.time() if timestamp is None else timestamp
+        if id_trilha is not None:
+            ultimo = self._ultimo_por_trilha.get(id_trilha)
+            if ultimo is not None and (self.intervalo_por_trilha is None or timestamp - ultimo < self.intervalo_por_trilha):
+                self.duplicados += 1
+                return False
+            self._ultimo_por_trilha.pop(id_trilha, None)
+            self._ultimo_por_trilha[id_trilha] = timestamp
+            if len(self._ultimo_por_trilha) > LIMITE_TRILHAS_LEMBRADAS:
+                # Esquece a trilha vista há mais tempo (ordem de inserção do dict)
+                del self._ultimo_por_trilha[next(iter(self._ultimo_por_trilha))]
+        try:
+            # Copia: o frame original continua sendo desenhado pela thread de detecção
+            self._fila.put_nowait((recorte.copy(), timestamp, id_trilha))
+            return True
+        except queue.Full:
+            self.descartados += 1
+            return False
+
+    def _trabalhar(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            recorte, timestamp, id_trilha = item
+            try:
+                ok, jpeg = cv2.imencode('.jpg', recorte, [cv2.IMWRITE_JPEG_QUALITY, QUALIDADE_JPEG])
+                if ok:
+                    self._gravar(jpeg.tobytes(), timestamp, id_trilha)
+                    with self._trava_contagem:
+                        self.salvos += 1
+            except Exception as e:
+                print(f"[Gravador] Erro ao salvar recorte: {e}")
+
+    def _nome_arquivo(self, timestamp, id_trilha):
+        nome = f"{self.prefixo}_{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S-%f')}"
+        if id_trilha is not None:
+            nome += f"_t{id_trilha}"
+        return nome + '.jpg'
+
+    def _gravar(self, dados, timestamp, id_trilha):
+        nome = self._nome_arquivo(timestamp, id_trilha)
+        if self.modo != MODO_TAR:
+            with open(os.path.join(self.pasta, nome), 'wb') as f:
+                f.write(dados)
+            return
+
+        with self._trava_pacote:
+            if self._pacote is None or timestamp - self._pacote_inicio >= self.segundos_por_arquivo:
+                self._abrir_pacote(timestamp)
+            info = tarfile.TarInfo(nome)
+            info.size = len(dados)
+            info.mtime = timestamp
+            self._pacote.addfile(info, io.BytesIO(dados))
+            self._indice.write(json.dumps({
+                'pacote': self._pacote_nome, 'arquivo': nome, 'timestamp': timestamp, 'trilha': id_trilha}) + '\n')
+
+    def _abrir_pacote(self, timestamp):
+        self._fechar_pacote()
+        self._pacote_nome = f"{self.prefixo}_{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S')}.tar"
+        self._pacote = tarfile.open(os.path.join(self.pasta, self._pacote_nome), 'a')
+        self._pacote_inicio = timestamp
+
+    def _fechar_pacote(self):
+        if self._pacote is not None:
+            self._pacote.close()
+            self._pacote = None
+        if self._indice is not None:
+            self._indice.flush()
+
+    def encerrar(self):
+        """Espera a fila esvaziar, para as threads e fecha o pacote atual."""
+        for _ in self._threads:
+            self._fila.put(None)
+        for thread in self._threads:
+            thread.join()
+        with self._trava_pacote:
+            self._fechar_pacote()
+            if self._indice is not None:
+                self._indice.close()
+                self._indice = None
+        print(f"[Gravador] {self.salvos} recortes salvos, {self.duplicados} duplicados ignorados, "
+              f"{self.descartados} descartados por fila cheia.")
@@ -0,0 +1,406 @@
+import heapq
+import math
+import time
+import numpy as np
+
+from correspondencia import ComparadorRostos, DIMENSAO_CODIFICACAO, DTYPE_PADRAO
+
+# --- Constantes ---
+TIPO_INDICE_PADRAO = 'exato'
+LIMIAR_TREINO_IVF = 2048   # Abaixo disso o IVF faz varredura exata
+ITERACOES_KMEANS = 10
+
+
+def _distancias_quadradas(consultas, base):
+    """||a||² + ||b||² - 2a·b para todos os pares (consultas x base)."""
+    d2 = consultas @ base.T
+    d2 *= -2.0
+    d2 += np.einsum('ij,ij->i', consultas, consultas)[:, None]
+    d2 += np.einsum('ij,ij->i', base, base)[None, :]
+    return np.maximum(d2, 0.0, out=d2)
+
+
+def kmeans(dados, k, iteracoes=ITERACOES_KMEANS, semente=0):
+    """K-means simples em NumPy (inicialização aleatória, iterações de Lloyd)."""
+    rng = np.random.default_rng(semente)
+    centroides = dados[rng.choice(len(dados), size=k, replace=False)].copy()
+    for _ in range(iteracoes):
+        atribuicao = np.argmin(_distancias_quadradas(dados, centroides), axis=1)
+        contagens = np.bincount(atribuicao, minlength=k)
+        somas = np.zeros_like(centroides)
+        np.add.at(somas, atribuicao, dados)
+        ocupados = contagens > 0
+        centroides[ocupados] = somas[ocupados] / contagens[ocupados, None]
+        # Clusters vazios recebem um ponto aleatório para não desperdiçar listas
+        vazios = np.flatnonzero(~ocupados)
+        if len(vazios):
+            centroides[vazios] = dados[rng.choice(len(dados), size=len(vazios), replace=False)]
+    return centroides
+
+
+class IndiceIVF:
+    """Índice invertido (IVF) com quantizador grosso por k-means.
+
+    Cada codificação vai para a lista do centróide mais próximo; a busca só calcula
+    distâncias para as `n_sondas` listas mais próximas da consulta. Inserções são
+    incrementais e o quantizador é retreinado quando a galeria dobra de tamanho.
+    """
+
+    def __init__(self, n_listas=None, n_sondas=8, dtype=DTYPE_PADRAO):
+        self.n_listas_fixo = n_listas
+        self.n_sondas = n_sondas
+        self._dados = ComparadorRostos(dtype=dtype)
+        self._centroides = None
+        self._listas = []
+        self._listas_cache = {}
+        self._atribuicao = []
+        self._tamanho_no_treino = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    @property
+    def dtype(self):
+        return self._dados.dtype
+
+    @property
+    def memoria_bytes(self):
+        return self._dados.memoria_bytes + (self._centroides.nbytes if self._centroides is not None else 0)
+
+    def carregar(self, codificacoes):
+        self._dados.carregar(codificacoes)
+        self._centroides = None
+        self._atribuicao = []
+        self._treinar_se_necessario()
+
+    def _treinar_se_necessario(self):
+        n = len(self._dados)
+        if n < LIMIAR_TREINO_IVF or (self._centroides is not None and n < 2 * self._tamanho_no_treino):
+            return
+        dados = self._dados.codificacoes
+        k = self.n_listas_fixo or max(1, int(4 * math.sqrt(n)))
+        amostra = dados
+        if n > 64 * k:
+            amostra = dados[np.random.default_rng(0).choice(n, size=64 * k, replace=False)]
+        self._centroides = kmeans(amostra, k)
+        self._atribuicao = list(np.argmin(_distancias_quadradas(dados, self._centroides), axis=1))
+        self._listas = [[] for _ in range(k)]
+        for indice, lista in enumerate(self._atribuicao):
+            self._listas[lista].append(indice)
+        self._listas_cache = {}
+        self._tamanho_no_treino = n
+
+    def _lista_mais_proxima(self, codificacao):
+        return int(np.argmin(_distancias_quadradas(np.asarray(codificacao).reshape(1, -1), self._centroides)[0]))
+
+    def adicionar(self, codificacao):
+        indice = self._dados.adicionar(codificacao)
+        if self._centroides is not None:
+            lista = self._lista_mais_proxima(codificacao)
+            self._atribuicao.append(lista)
+            self._listas[lista].append(indice)
+            self._listas_cache.pop(lista, None)
+        self._treinar_se_necessario()
+        return indice
+
+    def atualizar(self, indice, codificacao):
+        if indice == len(self._dados):
+            return self.adicionar(codificacao)
+        self._dados.atualizar(indice, codificacao)
+        if self._centroides is not None:
+            antiga, nova = self._atribuicao[indice], self._lista_mais_proxima(codificacao)
+            if antiga != nova:
+                self._listas[antiga].remove(indice)
+                self._listas[nova].append(indice)
+                self._atribuicao[indice] = nova
+                self._listas_cache.pop(antiga, None)
+                self._listas_cache.pop(nova, None)
+        return indice
+
+    def _ids_da_lista(self, lista):
+        ids = self._listas_cache.get(lista)
+        if ids is None:
+            ids = self._listas_cache[lista] = np.asarray(self._listas[lista], dtype=np.intp)
+        return ids
+
+    def melhores(self, codificacoes):
+        if self._centroides is None:
+            return self._dados.melhores(codificacoes)
+        consultas = np.asarray(codificacoes, dtype=self._dados.dtype).reshape(-1, DIMENSAO_CODIFICACAO)
+        n = len(consultas)
+        indices, distancias = np.full(n, -1, dtype=np.intp), np.full(n, np.inf)
+        if n == 0:
+            return indices, distancias
+        n_sondas = min(self.n_sondas, len(self._centroides))
+        sondas = np.argsort(_distancias_quadradas(consultas, self._centroides), axis=1)[:, :n_sondas]
+        for i, consulta in enumerate(consultas):
+            candidatos = np.concatenate([self._ids_da_lista(lista) for lista in sondas[i]])
+            if len(candidatos) == 0:
+                continue
+            d2 = self._dados.distancias_quadradas(consulta, candidatos)[0]
+            melhor = int(np.argmin(d2))
+            indices[i], distancias[i] = candidatos[melhor], math.sqrt(d2[melhor])
+        return indices, distancias
+
+    def candidatos(self, codificacoes, k):
+        if self._centroides is None:
+            return self._dados.candidatos(codificacoes, k)
+        consultas = np.asarray(codificacoes, dtype=self._dados.dtype).reshape(-1, DIMENSAO_CODIFICACAO)
+        n = len(consultas)
+        indices, distancias = np.full((n, k), -1, dtype=np.intp), np.full((n, k), np.inf)
+        if n == 0:
+            return indices, distancias
+        n_sondas = min(self.n_sondas, len(self._centroides))
+        sondas = np.argsort(_distancias_quadradas(consultas, self._centroides), axis=1)[:, :n_sondas]
+        for i, consulta in enumerate(consultas):
+            candidatos = np.concatenate([self._ids_da_lista(lista) for lista in sondas[i]])
+            if len(candidatos) == 0:
+                continue
+            d2 = self._dados.distancias_quadradas(consulta, candidatos)[0]
+            m = min(k, len(candidatos))
+            proximos = np.argpartition(d2, m - 1)[:m]
+            proximos = proximos[np.argsort(d2[proximos])]
+            indices[i, :m], distancias[i, :m] = candidatos[proximos], np.sqrt(d2[proximos])
+        return indices, distancias
+
+    def identificar(self, codificacoes, tolerancia):
+        indices, distancias = self.melhores(codificacoes)
+        return np.where(distancias <= tolerancia, indices, -1), distancias
+
+
+class IndiceHNSW:
+    """Grafo HNSW (Hierarchical Navigable Small World) em Python/NumPy puro.
+
+    Opcional: a construção é bem mais lenta que a do IVF, mas a busca visita poucos
+    nós mesmo em galerias grandes. Atualizar uma pessoa insere um novo nó e aposenta o
+    antigo (que continua no grafo apenas para navegação).
+    """
+
+    def __init__(self, m=16, ef_construcao=100, ef_busca=64, semente=0, dtype=DTYPE_PADRAO):
+        self.m = m
+        self.m_max0 = 2 * m
+        self.ef_construcao = ef_construcao
+        self.ef_busca = ef_busca
+        self._ml = 1.0 / math.log(m)
+        self._rng = np.random.default_rng(semente)
+        self._nos = ComparadorRostos(dtype=dtype)
+        self._vizinhos = []        # _vizinhos[camada][no] -> lista de nós
+        self._externo = []         # nó -> índice na galeria (-1 se aposentado)
+        self._no_do_indice = []    # índice na galeria -> nó atual
+        self._entrada = None
+
+    def __len__(self):
+        return len(self._no_do_indice)
+
+    @property
+    def dtype(self):
+        return self._nos.dtype
+
+    @property
+    def memoria_bytes(self):
+        return self._nos.memoria_bytes  # Sem contar as listas de vizinhos
+
+    def carregar(self, codificacoes):
+        self.__init__(self.m, self.ef_construcao, self.ef_busca, dtype=self._nos.dtype)
+        for codificacao in codificacoes:
+            self.adicionar(codificacao)
+
+    def _distancias(self, consulta, nos):
+        return np.sqrt(self._nos.distancias_quadradas(consulta, nos)[0])
+
+    def _buscar_camada(self, consulta, entradas, ef, camada):
+        vizinhos = self._vizinhos[camada]
+        visitados = set(entradas)
+        distancias = self._distancias(consulta, entradas)
+        candidatos = [(d, no) for d, no in zip(distancias, entradas)]
+        heapq.heapify(candidatos)
+        resultados = [(-d, no) for d, no in candidatos]
+        heapq.heapify(resultados)
+        while len(resultados) > ef:
+            heapq.heappop(resultados)
+
+        while candidatos:
+            d, no = heapq.heappop(candidatos)
+            if d > -resultados[0][0]:
+                break
+            novos = [v for v in vizinhos.get(no, ()) if v not in visitados]
+            if not novos:
+                continue
+            visitados.update(novos)
+            for dv, v in zip(self._distancias(consulta, novos), novos):
+                if len(resultados) < ef or dv < -resultados[0][0]:
+                    heapq.heappush(candidatos, (dv, v))
+                    heapq.heappush(resultados, (-dv, v))
+                    if len(resultados) > ef:
+                        heapq.heappop(resultados)
+        return sorted((-d, no) for d, no in resultados)
+
+    def _conectar(self, no, candidatos, camada):
+        limite = self.m_max0 if camada == 0 else self.m
+        vizinhos = self._vizinhos[camada]
+        selecionados = [v for _, v in candidatos[:self.m]]
+        vizinhos[no] = selecionados
+        for v in selecionados:
+            lista = vizinhos.setdefault(v, [])
+            lista.append(no)
+            if len(lista) > limite:
+                # Mantém apenas os vizinhos mais próximos de v
+                ordem = np.argsort(self._distancias(self._nos.codificacoes[v], lista))[:limite]
+                vizinhos[v] = [lista[i] for i in ordem]
+
+    def _inserir_no(self, codificacao, indice_externo):
+        no = self._nos.adicionar(codificacao)
+        self._externo.append(indice_externo)
+        nivel = int(-math.log(1.0 - self._rng.random()) * self._ml)
+        while len(self._vizinhos) <= nivel:
+            self._vizinhos.append({})
+
+        if self._entrada is None:
+            for camada in range(nivel + 1):
+                self._vizinhos[camada][no] = []
+            self._entrada = no
+            return no
+
+        consulta = self._nos.codificacoes[no]
+        entrada = [self._entrada]
+        nivel_entrada = self._nivel_do_no(self._entrada)
+        for camada in range(nivel_entrada, nivel, -1):
+            entrada = [self._buscar_camada(consulta, entrada, 1, camada)[0][1]]
+        for camada in range(min(nivel, nivel_entrada), -1, -1):
+            candidatos = self._buscar_camada(consulta, entrada, self.ef_construcao, camada)
+            self._conectar(no, candidatos, camada)
+            entrada = [v for _, v in candidatos]
+        for camada in range(nivel_entrada + 1, nivel + 1):
+            self._vizinhos[camada][no] = []
+        if nivel > nivel_entrada:
+            self._entrada = no
+        return no
+
+    def _nivel_do_no(self, no):
+        nivel = 0
+        while nivel + 1 < len(self._vizinhos) and no in self._vizinhos[nivel + 1]:
+            nivel += 1
+        return nivel
+
+    def adicionar(self, codificacao):
+        indice = len(self._no_do_indice)
+        self._no_do_indice.append(self._inserir_no(codificacao, indice))
+        return indice
+
+    def atualizar(self, indice, codificacao):
+        if indice == len(self._no_do_indice):
+            return self.adicionar(codificacao)
+        self._externo[self._no_do_indice[indice]] = -1
+        self._no_do_indice[indice] = self._inserir_no(codificacao, indice)
+        return indice
+
+    def melhores(self, codificacoes):
+        n = len(codificacoes)
+        indices, distancias = np.full(n, -1, dtype=np.intp), np.full(n, np.inf)
+        if self._entrada is None:
+            return indices, distancias
+        nivel_entrada = self._nivel_do_no(self._entrada)
+        for i, consulta in enumerate(np.asarray(codificacoes, dtype=self._nos.dtype).reshape(-1, DIMENSAO_CODIFICACAO)):
+            entrada = [self._entrada]
+            for camada in range(nivel_entrada, 0, -1):
+                entrada = [self._buscar_camada(consulta, entrada, 1, camada)[0][1]]
+            for d, no in self._buscar_camada(consulta, entrada, self.ef_busca, 0):
+                if self._externo[no] >= 0:
+                    indices[i], distancias[i] = self._externo[no], d
+                    break
+        return indices, distancias
+
+    def candidatos(self, codificacoes, k):
+        n = len(codificacoes)
+        indices, distancias = np.full((n, k), -1, dtype=np.intp), np.full((n, k), np.inf)
+        if self._entrada is None:
+            return indices, distancias
+        nivel_entrada = self._nivel_do_no(self._entrada)
+        for i, consulta in enumerate(np.asarray(codificacoes, dtype=self._nos.dtype).reshape(-1, DIMENSAO_CODIFICACAO)):
+            entrada = [self._entrada]
+            for camada in range(nivel_entrada, 0, -1):
+                entrada = [self._buscar_camada(consulta, entrada, 1, camada)[0][1]]
+            achados = 0
+            for d, no in self._buscar_camada(consulta, entrada, max(self.ef_busca, k), 0):
+                if self._externo[no] >= 0:
+                    indices[i, achados], distancias[i, achados] = self._externo[no], d
+                    achados += 1
+                    if achados == k:
+                        break
+        return indices, distancias
+
+    def identificar(self, codificacoes, tolerancia):
+        indices, distancias = self.melhores(codificacoes)
+        return np.where(distancias <= tolerancia, indices, -1), distancias
+
+
+INDICES = {
+    'exato': ComparadorRostos,
+    'ivf': IndiceIVF,
+    'hnsw': IndiceHNSW,
+}
+
+def criar_indice(tipo, codificacoes=(), **parametros):
+    """Cria o índice `tipo` ('exato', 'ivf' ou 'hnsw') já carregado com `codificacoes`."""
+    if tipo not in INDICES:
+        raise ValueError(f"Tipo de índice desconhecido: '{tipo}'. Opções: {', '.join(INDICES)}")
+    indice = INDICES[tipo](**parametros)
+    indice.carregar(codificacoes)
+    return indice
+
+
+# --- Avaliação (recall@1 e latência contra a varredura exata) ---
+
+def gerar_galeria_sintetica(n, n_consultas=200, ruido=0.02, semente=0):
+    """Galeria aleatória com a escala das codificações do dlib e consultas próximas de pessoas cadastradas."""
+    rng = np.random.default_rng(semente)
+    galeria = rng.normal(0.0, 0.09, size=(n, DIMENSAO_CODIFICACAO))
+    alvos = rng.integers(0, n, size=n_consultas)
+    consultas = galeria[alvos] + rng.normal(0.0, ruido, size=(n_consultas, DIMENSAO_CODIFICACAO))
+    return galeria, consultas
+
+
+def avaliar_indice(indice, galeria, consultas, referencia=None):
+    """Mede construção, memória, latência por consulta e recall@1 de `indice` contra a busca exata em float64."""
+    if referencia is None:
+        referencia = ComparadorRostos.de_codificacoes(galeria, dtype=np.float64).melhores(consultas)[0]
+    inicio = time.perf_counter()
+    indice.carregar(galeria)
+    tempo_construcao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    encontrados = np.array([indice.melhores(consulta[None, :])[0][0] for consulta in consultas])
+    latencia = (time.perf_counter() - inicio) / len(consultas)
+
+    inicio = time.perf_counter()
+    indice.melhores(consultas)  # Todas as consultas de uma vez, como os rostos de um frame
+    latencia_lote = (time.perf_counter() - inicio) / len(consultas)
+    return {
+        'indice': type(indice).__name__,
+        'dtype': indice.dtype.name,
+        'tamanho_galeria': len(galeria),
+        'memoria_mb': round(indice.memoria_bytes / 2**20, 2),
+        'construcao_s': round(tempo_construcao, 4),
+        'latencia_ms': round(latencia * 1000, 4),
+        'latencia_lote_ms': round(latencia_lote * 1000, 4),
+        'recall_1': float(np.mean(encontrados == referencia)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Compara os índices de busca de rostos (recall@1, memória e latência).")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--tipos', nargs='+', default=list(INDICES), choices=list(INDICES))
+    parser.add_argument('--dtypes', nargs='+', default=['float32'], choices=['float32', 'float64'])
+    args = parser.parse_args()
+
+    for tamanho in args.tamanhos:
+        galeria, consultas = gerar_galeria_sintetica(tamanho, args.consultas)
+        referencia = ComparadorRostos.de_codificacoes(galeria, dtype=np.float64).melhores(consultas)[0]
+        for tipo in args.tipos:
+            for dtype in args.dtypes:
+                print(json.dumps(avaliar_indice(INDICES[tipo](dtype=np.dtype(dtype)), galeria, consultas, referencia)))
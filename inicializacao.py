@@ -0,0 +1,109 @@
+import importlib
+import os
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+# --- Constantes ---
+VARIAVEL_LANCAMENTO = 'RECONHECIMENTO_LANCADO_EM'  # time.time() do lançamento, definido por TelaHome
+INICIO_PROCESSO = time.perf_counter()  # Este módulo é um dos primeiros importados pelos pontos de entrada
+
+
+class PerfilInicializacao:
+    """Tempos de importação e de cada etapa da inicialização (impressos com --profile-startup)."""
+
+    def __init__(self):
+        self.tempos = []
+        self._trava = threading.Lock()
+
+    def registrar(self, rotulo, duracao):
+        with self._trava:
+            self.tempos.append((rotulo, duracao, threading.current_thread().name))
+
+    @contextmanager
+    def etapa(self, rotulo):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(rotulo, time.perf_counter() - inicio)
+
+    def imprimir(self, titulo):
+        total = time.perf_counter() - INICIO_PROCESSO
+        print(f"[Perfil] {titulo}: {total * 1000:.0f} ms desde o início do processo")
+        with self._trava:
+            tempos = list(self.tempos)
+        for rotulo, duracao, thread in tempos:
+            origem = '' if thread == 'MainThread' else f' (em {thread})'
+            print(f"[Perfil]   {rotulo:<35} {duracao * 1000:8.1f} ms{origem}")
+
+
+perfil = PerfilInicializacao()
+
+
+class ModuloPreguicoso(types.ModuleType):
+    """Substituto de um módulo que só o importa no primeiro acesso a um atributo."""
+
+    def __init__(self, nome):
+        super().__init__(nome)
+        self.__dict__['_modulo'] = None
+        self.__dict__['_trava'] = threading.Lock()
+
+    def carregar(self):
+        if self._modulo is None:
+            with self._trava:
+                if self._modulo is None:
+                    inicio = time.perf_counter()
+                    modulo = importlib.import_module(self.__name__)
+                    perfil.registrar(f"import {self.__name__}", time.perf_counter() - inicio)
+                    self.__dict__['_modulo'] = modulo
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self.carregar(), atributo)
+
+
+def importacao_preguicosa(nome):
+    """Ex.: `face_recognition = importacao_preguicosa('face_recognition')` no topo do módulo."""
+    return ModuloPreguicoso(nome)
+
+
+def aquecer_em_segundo_plano(*modulos, ao_terminar=None):
+    """Importa os módulos preguiçosos (e carrega seus modelos) em uma thread de fundo."""
+    def aquecer():
+        for modulo in modulos:
+            if isinstance(modulo, ModuloPreguicoso):
+                modulo.carregar()
+        if ao_terminar:
+            ao_terminar()
+    thread = threading.Thread(target=aquecer, name='aquecimento', daemon=True)
+    thread.start()
+    return thread
+
+
+def ambiente_lancamento():
+    """Cópia do ambiente com o instante do lançamento, para o processo filho medir a própria abertura."""
+    ambiente = dict(os.environ)
+    ambiente[VARIAVEL_LANCAMENTO] = repr(time.time())
+    return ambiente
+
+
+def reportar_janela_pronta(janela, rotulo, inicio=None, detalhar=False):
+    """Imprime quanto tempo a janela levou para aparecer, quando o Tk fica ocioso.
+
+    `inicio` é um `time.perf_counter()` do mesmo processo; sem ele, usa o instante do
+    lançamento recebido pelo ambiente (lançamento em outro processo). Com `detalhar`,
+    imprime também o perfil de importações e etapas até aqui.
+    """
+    def reportar():
+        if detalhar:
+            perfil.imprimir(f"{rotulo}: janela pronta")
+        if inicio is not None:
+            decorrido = time.perf_counter() - inicio
+        elif VARIAVEL_LANCAMENTO in os.environ:
+            decorrido = time.time() - float(os.environ[VARIAVEL_LANCAMENTO])
+        else:
+            return
+        print(f"[Inicialização] {rotulo}: janela pronta em {decorrido * 1000:.0f} ms")
+    janela.after_idle(reportar)
@@ -1,35 +1,46 @@
 # login_system.py (VERSÃO FINAL CORRIGIDA)
 
+from inicializacao import importacao_preguicosa, aquecer_em_segundo_plano, perfil, ambiente_lancamento, reportar_janela_pronta
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import cv2
-import face_recognition
-import numpy as np
-import json
 import os
 import threading
 import time
 import subprocess
 import sys 
+import importlib
+from galeria import obter_galeria
+from prototipos import criar_comparador
+from metricas import adicionar_argumentos_metricas, configurar_metricas
+from pipeline_video import PipelineVideo
+from renderizador import RenderizadorVideo
+from verificacao_login import VerificadorLogin, regiao_central
+from modelos import PASTA_PROJETO, emprestar_cascade
+
+# Importações pesadas só acontecem no primeiro uso: a tela de login aparece antes do dlib carregar
+cv2 = importacao_preguicosa('cv2')
+face_recognition = importacao_preguicosa('face_recognition')
 
 # --- Constantes e Funções de Dados ---
 
 ARQUIVO_DADOS = 'dados_registrados.json'
 TOLERANCIA = 0.6
+TIPO_INDICE = 'exato'  # 'exato', 'ivf' ou 'hnsw' (ver indices_busca.py)
 TEMPO_LIMITE_LOGIN = 5
+CAMERA_LOGIN = 0  # Índice (ou URL) da câmera do login
+INTERVALO_ACOMPANHAMENTO = 2000  # ms entre verificações de cadastros novos (feitos em outros processos)
+INTERVALO_DECISAO = 50  # ms entre consultas (na thread do Tk) à decisão da tentativa de login
+MODO_LANCAMENTO = 'janela'  # 'janela' (Toplevel no mesmo processo) ou 'processo' (um novo interpretador)
+
+# Script -> (módulo, classe) dos aplicativos que podem abrir como janela no mesmo processo
+APLICATIVOS = {
+    "faces_detection.py": ("faces_detection", "FaceRecognitionApp"),
+    "cars_detection.py": ("cars_detection", "CarDetectorApp"),
+}
 
 def carregar_dados_salvos():
-    if not os.path.exists(ARQUIVO_DADOS):
-        return [], []
-    try:
-        with open(ARQUIVO_DADOS, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-        rostos_codificados = [np.array(item['codificacao']) for item in dados]
-        nomes = [item['nome'] for item in dados]
-        return rostos_codificados, nomes
-    except (json.JSONDecodeError, KeyError, FileNotFoundError):
-        return [], []
+    galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+    return galeria.codificacoes, list(galeria.nomes)
 
 # --- Tela Principal (Home) ---
 class TelaHome:
@@ -53,92 +64,159 @@ class TelaHome:
         btn_car_app = ttk.Button(apps_frame, text="Detector de Carros", command=lambda: self.launch_app("cars_detection.py"))
         btn_car_app.pack(pady=10, padx=20, fill=tk.X)
 
+        if MODO_LANCAMENTO == 'janela':
+            threading.Thread(target=self.aquecer_aplicativos, daemon=True).start()
         self.root.mainloop()
 
+    def aquecer_aplicativos(self):
+        """Importa os módulos dos aplicativos e carrega o classificador enquanto a Home está ociosa."""
+        inicio = time.perf_counter()
+        for nome_modulo, _ in APLICATIVOS.values():
+            importlib.import_module(nome_modulo)
+        with emprestar_cascade():
+            pass
+        print(f"[Inicialização] Aplicativos aquecidos em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
     # --- FUNÇÃO PARA LANCAR OUTROS SCRIPTS ---
     def launch_app(self, script_name):
-        """Lança um script Python como um novo processo USANDO O MESMO INTERPRETADOR."""
+        """Abre o aplicativo como janela no mesmo processo ou, no modo 'processo', com o mesmo interpretador."""
+        if MODO_LANCAMENTO == 'janela' and script_name in APLICATIVOS:
+            self.abrir_janela(script_name)
+            return
         try:
             print(f"Tentando iniciar o aplicativo: {script_name}")
             # Usamos sys.executable para garantir que o mesmo ambiente Python seja usado
-            subprocess.Popen([sys.executable, script_name])
+            subprocess.Popen([sys.executable, os.path.join(PASTA_PROJETO, script_name)], env=ambiente_lancamento())
         except FileNotFoundError:
             messagebox.showerror("Erro", f"O arquivo '{script_name}' não foi encontrado. Certifique-se de que ele está na mesma pasta.")
         except Exception as e:
             messagebox.showerror("Erro ao Iniciar", f"Ocorreu um erro: {e}")
 
+    def abrir_janela(self, script_name):
+        """Abre o aplicativo em um Toplevel, reaproveitando módulos, galeria e classificadores já carregados."""
+        inicio = time.perf_counter()
+        nome_modulo, nome_classe = APLICATIVOS[script_name]
+        try:
+            modulo = importlib.import_module(nome_modulo)
+            janela = tk.Toplevel(self.root)
+            getattr(modulo, nome_classe)(janela)
+            reportar_janela_pronta(janela, script_name, inicio)
+        except Exception as e:
+            messagebox.showerror("Erro ao Iniciar", f"Ocorreu um erro: {e}")
+
 
 # --- Tela de Login ---
 class TelaLogin:
-    def __init__(self, root):
+    def __init__(self, root, fonte=CAMERA_LOGIN):
         self.root = root
+        self.fonte = fonte
         self.root.title("Login com Reconhecimento Facial")
         self.login_successful = False
         self.user_name = None
         self.is_running = True
         self.is_logging_in = False
-        self.login_start_time = 0
-        self.known_face_encodings, self.known_face_names = carregar_dados_salvos()
+        with perfil.etapa("carregar galeria + índice"):
+            self.known_face_encodings, self.known_face_names = carregar_dados_salvos()
+            self.comparador = criar_comparador(TIPO_INDICE, obter_galeria(arquivo_json=ARQUIVO_DADOS))
+        self.verificador = VerificadorLogin(self.comparador, TOLERANCIA, TEMPO_LIMITE_LOGIN)
         style = ttk.Style(self.root)
         style.configure('TButton', font=('Helvetica', 11))
         self.video_label = ttk.Label(self.root)
         self.video_label.pack(padx=10, pady=10)
+        self.renderizador = RenderizadorVideo(self.video_label, tamanho_maximo=(640, 480), nome='login')
         self.status_label = ttk.Label(self.root, text="Aponte o rosto para a câmera", font=('Helvetica', 10))
         self.status_label.pack(pady=5)
         self.login_button = ttk.Button(self.root, text="Login com Rosto", command=self.start_login_attempt)
         self.login_button.pack(pady=10)
         self.detection_thread = threading.Thread(target=self.video_loop, daemon=True)
         self.detection_thread.start()
+        # Os modelos do dlib carregam em segundo plano enquanto a câmera já aparece
+        aquecer_em_segundo_plano(face_recognition)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        # Os `after` são do interpretador, não da janela: são cancelados ao fechar (ex.: Toplevel no Home)
+        self._agendamentos = {}
+        self._agendamentos['acompanhar'] = self.root.after(INTERVALO_ACOMPANHAMENTO, self.acompanhar_galeria)
+
+    def acompanhar_galeria(self):
+        # Quem for cadastrado em faces_detection.py já pode entrar, sem reiniciar o login
+        galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+        alterados = galeria.acompanhar()
+        if alterados is None:
+            self.known_face_encodings, self.known_face_names = carregar_dados_salvos()
+            self.comparador = criar_comparador(TIPO_INDICE, obter_galeria(arquivo_json=ARQUIVO_DADOS))
+            self.verificador.comparador = self.comparador
+        else:
+            for indice in alterados:
+                if indice == len(self.known_face_names):
+                    self.known_face_names.append(galeria.nomes[indice])
+                else:
+                    self.known_face_names[indice] = galeria.nomes[indice]
+                self.comparador.atualizar(indice, galeria.codificacoes[indice], galeria.amostras_da_pessoa(indice))
+        self._agendamentos['acompanhar'] = self.root.after(INTERVALO_ACOMPANHAMENTO, self.acompanhar_galeria)
 
     def login_success(self, user_name):
         self.is_running = False
         self.login_successful = True
         self.user_name = user_name
         messagebox.showinfo("Login Bem-Sucedido", f"Olá, {self.user_name}! Acesso permitido.")
-        self.root.destroy()
+        self.fechar_janela()
         
     def start_login_attempt(self):
         if not self.known_face_names:
             messagebox.showerror("Erro", "Nenhum rosto cadastrado no sistema.")
             return
+        self.verificador.iniciar()
         self.is_logging_in = True
-        self.login_start_time = time.time()
         self.login_button.config(state=tk.DISABLED)
-        self.status_label.config(text="Analisando... Por favor, olhe para a câmera.")
+        self.status_label.config(text="Analisando... Por favor, centralize o rosto na câmera.")
+        self._agendamentos['decisao'] = self.root.after(INTERVALO_DECISAO, self.verificar_decisao)
+
+    def verificar_decisao(self):
+        # A votação roda na thread do pipeline; as caixas de diálogo e o destroy ficam na thread do Tk
+        self._agendamentos.pop('decisao', None)
+        if not self.is_logging_in:
+            return
+        decisao = self.verificador.decisao
+        if decisao is None and self.verificador.esgotado():
+            decisao = self.verificador.encerrar_por_tempo()
+        if decisao is None:
+            self._agendamentos['decisao'] = self.root.after(INTERVALO_DECISAO, self.verificar_decisao)
+        elif decisao['aprovado']:
+            self.login_success(self.known_face_names[decisao['indice']])
+        else:
+            self.login_failure()
         
     def video_loop(self):
-        cap = cv2.VideoCapture(0)
-        while self.is_running:
-            ret, frame = cap.read()
-            if not ret: continue
-            if self.is_logging_in:
-                if time.time() - self.login_start_time > TEMPO_LIMITE_LOGIN:
-                    self.login_failure()
-                self.process_login_frame(frame)
-            self.update_video_label(frame)
-        cap.release()
+        # Captura, verificação e exibição em threads separadas: o login não trava a câmera
+        pipeline = PipelineVideo(self.fonte, [
+            ('login', self.etapa_login),
+            ('exibicao', self.etapa_exibicao),
+        ], nome='login')
+        try:
+            pipeline.executar(continuar=lambda: self.is_running)
+        except IOError as e:
+            print(f"[Login] {e}")
+
+    def etapa_login(self, quadro):
+        if self.is_logging_in:
+            self.process_login_frame(quadro['frame'])
+        return quadro
+
+    def etapa_exibicao(self, quadro):
+        frame = quadro['frame']
+        if self.is_logging_in:
+            # Mostra a região onde o rosto é procurado
+            x1, y1, x2, y2 = regiao_central(*frame.shape[:2], self.verificador.fracao_roi)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
+        self.update_video_label(frame)
+        return quadro
 
     def process_login_frame(self, frame):
-        rgb_small_frame = cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.25, fy=0.25), cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=TOLERANCIA)
-            if True in matches:
-                first_match_index = matches.index(True)
-                name = self.known_face_names[first_match_index]
-                self.login_success(name)
-                return
+        # Um voto por quadro; a decisão (com a latência) é lida por verificar_decisao
+        return self.verificador.processar(frame)
 
     def update_video_label(self, frame):
-        try:
-            pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            pil_image.thumbnail((640, 480), Image.Resampling.LANCZOS)
-            tk_image = ImageTk.PhotoImage(image=pil_image)
-            self.video_label.config(image=tk_image)
-            self.video_label.image = tk_image
-        except: pass
+        self.renderizador.enviar(frame)
 
     def login_failure(self):
         self.is_logging_in = False
@@ -148,20 +226,40 @@ class TelaLogin:
 
     def on_closing(self):
         self.is_running = False
+        self.fechar_janela()
+
+    def fechar_janela(self):
+        for agendamento in self._agendamentos.values():
+            self.root.after_cancel(agendamento)
+        self._agendamentos.clear()
+        self.renderizador.parar()
         self.root.destroy()
 
 # --- Ponto de Entrada Principal ---
 if __name__ == "__main__":
-    if not os.path.exists(ARQUIVO_DADOS) or not carregar_dados_salvos()[1]:
+    import argparse
+    parser = argparse.ArgumentParser(description="Login com Reconhecimento Facial")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Imprime o tempo de cada importação/etapa até a tela de login aparecer")
+    parser.add_argument('--camera', default=str(CAMERA_LOGIN), help="Índice ou URL da câmera do login")
+    adicionar_argumentos_metricas(parser)
+    args = parser.parse_args()
+    exportador = configurar_metricas(args)
+
+    if not carregar_dados_salvos()[1]:
         root = tk.Tk()
         root.withdraw() 
         messagebox.showinfo("Primeiro Uso", "Nenhum usuário cadastrado.\nExecute 'faces_detection.py' para cadastrar um rosto antes de usar o login.")
     else:
         login_root = tk.Tk()
-        app_login = TelaLogin(login_root)
+        with perfil.etapa("montar tela de login"):
+            app_login = TelaLogin(login_root, int(args.camera) if args.camera.isdigit() else args.camera)
+        reportar_janela_pronta(login_root, "login_system.py", detalhar=args.profile_startup)
         login_root.mainloop()
         if app_login.login_successful:
             print(f"Login bem-sucedido para o usuário: {app_login.user_name}. Iniciando a tela principal.")
             TelaHome(app_login.user_name)
         else:
-            print("A aplicação foi fechada sem um login bem-sucedido.")
\ No newline at end of file
+            print("A aplicação foi fechada sem um login bem-sucedido.")
+    if exportador is not None:
+        exportador.encerrar()
\ No newline at end of file
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import cv2
+
+import galeria
+from galeria import PASTA_GALERIA, ARQUIVO_CODIFICACOES, ARQUIVO_PESSOAS, DIMENSAO_CODIFICACAO
+from indices_busca import gerar_galeria_sintetica
+from modelos import PASTA_PROJETO
+
+# --- Constantes ---
+TAMANHOS_GALERIA = [1000, 10000, 100000]
+REPETICOES = 20
+QUADROS = 30
+TAMANHO_QUADRO = (480, 640)  # (altura, largura) dos quadros sintéticos
+INSERCOES = 50               # Quantas chamadas a salvar_dados medir por galeria
+ROSTOS_POR_QUADRO = 3        # Consultas por chamada no caso 'comparacao'
+
+
+def medir(funcao, repeticoes=REPETICOES, aquecimento=1):
+    """Latência (ms) de `funcao()`: média, percentis e extremos."""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos = np.array(tempos)
+    return {
+        'repeticoes': repeticoes,
+        'media_ms': round(float(tempos.mean()), 3),
+        'p50_ms': round(float(np.percentile(tempos, 50)), 3),
+        'p95_ms': round(float(np.percentile(tempos, 95)), 3),
+        'min_ms': round(float(tempos.min()), 3),
+        'max_ms': round(float(tempos.max()), 3),
+    }
+
+
+def executar_caso(resultados, nome, medicao, **contexto):
+    """Roda uma medição e guarda o resultado (ou o erro, ex.: dlib ausente) sem interromper a suíte."""
+    print(f"[Desempenho] {nome} {contexto or ''}")
+    try:
+        dados = medicao()
+    except Exception as e:
+        dados = {'erro': f"{type(e).__name__}: {e}"}
+    resultados.append({'caso': nome, **contexto, **dados})
+
+
+# --- Entradas sintéticas ---
+
+def quadros_sinteticos(n, tamanho=TAMANHO_QUADRO, semente=0):
+    """Quadros BGR com ruído e retângulos (sem rostos: mede o custo da varredura do detector)."""
+    rng = np.random.default_rng(semente)
+    quadros = []
+    for _ in range(n):
+        quadro = rng.integers(0, 256, size=(*tamanho, 3), dtype=np.uint8)
+        for _ in range(5):
+            x, y = int(rng.integers(0, tamanho[1] - 100)), int(rng.integers(0, tamanho[0] - 60))
+            cv2.rectangle(quadro, (x, y), (x + 100, y + 60), tuple(int(c) for c in rng.integers(0, 256, 3)), -1)
+        quadros.append(quadro)
+    return quadros
+
+
+def carregar_quadros(video=None, imagem=None, n=QUADROS):
+    if video:
+        cap = cv2.VideoCapture(video)
+        quadros = []
+        while len(quadros) < n:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            quadros.append(frame)
+        cap.release()
+        if quadros:
+            return quadros, video
+    if imagem:
+        frame = cv2.imread(imagem)
+        if frame is not None:
+            return [frame] * n, imagem
+    return quadros_sinteticos(n), 'sintetico'
+
+
+def criar_galeria_sintetica(pasta, n, semente=0):
+    """Grava uma galeria no formato de galeria.py com `n` codificações aleatórias."""
+    codificacoes, _ = gerar_galeria_sintetica(n, n_consultas=1, semente=semente)
+    os.makedirs(pasta, exist_ok=True)
+    matriz = np.lib.format.open_memmap(
+        os.path.join(pasta, ARQUIVO_CODIFICACOES), mode='w+', dtype=np.float64, shape=(n, DIMENSAO_CODIFICACAO))
+    matriz[:] = codificacoes
+    matriz.flush()
+    del matriz
+    with open(os.path.join(pasta, ARQUIVO_PESSOAS), 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({'indice': i, 'codigo': f"S{i:06d}", 'nome': f"Pessoa {i}"}) + '\n')
+
+
+# --- Casos ---
+
+def medir_carregamento(repeticoes):
+    """`carregar_dados_salvos` a frio (sem o cache de galerias do processo) + construção do índice."""
+    import faces_detection
+
+    def carregar():
+        galeria._galerias_abertas.clear()
+        codificacoes, _, _ = faces_detection.carregar_dados_salvos()
+        return codificacoes
+
+    resultado = {'carregar_dados_salvos': medir(carregar, repeticoes)}
+    carregar()
+    resultado['criar_indice'] = medir(lambda: faces_detection.criar_comparador(faces_detection.TIPO_INDICE, galeria.obter_galeria()), repeticoes)
+    return resultado
+
+
+def medir_salvar_dados(insercoes):
+    """`salvar_dados` de pessoas novas (inclui o crescimento da matriz quando ela enche)."""
+    import faces_detection
+    rng = np.random.default_rng(1)
+    novos = iter(rng.normal(0.0, 0.09, size=(insercoes + 1, DIMENSAO_CODIFICACAO)))
+    contador = iter(range(insercoes + 1))
+    return medir(lambda: faces_detection.salvar_dados(f"N{next(contador):06d}", "Nova", next(novos)), insercoes)
+
+
+def app_rostos():
+    """Instância de FaceRecognitionApp sem janela, só com o que process_frame usa."""
+    import faces_detection
+    app = faces_detection.FaceRecognitionApp.__new__(faces_detection.FaceRecognitionApp)
+    _, app.codigos_conhecidos, app.nomes_conhecidos = faces_detection.carregar_dados_salvos()
+    app.comparador = faces_detection.criar_comparador(faces_detection.TIPO_INDICE, galeria.obter_galeria())
+    app.detector = faces_detection.DetectorAdaptativo(
+        faces_detection.criar_detector(faces_detection.DETECTOR_ROSTOS), escala=faces_detection.ESCALA_DETECCAO)
+    return app
+
+
+def tela_login():
+    """Instância de TelaLogin sem janela, com uma tentativa de login sem tempo limite."""
+    import login_system
+    tela = login_system.TelaLogin.__new__(login_system.TelaLogin)
+    _, tela.known_face_names = login_system.carregar_dados_salvos()
+    tela.comparador = login_system.criar_comparador(login_system.TIPO_INDICE, galeria.obter_galeria())
+    tela.verificador = login_system.VerificadorLogin(tela.comparador, login_system.TOLERANCIA, tempo_limite=None)
+    return tela
+
+
+def medir_comparacao(n, repeticoes, rostos=ROSTOS_POR_QUADRO):
+    """A comparação de `process_frame` com codificações sintéticas próximas de pessoas da galeria.
+
+    Os quadros sintéticos não têm rostos, então só este caso mostra o efeito do tamanho da galeria.
+    """
+    import faces_detection
+    comparador = app_rostos().comparador
+    # Mesma semente de `criar_galeria_sintetica`: as consultas são ruído em torno de pessoas cadastradas
+    _, consultas = gerar_galeria_sintetica(n, n_consultas=(repeticoes + 1) * rostos, semente=0)
+    lotes = iter(consultas.reshape(repeticoes + 1, rostos, DIMENSAO_CODIFICACAO))
+    resultado = medir(lambda: comparador.identificar(next(lotes), faces_detection.TOLERANCIA), repeticoes)
+    resultado['rostos_por_chamada'] = rostos
+    return resultado
+
+
+def medir_por_quadro(funcao, quadros):
+    """Roda `funcao(quadro)` em todos os quadros (em cópias, pois ela desenha neles)."""
+    posicao = iter(range(10 ** 9))
+    return medir(lambda: funcao(quadros[next(posicao) % len(quadros)].copy()), len(quadros))
+
+
+def medir_cascade_carros(quadros):
+    """O `detectar` do motor com a configuração usada pelo video_loop do detector de carros."""
+    import cars_detection
+    from modelos import carregar_cascade
+    from motor_deteccao_carros import MotorDeteccaoCarros, carregar_roi
+    motor = MotorDeteccaoCarros(
+        carregar_cascade(cars_detection.CLASSIFICADOR_PATH), escala=cars_detection.ESCALA_CASCADE,
+        roi=carregar_roi(cars_detection.ARQUIVO_ROI), usar_movimento=cars_detection.USAR_MOVIMENTO,
+        scale_factor=cars_detection.SCALE_FACTOR, min_neighbors=cars_detection.MIN_NEIGHBORS)
+    resultado = medir_por_quadro(motor.detectar, quadros)
+    resultado['quadros_por_segundo'] = round(1000 / resultado['media_ms'], 2)
+    return resultado
+
+
+def medir_video(video, tipo_detector):
+    """FPS de ponta a ponta (decodificação + detecção + identificação) do processamento em lote."""
+    from processar_lote import processar_video
+    registros, quadros, segundos = processar_video(video, tipo_detector)
+    return {'quadros': quadros, 'deteccoes': len(registros), 'segundos': round(segundos, 3),
+            'quadros_por_segundo': round(quadros / segundos, 2) if segundos else 0.0}
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=PASTA_PROJETO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_suite(tamanhos=TAMANHOS_GALERIA, video=None, imagem=None, n_quadros=QUADROS, repeticoes=REPETICOES):
+    quadros, origem_quadros = carregar_quadros(video, imagem, n_quadros)
+    # Sem vídeo/foto, os quadros não têm rostos: process_frame e o login medem só a varredura do
+    # detector, e o custo da galeria aparece apenas no caso 'comparacao'
+    contexto_quadros = {'quadros': origem_quadros}
+    if origem_quadros == 'sintetico':
+        contexto_quadros['sem_rostos'] = True
+    resultados = []
+    executar_caso(resultados, 'cascade_carros', lambda: medir_cascade_carros(quadros), quadros=origem_quadros)
+    if video:
+        executar_caso(resultados, 'video_carros', lambda: medir_video(video, 'carros'), video=video)
+
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='desempenho_') as temporario:
+        for n in tamanhos:
+            pasta = os.path.join(temporario, str(n))
+            criar_galeria_sintetica(os.path.join(pasta, PASTA_GALERIA), n)
+            # Os apps abrem a galeria relativa ao diretório atual
+            os.chdir(pasta)
+            try:
+                executar_caso(resultados, 'carregar_galeria', lambda: medir_carregamento(repeticoes), galeria=n)
+                executar_caso(resultados, 'comparacao', lambda: medir_comparacao(n, repeticoes), galeria=n)
+                executar_caso(resultados, 'process_frame', lambda: medir_por_quadro(app_rostos().process_frame, quadros),
+                              galeria=n, **contexto_quadros)
+                executar_caso(resultados, 'process_login_frame', lambda: medir_por_quadro(tela_login().process_login_frame, quadros),
+                              galeria=n, **contexto_quadros)
+                if video and n == tamanhos[-1]:
+                    executar_caso(resultados, 'video_rostos', lambda: medir_video(video, 'rostos'), video=video, galeria=n)
+                # Por último: as inserções alteram a galeria
+                executar_caso(resultados, 'salvar_dados', lambda: medir_salvar_dados(INSERCOES), galeria=n)
+            finally:
+                os.chdir(diretorio_original)
+                galeria._galerias_abertas.clear()  # Solta os mapeamentos antes de apagar (Windows)
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_codigo(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'resultados': resultados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede os caminhos críticos de detecção, codificação e comparação.")
+    parser.add_argument('-o', '--saida', help="Arquivo JSON de saída (padrão: imprime na tela)")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_GALERIA, help="Tamanhos das galerias sintéticas")
+    parser.add_argument('--video', help="Vídeo para os quadros e para o FPS de ponta a ponta")
+    parser.add_argument('--imagem', help="Foto com um rosto, repetida como quadro (quando não há vídeo)")
+    parser.add_argument('--quadros', type=int, default=QUADROS)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    args = parser.parse_args()
+
+    relatorio = executar_suite(args.tamanhos, args.video, args.imagem, args.quadros, args.repeticoes)
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+        print(f"[Desempenho] Resultados gravados em '{args.saida}'.")
+    else:
+        print(texto)
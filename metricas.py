@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from inicializacao import importacao_preguicosa
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+JANELA_AMOSTRAS = 1024     # Latências guardadas por métrica (histograma deslizante)
+JANELA_FPS = 5.0           # Segundos considerados no cálculo do FPS
+INTERVALO_EXPORTACAO = 5.0
+INTERVALO_OVERLAY = 0.5    # O texto do overlay é recalculado no máximo a cada meio segundo
+PERCENTIS = (50, 95, 99)
+
+_NULO = nullcontext()
+
+
+class Histograma:
+    """Últimas JANELA_AMOSTRAS latências de uma métrica, em um buffer circular."""
+
+    def __init__(self, tamanho=JANELA_AMOSTRAS):
+        self._amostras = np.zeros(tamanho)
+        self._proxima = 0
+        self.total = 0
+
+    def registrar(self, segundos):
+        self._amostras[self._proxima] = segundos
+        self._proxima = (self._proxima + 1) % len(self._amostras)
+        self.total += 1
+
+    def resumo(self):
+        amostras = self._amostras[:min(self.total, len(self._amostras))] * 1000
+        if not len(amostras):
+            return None
+        resumo = {f'p{p}_ms': round(float(v), 3) for p, v in zip(PERCENTIS, np.percentile(amostras, PERCENTIS))}
+        resumo['media_ms'] = round(float(amostras.mean()), 3)
+        resumo['amostras'] = self.total
+        return resumo
+
+
+class Metricas:
+    """Latências por etapa, FPS e contadores (ex.: quadros descartados) do processo.
+
+    Desligada por padrão: `medir` devolve um context manager vazio e `registrar`,
+    `contar` e `marcar` retornam logo na primeira linha, então os ganchos espalhados
+    pelos apps custam praticamente nada. As métricas têm nomes como 'rostos.deteccao'; o
+    prefixo identifica o app (ou a câmera) e permite filtrar o overlay.
+    """
+
+    def __init__(self):
+        self.ativo = False
+        self.overlay = False
+        self._trava = threading.Lock()
+        self._latencias = {}
+        self._marcas = {}
+        self._contadores = {}
+
+    def ligar(self, overlay=False):
+        self.ativo = True
+        self.overlay = overlay
+
+    def registrar(self, nome, segundos):
+        if not self.ativo:
+            return
+        histograma = self._latencias.get(nome)
+        if histograma is None:
+            with self._trava:
+                histograma = self._latencias.setdefault(nome, Histograma())
+        histograma.registrar(segundos)
+
+    @contextmanager
+    def _medir(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio)
+
+    def medir(self, nome):
+        """`with metricas.medir('rostos.deteccao'): ...` registra a duração do bloco."""
+        return self._medir(nome) if self.ativo else _NULO
+
+    def marcar(self, nome):
+        """Conta um quadro para o FPS de `nome`."""
+        if not self.ativo:
+            return
+        marcas = self._marcas.get(nome)
+        if marcas is None:
+            with self._trava:
+                marcas = self._marcas.setdefault(nome, deque(maxlen=JANELA_AMOSTRAS))
+        marcas.append(time.perf_counter())
+
+    def contar(self, nome, quantidade=1):
+        if not self.ativo:
+            return
+        with self._trava:
+            self._contadores[nome] = self._contadores.get(nome, 0) + quantidade
+
+    def fps(self, nome):
+        marcas = list(self._marcas.get(nome, ()))
+        agora = time.perf_counter()
+        recentes = [t for t in marcas if agora - t <= JANELA_FPS]
+        if len(recentes) < 2:
+            return 0.0
+        return round((len(recentes) - 1) / (recentes[-1] - recentes[0]), 2) if recentes[-1] > recentes[0] else 0.0
+
+    def instantaneo(self, prefixo=None):
+        """Dict com latências (p50/p95/p99), FPS e contadores das métricas com `prefixo`."""
+        with self._trava:
+            latencias = dict(self._latencias)
+            marcas = list(self._marcas)
+            contadores = dict(self._contadores)
+        def filtrar(nome):
+            return prefixo is None or nome.startswith(prefixo + '.')
+        resumo_latencias = {nome: h.resumo() for nome, h in sorted(latencias.items()) if filtrar(nome)}
+        return {
+            'timestamp': time.time(),
+            'latencias': {nome: r for nome, r in resumo_latencias.items() if r is not None},
+            'fps': {nome: self.fps(nome) for nome in sorted(marcas) if filtrar(nome)},
+            'contadores': {nome: v for nome, v in sorted(contadores.items()) if filtrar(nome)},
+        }
+
+    def prometheus(self):
+        """As métricas no formato de texto do Prometheus."""
+        dados = self.instantaneo()
+        linhas = [
+            '# TYPE reconhecimento_latencia_ms summary',
+            '# TYPE reconhecimento_fps gauge',
+            '# TYPE reconhecimento_total counter',
+        ]
+        for nome, resumo in dados['latencias'].items():
+            for p in PERCENTIS:
+                linhas.append(f'reconhecimento_latencia_ms{{etapa="{nome}",quantile="{p / 100}"}} {resumo[f"p{p}_ms"]}')
+            linhas.append(f'reconhecimento_latencia_ms_count{{etapa="{nome}"}} {resumo["amostras"]}')
+        for nome, valor in dados['fps'].items():
+            linhas.append(f'reconhecimento_fps{{etapa="{nome}"}} {valor}')
+        for nome, valor in dados['contadores'].items():
+            linhas.append(f'reconhecimento_total{{contador="{nome}"}} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+metricas = Metricas()
+
+
+# --- Overlay ---
+
+_cache_overlay = {}
+
+def desenhar_overlay(frame, prefixo=None, metricas=metricas):
+    """Escreve FPS, p50/p95 por etapa e descartes no canto do quadro (in-place)."""
+    agora = time.perf_counter()
+    em_cache = _cache_overlay.get(prefixo)
+    if em_cache is None or agora - em_cache[0] > INTERVALO_OVERLAY:
+        dados = metricas.instantaneo(prefixo)
+        linhas = [f"{nome}: {fps:.1f} fps" for nome, fps in dados['fps'].items() if fps]
+        linhas += [f"{nome}: p50 {r['p50_ms']:.1f} / p95 {r['p95_ms']:.1f} ms" for nome, r in dados['latencias'].items()]
+        linhas += [f"{nome}: {valor}" for nome, valor in dados['contadores'].items()]
+        em_cache = _cache_overlay[prefixo] = (agora, linhas)
+
+    escala = max(0.35, min(0.6, frame.shape[1] / 1600))
+    altura_linha = int(28 * escala) + 4
+    for i, linha in enumerate(em_cache[1]):
+        y = 10 + altura_linha * (i + 1)
+        cv2.putText(frame, linha, (10, y), cv2.FONT_HERSHEY_SIMPLEX, escala, (0, 0, 0), 3)
+        cv2.putText(frame, linha, (10, y), cv2.FONT_HERSHEY_SIMPLEX, escala, (0, 255, 255), 1)
+    return frame
+
+
+# --- Exportação ---
+
+class ExportadorMetricas:
+    """Publica as métricas em um arquivo (.json ou texto do Prometheus) e/ou em um endpoint HTTP local.
+
+    O arquivo é regravado a cada `intervalo` segundos por troca atômica. O endpoint
+    (127.0.0.1:`porta`) responde em /metrics (Prometheus) e /metrics.json.
+    """
+
+    def __init__(self, arquivo=None, porta=None, intervalo=INTERVALO_EXPORTACAO, metricas=metricas):
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self.metricas = metricas
+        self._parar = threading.Event()
+        self._threads = []
+        self._servidor = None
+        if arquivo:
+            self._threads.append(threading.Thread(target=self._gravar_periodicamente, name='exportador_metricas', daemon=True))
+        if porta:
+            self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_tratador())
+            self._servidor.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._servidor.serve_forever, name='servidor_metricas', daemon=True))
+            print(f"[Métricas] Endpoint em http://127.0.0.1:{porta}/metrics")
+        for thread in self._threads:
+            thread.start()
+
+    def _conteudo(self, formato_json):
+        if formato_json:
+            return json.dumps(self.metricas.instantaneo(), ensure_ascii=False), 'application/json'
+        return self.metricas.prometheus(), 'text/plain; version=0.0.4'
+
+    def gravar(self):
+        conteudo, _ = self._conteudo(self.arquivo.lower().endswith('.json'))
+        caminho_tmp = self.arquivo + '.tmp'
+        with open(caminho_tmp, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(caminho_tmp, self.arquivo)
+
+    def _gravar_periodicamente(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.gravar()
+            except OSError as e:
+                print(f"[Métricas] Erro ao gravar '{self.arquivo}': {e}")
+
+    def _criar_tratador(self):
+        exportador = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/metrics', '/metrics.json'):
+                    self.send_error(404)
+                    return
+                conteudo, tipo = exportador._conteudo(self.path.endswith('.json'))
+                dados = conteudo.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{tipo}; charset=utf-8')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+        return Tratador
+
+    def encerrar(self):
+        self._parar.set()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+        if self.arquivo:
+            self.gravar()
+
+
+def adicionar_argumentos_metricas(parser):
+    """Opções de linha de comando comuns aos apps."""
+    parser.add_argument('--metricas', action='store_true', help="Mostra FPS e latência por etapa sobre o vídeo")
+    parser.add_argument('--exportar-metricas', metavar='ARQUIVO',
+                        help="Grava as métricas periodicamente (.json ou texto do Prometheus)")
+    parser.add_argument('--porta-metricas', type=int, metavar='PORTA',
+                        help="Serve as métricas em http://127.0.0.1:PORTA/metrics")
+
+
+def configurar_metricas(args):
+    """Liga a coleta se alguma opção de métricas foi pedida. Retorna o exportador (ou None)."""
+    if not (args.metricas or args.exportar_metricas or args.porta_metricas):
+        return None
+    metricas.ligar(overlay=args.metricas)
+    if args.exportar_metricas or args.porta_metricas:
+        return ExportadorMetricas(args.exportar_metricas, args.porta_metricas)
+    return None
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from inicializacao import importacao_preguicosa
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+CASCADE_CARROS = os.path.join('detection_haarcascades', 'cars.xml')
+
+
+def caminho_modelo(caminho):
+    """Resolve caminhos de modelos relativos à pasta do projeto (e não ao diretório atual)."""
+    return caminho if os.path.isabs(caminho) else os.path.join(PASTA_PROJETO, caminho)
+
+
+def carregar_cascade(caminho):
+    classificador = cv2.CascadeClassifier(caminho_modelo(caminho))
+    if classificador.empty():
+        raise IOError(f"Não foi possível carregar o classificador Haar Cascade: {caminho_modelo(caminho)}")
+    return classificador
+
+
+class RegistroModelos:
+    """Carrega cada modelo uma vez por processo e empresta as instâncias às threads.
+
+    Uma instância emprestada é exclusiva de quem a pegou até ser devolvida, então
+    classificadores que não são thread-safe (como o `CascadeClassifier`) nunca são usados
+    por duas detecções ao mesmo tempo. Instâncias devolvidas voltam para um pool e são
+    reaproveitadas: reiniciar a detecção ou trocar de fonte não recarrega o modelo.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._carregadores = {}
+        self._livres = {}
+        self.estatisticas = {}
+
+    def registrar(self, nome, carregar):
+        with self._trava:
+            if nome not in self._carregadores:
+                self._carregadores[nome] = carregar
+                self._livres[nome] = []
+                self.estatisticas[nome] = {'cargas': 0, 'emprestimos': 0, 'tempo_carga_s': 0.0}
+
+    def pegar(self, nome):
+        with self._trava:
+            if nome not in self._carregadores:
+                raise KeyError(f"Modelo não registrado: {nome}")
+            self.estatisticas[nome]['emprestimos'] += 1
+            if self._livres[nome]:
+                return self._livres[nome].pop()
+            carregar = self._carregadores[nome]
+
+        # Carrega fora da trava para não bloquear quem só quer uma instância já pronta
+        inicio = time.perf_counter()
+        instancia = carregar()
+        duracao = time.perf_counter() - inicio
+        with self._trava:
+            self.estatisticas[nome]['cargas'] += 1
+            self.estatisticas[nome]['tempo_carga_s'] += duracao
+        print(f"[Modelos] '{nome}' carregado em {duracao * 1000:.1f} ms")
+        return instancia
+
+    def devolver(self, nome, instancia):
+        with self._trava:
+            self._livres[nome].append(instancia)
+
+    @contextmanager
+    def emprestar(self, nome):
+        instancia = self.pegar(nome)
+        try:
+            yield instancia
+        finally:
+            self.devolver(nome, instancia)
+
+    def aquecer(self, nome, quantidade=1):
+        """Deixa `quantidade` instâncias prontas no pool (ex.: em uma thread de fundo)."""
+        instancias = [self.pegar(nome) for _ in range(quantidade)]
+        for instancia in instancias:
+            self.devolver(nome, instancia)
+
+    def relatorio(self):
+        with self._trava:
+            return {nome: dict(dados, livres=len(self._livres[nome])) for nome, dados in self.estatisticas.items()}
+
+
+registro = RegistroModelos()
+
+def emprestar_cascade(caminho=CASCADE_CARROS):
+    """Empresta (context manager) um `CascadeClassifier` do pool do processo."""
+    registro.registrar(caminho, lambda: carregar_cascade(caminho))
+    return registro.emprestar(caminho)
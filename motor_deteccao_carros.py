@@ -0,0 +1,194 @@
+import json
+import os
+import time
+import numpy as np
+
+from rastreamento import matriz_iou, de_xywh
+from modelos import carregar_cascade, CASCADE_CARROS
+from inicializacao import importacao_preguicosa
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+SCALE_FACTOR = 1.05
+MIN_NEIGHBORS = 5
+MIN_SIZE = (50, 50)
+JANELA_CASCADE = 20          # Tamanho da janela de treino do cars.xml (20x20)
+ESCALA_MOVIMENTO = 0.25      # A subtração de fundo roda em uma miniatura
+AREA_MIN_MOVIMENTO = 0.0005  # Fração do quadro abaixo da qual a região de movimento é ruído
+FRACAO_QUADRO_INTEIRO = 0.6  # Se o movimento cobre mais que isso, roda no quadro inteiro
+FORCAR_A_CADA = 30           # Roda no quadro inteiro a cada N quadros (carros parados)
+LIMIAR_NMS = 0.5
+
+
+def carregar_roi(caminho):
+    """Lê um polígono [[x, y], ...] (coordenadas do quadro original) de um arquivo JSON."""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return [tuple(p) for p in json.load(f)]
+
+
+def suprimir_duplicadas(caixas, limiar=LIMIAR_NMS):
+    """Remove caixas (x, y, w, h) muito sobrepostas, mantendo as maiores."""
+    if len(caixas) < 2:
+        return list(caixas)
+    ordem = sorted(range(len(caixas)), key=lambda i: caixas[i][2] * caixas[i][3], reverse=True)
+    iou = matriz_iou([de_xywh(caixas[i]) for i in ordem], [de_xywh(caixas[i]) for i in ordem])
+    mantidas = []  # Posições em `ordem` (as linhas/colunas de `iou`)
+    for posicao in range(len(ordem)):
+        if not mantidas or iou[posicao, mantidas].max() < limiar:
+            mantidas.append(posicao)
+    return [caixas[ordem[posicao]] for posicao in mantidas]
+
+
+class MotorDeteccaoCarros:
+    """Acelera o `detectMultiScale` do detector de carros.
+
+    Três recursos independentes:
+    - `escala`: roda a cascade em um quadro reduzido e reescala as caixas (a menor escala
+      útil é JANELA_CASCADE / MIN_SIZE, ou seja, 0.4 para o cars.xml);
+    - `roi`: polígono da estrada; a busca fica restrita ao retângulo que o envolve e só
+      valem as caixas com o centro dentro do polígono;
+    - `usar_movimento`: subtração de fundo (MOG2) em uma miniatura; sem movimento a
+      cascade não roda, e com movimento roda só nas regiões que mudaram.
+    Com escala 1.0, sem ROI e sem movimento, o resultado é o mesmo da detecção original.
+    """
+
+    def __init__(self, classificador, escala=1.0, roi=None, usar_movimento=False,
+                 scale_factor=SCALE_FACTOR, min_neighbors=MIN_NEIGHBORS, min_size=MIN_SIZE,
+                 forcar_a_cada=FORCAR_A_CADA):
+        self.classificador = classificador
+        self.escala = escala
+        self.roi = np.array(roi, dtype=np.int32) if roi else None
+        self.usar_movimento = usar_movimento
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.forcar_a_cada = forcar_a_cada
+        self.min_size_reduzido = tuple(max(JANELA_CASCADE, int(round(s * escala))) for s in min_size)
+        self._subtrator = cv2.createBackgroundSubtractorMOG2(history=200, detectShadows=False) if usar_movimento else None
+        self._quadros = 0
+        self.quadros_pulados = 0
+
+    def _regioes_de_busca(self, frame):
+        """Retângulos (x, y, w, h) em coordenadas originais onde a cascade deve rodar."""
+        altura, largura = frame.shape[:2]
+        area_total = (0, 0, largura, altura)
+        if self.roi is not None:
+            # O polígono pode sair do quadro (ROI de outra resolução ou desenhada além da borda)
+            x, y, w, h = cv2.boundingRect(self.roi)
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(largura, x + w), min(altura, y + h)
+            if x2 <= x1 or y2 <= y1:
+                return []
+            area_total = (x1, y1, x2 - x1, y2 - y1)
+
+        if self._subtrator is None:
+            return [area_total]
+
+        self._quadros += 1
+        miniatura = cv2.resize(frame, (0, 0), fx=ESCALA_MOVIMENTO, fy=ESCALA_MOVIMENTO, interpolation=cv2.INTER_AREA)
+        mascara = self._subtrator.apply(miniatura)
+        if self.forcar_a_cada and self._quadros % self.forcar_a_cada == 0:
+            return [area_total]
+
+        mascara = cv2.dilate(cv2.threshold(mascara, 127, 255, cv2.THRESH_BINARY)[1], None, iterations=3)
+        contornos, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        area_min = AREA_MIN_MOVIMENTO * mascara.shape[0] * mascara.shape[1]
+        margem = int(MIN_SIZE[0] / 2)
+        regioes, area_regioes = [], 0
+        ax, ay, aw, ah = area_total
+        for contorno in contornos:
+            if cv2.contourArea(contorno) < area_min:
+                continue
+            x, y, w, h = (int(v / ESCALA_MOVIMENTO) for v in cv2.boundingRect(contorno))
+            # Expande a região (a cascade precisa de contexto) e recorta à área de busca
+            x1, y1 = max(ax, x - margem), max(ay, y - margem)
+            x2, y2 = min(ax + aw, x + w + margem), min(ay + ah, y + h + margem)
+            if x2 - x1 >= MIN_SIZE[0] and y2 - y1 >= MIN_SIZE[1]:
+                regioes.append((x1, y1, x2 - x1, y2 - y1))
+                area_regioes += (x2 - x1) * (y2 - y1)
+
+        if not regioes:
+            self.quadros_pulados += 1
+        elif area_regioes > FRACAO_QUADRO_INTEIRO * aw * ah:
+            return [area_total]
+        return regioes
+
+    def detectar(self, frame):
+        """Retorna as caixas (x, y, w, h) dos carros em coordenadas do quadro original."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        caixas = []
+        regioes = self._regioes_de_busca(frame)
+        for (rx, ry, rw, rh) in regioes:
+            recorte = gray[ry:ry + rh, rx:rx + rw]
+            if self.escala != 1.0:
+                recorte = cv2.resize(recorte, (0, 0), fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+            for (x, y, w, h) in self.classificador.detectMultiScale(
+                    recorte, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size_reduzido):
+                caixas.append((int(rx + x / self.escala), int(ry + y / self.escala), int(w / self.escala), int(h / self.escala)))
+
+        if self.roi is not None:
+            caixas = [(x, y, w, h) for (x, y, w, h) in caixas
+                      if cv2.pointPolygonTest(self.roi, (x + w / 2, y + h / 2), False) >= 0]
+        if len(regioes) > 1:
+            caixas = suprimir_duplicadas(caixas)
+        return caixas
+
+
+# --- Comparação com a detecção original (quadro inteiro) ---
+
+def comparar_com_referencia(caminho_video, classificador, limite_quadros=300, limiar_iou=0.5, **parametros):
+    """Precisão/recall (IoU >= limiar) e FPS do motor contra a detecção de quadro inteiro."""
+    referencia = MotorDeteccaoCarros(classificador)
+    motor = MotorDeteccaoCarros(classificador, **parametros)
+    cap = cv2.VideoCapture(caminho_video)
+    tempo_ref = tempo_motor = 0.0
+    verdadeiros = total_ref = total_motor = quadros = 0
+    while quadros < limite_quadros:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        quadros += 1
+        inicio = time.perf_counter()
+        caixas_ref = referencia.detectar(frame)
+        tempo_ref += time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        caixas_motor = motor.detectar(frame)
+        tempo_motor += time.perf_counter() - inicio
+
+        total_ref += len(caixas_ref)
+        total_motor += len(caixas_motor)
+        if caixas_ref and caixas_motor:
+            iou = matriz_iou([de_xywh(c) for c in caixas_ref], [de_xywh(c) for c in caixas_motor])
+            verdadeiros += int(np.sum(iou.max(axis=1) >= limiar_iou))
+    cap.release()
+    return {
+        'quadros': quadros,
+        'parametros': {k: v for k, v in parametros.items() if k != 'roi'} | {'roi': parametros.get('roi') is not None},
+        'fps_referencia': round(quadros / tempo_ref, 2) if tempo_ref else 0.0,
+        'fps_motor': round(quadros / tempo_motor, 2) if tempo_motor else 0.0,
+        'recall': round(verdadeiros / total_ref, 4) if total_ref else 1.0,
+        'precisao': round(verdadeiros / total_motor, 4) if total_motor else 1.0,
+        'quadros_sem_movimento': motor.quadros_pulados,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compara o motor acelerado com a detecção de carros em quadro inteiro.")
+    parser.add_argument('video')
+    parser.add_argument('--classificador', default=CASCADE_CARROS)
+    parser.add_argument('--escalas', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.4])
+    parser.add_argument('--roi', help="Arquivo JSON com o polígono da estrada [[x, y], ...]")
+    parser.add_argument('--movimento', action='store_true', help="Também avalia com a subtração de fundo ligada")
+    parser.add_argument('--quadros', type=int, default=300)
+    args = parser.parse_args()
+
+    classificador = carregar_cascade(args.classificador)
+    roi = carregar_roi(args.roi)
+    for escala in args.escalas:
+        for movimento in ([False, True] if args.movimento else [False]):
+            print(json.dumps(comparar_com_referencia(
+                args.video, classificador, args.quadros, escala=escala, roi=roi, usar_movimento=movimento)))
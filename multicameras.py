@@ -0,0 +1,423 @@
+import argparse
+import math
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from inicializacao import importacao_preguicosa
+from galeria import obter_galeria
+from prototipos import criar_comparador
+from metricas import metricas, adicionar_argumentos_metricas, configurar_metricas
+from pipeline_video import politica_para_fonte, DESCARTAR_ANTIGO
+from pool_codificacao import PoolCodificacao, ESCALA_DETECCAO
+from detectores_rosto import DETECTOR_PADRAO
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+ARQUIVO_DADOS = 'dados_registrados.json'
+TOLERANCIA = 0.6
+TIPO_INDICE = 'exato'
+MAX_POR_FLUXO = 2                   # Quadros de uma mesma câmera no pool ao mesmo tempo
+BYTES_POR_SLOT = 1920 * 1080 * 3    # Slots da memória compartilhada comportam até 1080p
+TAMANHO_BLOCO = (640, 360)          # (largura, altura) de cada câmera no mosaico
+JANELA_ESTATISTICAS = 5.0           # Segundos considerados no FPS/latência por câmera
+INTERVALO_RELATORIO = 5.0
+INTERVALO_ACOMPANHAMENTO = 2.0      # Segundos entre verificações de cadastros novos na galeria
+INTERVALO_ESPERA = 0.005
+
+
+class EstatisticasFluxo:
+    """FPS e latência (captura -> resultado) recentes de uma câmera."""
+
+    def __init__(self):
+        self.lidos = 0
+        self.descartados = 0
+        self.processados = 0
+        self._conclusoes = deque(maxlen=1024)
+
+    def registrar(self, latencia):
+        self.processados += 1
+        self._conclusoes.append((time.perf_counter(), latencia))
+
+    def resumo(self):
+        agora = time.perf_counter()
+        recentes = [(t, l) for t, l in list(self._conclusoes) if agora - t <= JANELA_ESTATISTICAS]
+        resumo = {'lidos': self.lidos, 'processados': self.processados, 'descartados': self.descartados,
+                  'fps': 0.0, 'latencia_p50_ms': None, 'latencia_p95_ms': None}
+        if len(recentes) >= 2 and recentes[-1][0] > recentes[0][0]:
+            resumo['fps'] = round((len(recentes) - 1) / (recentes[-1][0] - recentes[0][0]), 2)
+        if recentes:
+            latencias = np.array([l for _, l in recentes]) * 1000
+            resumo['latencia_p50_ms'] = round(float(np.percentile(latencias, 50)), 1)
+            resumo['latencia_p95_ms'] = round(float(np.percentile(latencias, 95)), 1)
+        return resumo
+
+
+class FluxoCamera:
+    """Captura de uma fonte em uma thread própria.
+
+    Guarda um único quadro pendente: em câmeras ao vivo o quadro novo substitui o que o
+    escalonador ainda não pegou (e conta como descartado); em arquivos a captura espera.
+    """
+
+    def __init__(self, indice, fonte, abrir_captura=None):
+        self.indice = indice
+        self.nome = f"cam{indice}"
+        self.fonte = fonte
+        self.politica = politica_para_fonte(fonte)
+        self.abrir_captura = abrir_captura or cv2.VideoCapture
+        self.estatisticas = EstatisticasFluxo()
+        self.em_andamento = 0
+        self.ultimo_exibido = -1
+        self.erro = None
+        self._pendente = None
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._capturar, name=f"captura_{self.nome}", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+
+    @property
+    def capturando(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def terminou(self):
+        return not self.capturando and self._pendente is None and self.em_andamento == 0
+
+    def pegar(self):
+        """O quadro pendente (ou None), liberando a captura de arquivos para ler o próximo."""
+        with self._condicao:
+            quadro, self._pendente = self._pendente, None
+            self._condicao.notify_all()
+        return quadro
+
+    def _capturar(self):
+        cap = None
+        try:
+            cap = self.abrir_captura(self.fonte)
+            if not cap.isOpened():
+                raise IOError(f"Não foi possível abrir a fonte de vídeo: {self.fonte}")
+            indice = 0
+            while not self._parar.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                quadro = {'indice': indice, 'frame': frame, 'capturado_em': time.time()}
+                indice += 1
+                self.estatisticas.lidos += 1
+                with self._condicao:
+                    if self.politica != DESCARTAR_ANTIGO:
+                        while self._pendente is not None and not self._parar.is_set():
+                            self._condicao.wait(0.1)
+                    elif self._pendente is not None:
+                        self.estatisticas.descartados += 1
+                        metricas.contar(f"{self.nome}.descartados")
+                    self._pendente = quadro
+        except Exception as e:
+            self.erro = e
+            print(f"[Multicâmera] {self.nome} ({self.fonte}): {e}")
+        finally:
+            if cap is not None:
+                cap.release()
+
+
+class ReconhecimentoMulticameras:
+    """Reconhecimento em várias câmeras com uma galeria, um índice e um pool de processos.
+
+    Cada câmera captura em sua thread (`FluxoCamera`). O escalonador percorre as câmeras
+    em rodízio e envia ao pool o quadro mais recente de cada uma, com no máximo
+    `max_por_fluxo` quadros por câmera no pool: uma câmera rápida não ocupa os workers
+    das outras. Uma única thread de coleta compara as codificações com a galeria (e
+    aplica os cadastros novos da galeria), então o índice nunca é usado por duas threads.
+    `ao_resultado(fluxo, quadro, deteccoes)` é chamado na thread de coleta; cada detecção
+    é ((top, right, bottom, left) no quadro original, rótulo, distância).
+    """
+
+    def __init__(self, fontes, workers=None, max_por_fluxo=MAX_POR_FLUXO, ao_resultado=None, abrir_captura=None):
+        self.fluxos = [FluxoCamera(i, fonte, abrir_captura) for i, fonte in enumerate(fontes)]
+        self.workers = workers
+        self.max_por_fluxo = max_por_fluxo
+        self.ao_resultado = ao_resultado
+        self.erro = None
+        self._resultados = queue.Queue()
+        self._trava_andamento = threading.Lock()
+        self._parar = threading.Event()
+        self._threads = []
+        self._pool = None
+
+        self.galeria = obter_galeria(arquivo_json=ARQUIVO_DADOS)
+        self.nomes = list(self.galeria.nomes)
+        self.comparador = criar_comparador(TIPO_INDICE, self.galeria)
+        print(f"[Multicâmera] {len(self.nomes)} rostos conhecidos, {len(self.fluxos)} câmeras.")
+
+    def iniciar(self):
+        self._parar.clear()
+        self._pool = PoolCodificacao(self.workers, ESCALA_DETECCAO, DETECTOR_PADRAO, bytes_por_slot=BYTES_POR_SLOT)
+        for fluxo in self.fluxos:
+            fluxo.iniciar()
+        self._threads = [threading.Thread(target=self._escalonar, name='escalonador', daemon=True),
+                         threading.Thread(target=self._coletar, name='coleta', daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def parar(self):
+        self._parar.set()
+        for fluxo in self.fluxos:
+            fluxo.parar()
+
+    @property
+    def ativo(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def encerrar(self):
+        self.parar()
+        for thread in self._threads:
+            thread.join()
+        if self._pool is not None:
+            self._pool.encerrar()
+            self._pool = None
+
+    def executar(self, continuar=None, ao_relatorio=None):
+        """Bloqueia até todas as fontes acabarem (ou `continuar()` retornar False), imprimindo as estatísticas."""
+        self.iniciar()
+        proximo_relatorio = time.perf_counter() + INTERVALO_RELATORIO
+        try:
+            while self.ativo:
+                if continuar is not None and not continuar():
+                    break
+                time.sleep(0.1)
+                if time.perf_counter() >= proximo_relatorio:
+                    (ao_relatorio or self.imprimir_resumo)()
+                    proximo_relatorio += INTERVALO_RELATORIO
+        finally:
+            self.encerrar()
+            self.imprimir_resumo()
+        if self.erro is not None:
+            raise self.erro
+
+    def resumo(self):
+        return [dict(camera=f.nome, fonte=str(f.fonte), em_andamento=f.em_andamento, **f.estatisticas.resumo())
+                for f in self.fluxos]
+
+    def imprimir_resumo(self):
+        for item in self.resumo():
+            print(f"[Multicâmera] {item}")
+
+    # --- Escalonador ---
+
+    def _escalonar(self):
+        inicio = 0
+        try:
+            while not self._parar.is_set():
+                enviados = 0
+                for k in range(len(self.fluxos)):
+                    fluxo = self.fluxos[(inicio + k) % len(self.fluxos)]
+                    if fluxo.em_andamento >= self.max_por_fluxo:
+                        continue
+                    quadro = fluxo.pegar()
+                    if quadro is None:
+                        continue
+                    with self._trava_andamento:
+                        fluxo.em_andamento += 1
+                    futuro = self._pool.submeter(quadro['frame'])  # Espera se todos os slots estiverem ocupados
+                    futuro.add_done_callback(lambda f, fluxo=fluxo, quadro=quadro: self._resultados.put((fluxo, quadro, f)))
+                    enviados += 1
+                # A próxima volta começa pela câmera seguinte: nenhuma fica sempre em primeiro
+                inicio = (inicio + 1) % len(self.fluxos)
+                if not enviados:
+                    if all(f.terminou for f in self.fluxos):
+                        break  # Todas as fontes acabaram e não há nada no pool
+                    time.sleep(INTERVALO_ESPERA)
+        except Exception as e:
+            self._falhar(e)
+        finally:
+            self._resultados.put(None)
+
+    # --- Coleta ---
+
+    def _coletar(self):
+        proximo_acompanhamento = time.perf_counter() + INTERVALO_ACOMPANHAMENTO
+        try:
+            while True:
+                item = self._resultados.get()
+                if item is None:
+                    break
+                fluxo, quadro, futuro = item
+                with self._trava_andamento:
+                    fluxo.em_andamento -= 1
+                if futuro.cancelled():
+                    continue
+                locations, encodings = futuro.result()
+                with metricas.medir(f"{fluxo.nome}.comparacao"):
+                    indices, distancias = self.comparador.identificar(encodings, TOLERANCIA)
+
+                deteccoes = []
+                for location, indice, distancia in zip(locations, indices, distancias):
+                    rotulo = self.nomes[indice] if indice >= 0 else "Desconhecido"
+                    deteccoes.append((location, rotulo, None if indice < 0 else float(distancia)))
+
+                latencia = time.time() - quadro['capturado_em']
+                fluxo.estatisticas.registrar(latencia)
+                metricas.registrar(f"{fluxo.nome}.latencia", latencia)
+                metricas.marcar(f"{fluxo.nome}.reconhecidos")
+                if self.ao_resultado is not None:
+                    self.ao_resultado(fluxo, quadro, deteccoes)
+
+                if time.perf_counter() >= proximo_acompanhamento:
+                    self._acompanhar_galeria()
+                    proximo_acompanhamento = time.perf_counter() + INTERVALO_ACOMPANHAMENTO
+        except Exception as e:
+            self._falhar(e)
+
+    def _acompanhar_galeria(self):
+        alterados = self.galeria.acompanhar()
+        if alterados is None:
+            self.nomes = list(self.galeria.nomes)
+            self.comparador = criar_comparador(TIPO_INDICE, self.galeria)
+            return
+        for indice in alterados:
+            if indice == len(self.nomes):
+                self.nomes.append(self.galeria.nomes[indice])
+            else:
+                self.nomes[indice] = self.galeria.nomes[indice]
+            self.comparador.atualizar(indice, self.galeria.codificacoes[indice], self.galeria.amostras_da_pessoa(indice))
+
+    def _falhar(self, erro):
+        if self.erro is None:
+            self.erro = erro
+        self.parar()
+
+
+# --- Saídas ---
+
+def desenhar_deteccoes(frame, deteccoes):
+    for (top, right, bottom, left), rotulo, _ in deteccoes:
+        cor = (0, 0, 255) if rotulo == "Desconhecido" else (0, 255, 0)
+        cv2.rectangle(frame, (left, top), (right, bottom), cor, 2)
+        cv2.putText(frame, rotulo, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
+    return frame
+
+
+class Mosaico:
+    """Grade com o último quadro anotado de cada câmera e seu FPS/latência."""
+
+    def __init__(self, n_cameras, tamanho_bloco=TAMANHO_BLOCO):
+        self.colunas = math.ceil(math.sqrt(n_cameras))
+        self.linhas = math.ceil(n_cameras / self.colunas)
+        self.tamanho_bloco = tamanho_bloco
+        largura, altura = tamanho_bloco
+        self.imagem = np.zeros((altura * self.linhas, largura * self.colunas, 3), dtype=np.uint8)
+        self._trava = threading.Lock()
+
+    def atualizar(self, fluxo, frame):
+        largura, altura = self.tamanho_bloco
+        fator = min(largura / frame.shape[1], altura / frame.shape[0])
+        reduzido = cv2.resize(frame, (int(frame.shape[1] * fator), int(frame.shape[0] * fator)), interpolation=cv2.INTER_AREA)
+        resumo = fluxo.estatisticas.resumo()
+        texto = f"{fluxo.nome}  {resumo['fps']:.1f} fps"
+        if resumo['latencia_p50_ms'] is not None:
+            texto += f"  {resumo['latencia_p50_ms']:.0f} ms"
+        cv2.putText(reduzido, texto, (8, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
+        cv2.putText(reduzido, texto, (8, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+
+        linha, coluna = divmod(fluxo.indice, self.colunas)
+        y0 = linha * altura + (altura - reduzido.shape[0]) // 2
+        x0 = coluna * largura + (largura - reduzido.shape[1]) // 2
+        with self._trava:
+            self.imagem[y0:y0 + reduzido.shape[0], x0:x0 + reduzido.shape[1]] = reduzido
+            return self.imagem.copy()
+
+
+def executar_sem_janela(fontes, workers, max_por_fluxo, caminho_saida=None):
+    """Modo sem interface: grava as detecções (JSONL/CSV) e imprime as estatísticas por câmera."""
+    from processar_lote import EscritorDeteccoes
+    escritor = EscritorDeteccoes(caminho_saida) if caminho_saida else None
+
+    def ao_resultado(fluxo, quadro, deteccoes):
+        if escritor is None:
+            return
+        escritor.escrever([{
+            'arquivo': str(fluxo.fonte), 'quadro': quadro['indice'], 'timestamp_s': round(quadro['capturado_em'], 3),
+            'x': left, 'y': top, 'w': right - left, 'h': bottom - top, 'rotulo': rotulo,
+            'distancia': None if distancia is None else round(distancia, 4),
+        } for (top, right, bottom, left), rotulo, distancia in deteccoes])
+
+    reconhecimento = ReconhecimentoMulticameras(fontes, workers, max_por_fluxo, ao_resultado)
+    try:
+        reconhecimento.executar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if escritor is not None:
+            escritor.fechar()
+
+
+def executar_com_janela(fontes, workers, max_por_fluxo):
+    """Mosaico em uma janela Tk; fechar a janela encerra todas as câmeras."""
+    import tkinter as tk
+    from tkinter import ttk
+    from renderizador import RenderizadorVideo
+
+    root = tk.Tk()
+    root.title(f"Reconhecimento Facial - {len(fontes)} câmeras")
+    label = ttk.Label(root, anchor=tk.CENTER, background="black")
+    label.pack(fill=tk.BOTH, expand=True)
+    renderizador = RenderizadorVideo(label, nome='multicameras')
+    mosaico = Mosaico(len(fontes))
+
+    def ao_resultado(fluxo, quadro, deteccoes):
+        # Resultados de uma mesma câmera podem chegar fora de ordem; os antigos não são exibidos
+        if quadro['indice'] <= fluxo.ultimo_exibido:
+            return
+        fluxo.ultimo_exibido = quadro['indice']
+        renderizador.enviar(mosaico.atualizar(fluxo, desenhar_deteccoes(quadro['frame'], deteccoes)))
+
+    reconhecimento = ReconhecimentoMulticameras(fontes, workers, max_por_fluxo, ao_resultado)
+    em_execucao = {'ativo': True}
+    thread = threading.Thread(target=reconhecimento.executar, kwargs={'continuar': lambda: em_execucao['ativo']}, daemon=True)
+    thread.start()
+
+    def fechar():
+        em_execucao['ativo'] = False
+        renderizador.parar()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", fechar)
+    root.mainloop()
+    thread.join()
+
+
+def interpretar_fonte(texto):
+    """'0' vira o índice de câmera 0; o resto (arquivo, rtsp://...) é usado como está."""
+    return int(texto) if texto.isdigit() else texto
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconhecimento facial em várias câmeras em um único processo.")
+    parser.add_argument('fontes', nargs='+', help="Índices de câmera, arquivos de vídeo ou URLs (rtsp://...)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Processos de detecção/codificação (padrão: nº de CPUs)")
+    parser.add_argument('--max-por-camera', type=int, default=MAX_POR_FLUXO,
+                        help="Quadros de uma mesma câmera no pool ao mesmo tempo")
+    parser.add_argument('--sem-janela', action='store_true', help="Sem interface: só estatísticas e, com -o, as detecções")
+    parser.add_argument('-o', '--saida', help="Arquivo .jsonl ou .csv com as detecções (modo --sem-janela)")
+    adicionar_argumentos_metricas(parser)
+    args = parser.parse_args()
+    exportador = configurar_metricas(args)
+
+    fontes = [interpretar_fonte(f) for f in args.fontes]
+    if args.sem_janela:
+        executar_sem_janela(fontes, args.workers, args.max_por_camera, args.saida)
+    else:
+        executar_com_janela(fontes, args.workers, args.max_por_camera)
+    if exportador is not None:
+        exportador.encerrar()
@@ -0,0 +1,207 @@
+import queue
+import threading
+import time
+from inicializacao import importacao_preguicosa
+from metricas import metricas
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+TAMANHO_FILA = 2
+DESCARTAR_ANTIGO = 'descartar_antigo'  # Fontes ao vivo: sempre processa o quadro mais recente
+SEM_PERDA = 'sem_perda'                # Arquivos: nenhum quadro é perdido, a captura espera
+INTERVALO_ESPERA = 0.1
+
+FIM = object()  # Marca o fim do fluxo de quadros
+
+
+def politica_para_fonte(fonte):
+    """Câmeras (índice inteiro) descartam quadros antigos; arquivos de vídeo não perdem quadros."""
+    return DESCARTAR_ANTIGO if isinstance(fonte, int) else SEM_PERDA
+
+
+class FilaLimitada:
+    """Fila de tamanho fixo entre dois estágios, com política de descarte configurável."""
+
+    def __init__(self, tamanho=TAMANHO_FILA, politica=SEM_PERDA, nome_metrica=None):
+        self._fila = queue.Queue(maxsize=tamanho)
+        self.politica = politica
+        self.descartados = 0
+        self.nome_metrica = nome_metrica
+
+    def colocar(self, item, parar):
+        if self.politica == DESCARTAR_ANTIGO and item is not FIM:
+            while True:
+                try:
+                    self._fila.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        self._fila.get_nowait()
+                        self.descartados += 1
+                        metricas.contar(self.nome_metrica)
+                    except queue.Empty:
+                        pass
+        while not parar.is_set():
+            try:
+                self._fila.put(item, timeout=INTERVALO_ESPERA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def retirar(self, parar):
+        while not parar.is_set():
+            try:
+                return self._fila.get(timeout=INTERVALO_ESPERA)
+            except queue.Empty:
+                continue
+        return FIM
+
+
+class EstatisticasEstagio:
+    """Contadores de vazão e latência de um estágio."""
+
+    def __init__(self, nome, prefixo_metricas='pipeline'):
+        self.nome = nome
+        self.nome_metrica = f"{prefixo_metricas}.{nome}"
+        self.processados = 0
+        self.tempo_ocupado = 0.0
+        self.inicio = None
+        self.fim = None
+
+    def registrar(self, duracao):
+        self.processados += 1
+        self.tempo_ocupado += duracao
+        metricas.registrar(self.nome_metrica, duracao)
+        metricas.marcar(self.nome_metrica)
+
+    def resumo(self):
+        decorrido = ((self.fim or time.perf_counter()) - self.inicio) if self.inicio else 0.0
+        return {
+            'estagio': self.nome,
+            'quadros': self.processados,
+            'fps': round(self.processados / decorrido, 2) if decorrido > 0 else 0.0,
+            'latencia_media_ms': round(1000 * self.tempo_ocupado / self.processados, 2) if self.processados else 0.0,
+        }
+
+
+class PipelineVideo:
+    """Pipeline de vídeo em estágios, cada um em sua própria thread, ligados por filas limitadas.
+
+    O primeiro estágio é sempre a captura (`cap.read()`); em seguida vêm os estágios
+    informados em `estagios`, uma lista de pares (nome, funcao). Cada função recebe o
+    quadro (um dict com 'indice', 'frame', 'capturado_em' e o que os estágios anteriores
+    acrescentaram) e devolve o quadro para o próximo estágio, ou None para descartá-lo.
+    Assim a latência total fica limitada pelo estágio mais lento, e não pela soma deles.
+    A `politica` (descartar ou não) vale só para a fila entre a captura e o primeiro
+    estágio; as filas seguintes nunca descartam, para que um quadro já detectado não se
+    perca antes de ser desenhado ou registrado. Com as métricas ligadas (metricas.py), cada estágio aparece como '<nome>.<estágio>'.
+    """
+
+    def __init__(self, fonte, estagios, politica=None, tamanho_fila=TAMANHO_FILA, abrir_captura=None, nome='pipeline'):
+        self.fonte = fonte
+        self.politica = politica or politica_para_fonte(fonte)
+        self.erro = None
+        self.abrir_captura = abrir_captura or cv2.VideoCapture
+        self._estagios = list(estagios)
+        self._filas = [FilaLimitada(tamanho_fila, self.politica if i == 0 else SEM_PERDA, f"{nome}.descartados_{estagio}")
+                       for i, (estagio, _) in enumerate(self._estagios)]
+        self._parar = threading.Event()
+        self._threads = []
+        self.estatisticas = [EstatisticasEstagio(estagio, nome) for estagio in ['captura'] + [e for e, _ in self._estagios]]
+
+    def iniciar(self):
+        self._parar.clear()
+        self._threads = [threading.Thread(target=self._capturar, daemon=True)]
+        for i, (_, funcao) in enumerate(self._estagios):
+            saida = self._filas[i + 1] if i + 1 < len(self._filas) else None
+            self._threads.append(threading.Thread(
+                target=self._executar_estagio, args=(funcao, self._filas[i], saida, self.estatisticas[i + 1]), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def aguardar(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def ativo(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def executar(self, continuar=None):
+        """Roda o pipeline até o fim da fonte ou até `continuar()` retornar False.
+
+        Bloqueia a thread chamadora, imprime a vazão de cada estágio e relança o
+        primeiro erro ocorrido em qualquer estágio.
+        """
+        self.iniciar()
+        while self.ativo:
+            if continuar is not None and not continuar():
+                self.parar()
+            self.aguardar(INTERVALO_ESPERA)
+        for item in self.resumo():
+            print(f"[Pipeline] {item}")
+        if self.erro is not None:
+            raise self.erro
+
+    def resumo(self):
+        resumo = [estatistica.resumo() for estatistica in self.estatisticas]
+        for item, fila in zip(resumo[:-1], self._filas):
+            item['descartados'] = fila.descartados
+        return resumo
+
+    def _capturar(self):
+        estatistica = self.estatisticas[0]
+        estatistica.inicio = time.perf_counter()
+        cap = None
+        try:
+            cap = self.abrir_captura(self.fonte)
+            if not cap.isOpened():
+                raise IOError(f"Não foi possível abrir a fonte de vídeo: {self.fonte}")
+            indice = 0
+            while not self._parar.is_set():
+                inicio = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                estatistica.registrar(time.perf_counter() - inicio)
+                quadro = {'indice': indice, 'frame': frame, 'capturado_em': time.time()}
+                indice += 1
+                if self._estagios and not self._filas[0].colocar(quadro, self._parar):
+                    break
+        except Exception as e:
+            self._falhar(e)
+        finally:
+            if cap is not None:
+                cap.release()
+            estatistica.fim = time.perf_counter()
+            if self._filas:
+                self._filas[0].colocar(FIM, self._parar)
+
+    def _executar_estagio(self, funcao, entrada, saida, estatistica):
+        estatistica.inicio = time.perf_counter()
+        try:
+            while True:
+                quadro = entrada.retirar(self._parar)
+                if quadro is FIM:
+                    break
+                inicio = time.perf_counter()
+                quadro = funcao(quadro)
+                estatistica.registrar(time.perf_counter() - inicio)
+                if quadro is not None and saida is not None:
+                    saida.colocar(quadro, self._parar)
+        except Exception as e:
+            self._falhar(e)
+        finally:
+            estatistica.fim = time.perf_counter()
+            if saida is not None:
+                saida.colocar(FIM, self._parar)
+
+    def _falhar(self, erro):
+        if self.erro is None:
+            self.erro = erro
+        self._parar.set()
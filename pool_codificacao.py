@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from inicializacao import importacao_preguicosa
+from detectores_rosto import DetectorAdaptativo, criar_detector, para_quadro, DETECTOR_PADRAO
+
+cv2 = importacao_preguicosa('cv2')
+
+# --- Constantes ---
+ESCALA_DETECCAO = None  # None = adaptativa pela resolução (ver detectores_rosto.py)
+SLOTS_POR_WORKER = 2
+
+# --- Estado de cada processo worker ---
+_memoria_worker = None
+_detector_worker = None
+
+
+def _abrir_memoria(nome):
+    try:
+        return shared_memory.SharedMemory(name=nome, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=nome)
+
+
+def _inicializar_worker(nome_memoria, tipo_detector, escala):
+    global _memoria_worker, _detector_worker
+    _memoria_worker = _abrir_memoria(nome_memoria)
+    import face_recognition  # Carrega os modelos do dlib uma única vez por worker
+    cv2.setNumThreads(1)
+    _detector_worker = DetectorAdaptativo(criar_detector(tipo_detector), escala=escala)
+
+
+def detectar_e_codificar(detector, frame):
+    """Rostos (em coordenadas do quadro original) e codificações de um quadro BGR."""
+    import face_recognition
+    rgb, locations, escala = detector.detectar(frame)
+    encodings = face_recognition.face_encodings(rgb, locations)
+    return [para_quadro(location, escala) for location in locations], encodings
+
+
+def _processar_slot(deslocamento, forma):
+    # O frame é lido direto da memória compartilhada, sem cópia serializada
+    frame = np.ndarray(forma, dtype=np.uint8, buffer=_memoria_worker.buf, offset=deslocamento)
+    return detectar_e_codificar(_detector_worker, frame)
+
+
+def _processar_copia(frame):
+    return detectar_e_codificar(_detector_worker, frame)
+
+
+class PoolCodificacao:
+    """Detecção + codificação de rostos distribuídas em um pool de processos.
+
+    Os frames vão para os workers por uma área de memória compartilhada dividida em
+    slots (um frame por slot); só o deslocamento e a forma do frame são serializados.
+    `submeter` devolve um Future; consumir os Futures na ordem de submissão (como faz
+    o pipeline, que é FIFO) mantém a exibição na ordem dos quadros mesmo que os
+    workers terminem fora de ordem. Cada worker tem o seu `DetectorAdaptativo` e as
+    locations voltam nas coordenadas do quadro original.
+    """
+
+    def __init__(self, workers=None, escala=ESCALA_DETECCAO, detector=DETECTOR_PADRAO,
+                 slots_por_worker=SLOTS_POR_WORKER, bytes_por_slot=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.escala = escala
+        self.detector = detector
+        self.n_slots = self.workers * slots_por_worker
+        self.bytes_por_slot = bytes_por_slot  # None = tamanho do primeiro frame
+        self._executor = None
+        self._memoria = None
+        self._tamanho_slot = 0
+        self._slots_livres = []
+        self._condicao = threading.Condition()
+
+    def _iniciar(self, frame):
+        # Sem `bytes_por_slot`, o tamanho do slot só é conhecido no primeiro frame
+        self._tamanho_slot = self.bytes_por_slot or frame.nbytes
+        self._memoria = shared_memory.SharedMemory(create=True, size=self._tamanho_slot * self.n_slots)
+        self._slots_livres = list(range(self.n_slots))
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_inicializar_worker,
+            initargs=(self._memoria.name, self.detector, self.escala))
+
+    def submeter(self, frame):
+        """Envia um frame BGR para o pool. Bloqueia se todos os slots estiverem ocupados."""
+        if self._executor is None:
+            self._iniciar(frame)
+        if frame.dtype != np.uint8 or frame.nbytes > self._tamanho_slot:
+            # Frame fora do formato dos slots: cai para a cópia serializada
+            return self._executor.submit(_processar_copia, frame)
+
+        with self._condicao:
+            while not self._slots_livres:
+                self._condicao.wait()
+            slot = self._slots_livres.pop()
+        deslocamento = slot * self._tamanho_slot
+        destino = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._memoria.buf, offset=deslocamento)
+        destino[...] = frame
+        futuro = self._executor.submit(_processar_slot, deslocamento, frame.shape)
+        futuro.add_done_callback(lambda _: self._liberar_slot(slot))
+        return futuro
+
+    def _liberar_slot(self, slot):
+        with self._condicao:
+            self._slots_livres.append(slot)
+            self._condicao.notify()
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._memoria is not None:
+            self._memoria.close()
+            self._memoria.unlink()
+            self._memoria = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar()
+
+
+# --- Benchmark de escalabilidade ---
+
+def ler_quadros(caminho_video, limite):
+    cap = cv2.VideoCapture(caminho_video)
+    quadros = []
+    while len(quadros) < limite:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        quadros.append(frame)
+    cap.release()
+    return quadros
+
+
+def medir_escalabilidade(quadros, lista_workers, escala=ESCALA_DETECCAO, detector=DETECTOR_PADRAO):
+    """Quadros por segundo de detecção + codificação para cada quantidade de workers."""
+    resultados = []
+    detector_local = DetectorAdaptativo(criar_detector(detector), escala=escala)
+    inicio = time.perf_counter()
+    for frame in quadros:
+        detectar_e_codificar(detector_local, frame)
+    base = len(quadros) / (time.perf_counter() - inicio)
+    resultados.append({'workers': 0, 'quadros_por_segundo': round(base, 2), 'aceleracao': 1.0})
+
+    for workers in lista_workers:
+        with PoolCodificacao(workers, escala, detector) as pool:
+            pool.submeter(quadros[0]).result()  # Aquece os workers (import do dlib)
+            inicio = time.perf_counter()
+            futuros = [pool.submeter(frame) for frame in quadros]
+            for futuro in futuros:
+                futuro.result()
+            qps = len(quadros) / (time.perf_counter() - inicio)
+        resultados.append({'workers': workers, 'quadros_por_segundo': round(qps, 2), 'aceleracao': round(qps / base, 2)})
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmark de escalabilidade do pool de codificação de rostos.")
+    parser.add_argument('video', help="Arquivo de vídeo usado como fonte dos quadros")
+    parser.add_argument('--quadros', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    quadros = ler_quadros(args.video, args.quadros)
+    if not quadros:
+        raise SystemExit(f"Nenhum quadro lido de '{args.video}'.")
+    for resultado in medir_escalabilidade(quadros, args.workers):
+        print(json.dumps(resultado))
@@ -0,0 +1,178 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+from modelos import carregar_cascade, CASCADE_CARROS
+
+# --- Constantes ---
+EXTENSOES_VIDEO = ('.mp4', '.avi', '.mov', '.mkv')
+CAMPOS_SAIDA = ['arquivo', 'quadro', 'timestamp_s', 'x', 'y', 'w', 'h', 'rotulo', 'distancia']
+
+CLASSIFICADOR_PATH = CASCADE_CARROS
+SCALE_FACTOR = 1.05
+MIN_NEIGHBORS = 5
+
+ESCALA_DETECCAO = None  # None = adaptativa pela resolução do vídeo (ver detectores_rosto.py)
+DETECTOR_ROSTOS = 'hog'
+TOLERANCIA = 0.6
+TIPO_INDICE = 'exato'
+
+
+def listar_videos(entradas):
+    """Expande arquivos e pastas (recursivamente) em uma lista de vídeos."""
+    videos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for pasta, _, arquivos in os.walk(entrada):
+                videos.extend(os.path.join(pasta, a) for a in sorted(arquivos) if a.lower().endswith(EXTENSOES_VIDEO))
+        elif os.path.isfile(entrada):
+            videos.append(entrada)
+        else:
+            print(f"[Lote] Entrada ignorada (não encontrada): {entrada}")
+    return videos
+
+
+# --- Detectores (sem nada de Tk/PIL) ---
+
+class DetectorCarros:
+    def __init__(self):
+        self.classificador = carregar_cascade(CLASSIFICADOR_PATH)
+
+    def detectar(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        carros = self.classificador.detectMultiScale(
+            gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=(50, 50))
+        return [((int(x), int(y), int(w), int(h)), 'Carro', None) for (x, y, w, h) in carros]
+
+
+class DetectorRostos:
+    def __init__(self):
+        import face_recognition
+        from galeria import obter_galeria
+        from prototipos import criar_comparador
+        from detectores_rosto import DetectorAdaptativo, criar_detector
+        self.face_recognition = face_recognition
+        self.detector = DetectorAdaptativo(criar_detector(DETECTOR_ROSTOS), escala=ESCALA_DETECCAO)
+        # Vários workers abrem a galeria ao mesmo tempo: só leem (a migração é feita pelo processo principal)
+        galeria = obter_galeria(somente_leitura=True)
+        self.nomes = list(galeria.nomes)
+        self.comparador = criar_comparador(TIPO_INDICE, galeria)
+
+    def detectar(self, frame):
+        rgb_small_frame, locations, escala = self.detector.detectar(frame)
+        encodings = self.face_recognition.face_encodings(rgb_small_frame, locations)
+        indices, distancias = self.comparador.identificar(encodings, TOLERANCIA)
+
+        fator = 1 / escala
+        deteccoes = []
+        for (top, right, bottom, left), indice, distancia in zip(locations, indices, distancias):
+            caixa = (int(left * fator), int(top * fator), int((right - left) * fator), int((bottom - top) * fator))
+            rotulo = self.nomes[indice] if indice >= 0 else "Desconhecido"
+            deteccoes.append((caixa, rotulo, round(float(distancia), 4) if distancia != float('inf') else None))
+        return deteccoes
+
+
+DETECTORES = {
+    'carros': DetectorCarros,
+    'rostos': DetectorRostos,
+}
+
+
+def processar_video(caminho, tipo_detector, a_cada=1):
+    """Roda o detector em um vídeo e devolve (registros, quadros lidos, segundos)."""
+    detector = DETECTORES[tipo_detector]()
+    cap = cv2.VideoCapture(caminho)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir a fonte de vídeo: {caminho}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    registros = []
+    indice = 0
+    inicio = time.perf_counter()
+    while True:
+        if indice % a_cada:
+            # grab() avança sem decodificar o quadro
+            if not cap.grab():
+                break
+            indice += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = indice / fps if fps > 0 else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        for (x, y, w, h), rotulo, distancia in detector.detectar(frame):
+            registros.append({
+                'arquivo': caminho, 'quadro': indice, 'timestamp_s': round(timestamp, 3),
+                'x': x, 'y': y, 'w': w, 'h': h, 'rotulo': rotulo, 'distancia': distancia,
+            })
+        indice += 1
+    cap.release()
+    return registros, indice, time.perf_counter() - inicio
+
+
+class EscritorDeteccoes:
+    """Grava as detecções em JSONL ou CSV, conforme a extensão do arquivo de saída."""
+
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, 'w', encoding='utf-8', newline='')
+        self.csv = None
+        if caminho.lower().endswith('.csv'):
+            self.csv = csv.DictWriter(self.arquivo, fieldnames=CAMPOS_SAIDA)
+            self.csv.writeheader()
+
+    def escrever(self, registros):
+        if self.csv is not None:
+            self.csv.writerows(registros)
+        else:
+            self.arquivo.writelines(json.dumps(r, ensure_ascii=False) + '\n' for r in registros)
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+def processar_lote(videos, tipo_detector, caminho_saida, processos=None, a_cada=1):
+    """Processa os vídeos em paralelo (um vídeo por processo) e grava as detecções à medida que terminam."""
+    if tipo_detector == 'rostos':
+        from galeria import obter_galeria
+        obter_galeria()  # Migra o JSON antigo uma vez, antes dos workers abrirem a galeria
+    escritor = EscritorDeteccoes(caminho_saida)
+    total_quadros, inicio = 0, time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = {executor.submit(processar_video, v, tipo_detector, a_cada): v for v in videos}
+            for futuro in as_completed(futuros):
+                video = futuros[futuro]
+                try:
+                    registros, quadros, segundos = futuro.result()
+                except Exception as e:
+                    print(f"[Lote] Erro em '{video}': {e}")
+                    continue
+                escritor.escrever(registros)
+                total_quadros += quadros
+                print(f"[Lote] {video}: {quadros} quadros, {len(registros)} detecções, "
+                      f"{quadros / segundos if segundos > 0 else 0:.1f} quadros/s")
+    finally:
+        escritor.fechar()
+    decorrido = time.perf_counter() - inicio
+    print(f"[Lote] {len(videos)} vídeos, {total_quadros} quadros em {decorrido:.1f}s "
+          f"({total_quadros / decorrido if decorrido > 0 else 0:.1f} quadros/s no total)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Processa vídeos sem interface gráfica e grava as detecções em JSONL/CSV.",
+        epilog="Ex.: python processar_lote.py carros gravacoes/ -o carros.jsonl --processos 8")
+    parser.add_argument('detector', choices=list(DETECTORES))
+    parser.add_argument('entradas', nargs='+', help="Arquivos de vídeo e/ou pastas")
+    parser.add_argument('-o', '--saida', default='deteccoes.jsonl', help="Arquivo de saída (.jsonl ou .csv)")
+    parser.add_argument('-p', '--processos', type=int, default=None, help="Vídeos processados em paralelo (padrão: nº de CPUs)")
+    parser.add_argument('--a-cada', type=int, default=1, help="Processa apenas 1 a cada N quadros")
+    args = parser.parse_args()
+
+    videos = listar_videos(args.entradas)
+    if not videos:
+        raise SystemExit("Nenhum vídeo encontrado.")
+    processar_lote(videos, args.detector, args.saida, args.processos, max(1, args.a_cada))
@@ -0,0 +1,84 @@
+import threading
+import numpy as np
+
+from correspondencia import DIMENSAO_CODIFICACAO, DTYPE_PADRAO
+from indices_busca import criar_indice
+
+# --- Constantes ---
+K_CANDIDATOS = 5  # Pessoas (pelos protótipos) cujas amostras são conferidas
+
+
+class ComparadorPrototipos:
+    """Comparação em duas etapas para pessoas com várias amostras.
+
+    O índice de busca (exato, IVF ou HNSW) guarda só os protótipos, uma linha por
+    pessoa, então o custo da primeira etapa não cresce com o número de fotos. Em
+    seguida, para os `k_candidatos` protótipos mais próximos, a distância passa a ser a
+    menor entre o protótipo e as amostras da pessoa, o que cobre quem tem aparências
+    bem diferentes (com e sem óculos, luz forte/fraca) que a média sozinha aproxima mal.
+    Enquanto ninguém tiver mais de uma amostra, `melhores` é só o do índice.
+
+    Os apps atualizam o comparador na thread do Tk (cadastros, `acompanhar`) enquanto a
+    do pipeline busca nele; uma trava faz cada busca ver a galeria antes ou depois de
+    uma atualização, nunca no meio (ex.: matriz e normas de tamanhos diferentes).
+    """
+
+    def __init__(self, indice, k_candidatos=K_CANDIDATOS):
+        self.indice = indice
+        self.k_candidatos = k_candidatos
+        self._amostras = {}  # índice da pessoa -> amostras (k x 128), só de quem tem mais de uma
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self.indice)
+
+    def carregar(self, prototipos, amostras=None):
+        """Substitui a galeria. `amostras` é um dict índice -> matriz de amostras."""
+        with self._trava:
+            self.indice.carregar(prototipos)
+            self._amostras = {}
+            for indice, matriz in (amostras or {}).items():
+                self._guardar_amostras(indice, matriz)
+
+    def atualizar(self, indice, prototipo, amostras=None):
+        with self._trava:
+            indice = self.indice.atualizar(indice, prototipo)
+            self._amostras.pop(indice, None)
+            if amostras is not None:
+                self._guardar_amostras(indice, amostras)
+            return indice
+
+    def _guardar_amostras(self, indice, amostras):
+        if len(amostras) > 1:
+            self._amostras[indice] = np.asarray(amostras, dtype=DTYPE_PADRAO)
+
+    def melhores(self, codificacoes):
+        with self._trava:
+            return self._melhores(codificacoes)
+
+    def _melhores(self, codificacoes):
+        if not self._amostras:
+            return self.indice.melhores(codificacoes)
+        candidatos, distancias = self.indice.candidatos(codificacoes, self.k_candidatos)
+        consultas = np.asarray(codificacoes, dtype=DTYPE_PADRAO).reshape(-1, DIMENSAO_CODIFICACAO)
+        for i, consulta in enumerate(consultas):
+            for j, pessoa in enumerate(candidatos[i]):
+                amostras = self._amostras.get(int(pessoa))
+                if amostras is not None:
+                    diferencas = amostras - consulta
+                    distancias[i, j] = min(distancias[i, j], np.sqrt(np.einsum('ij,ij->i', diferencas, diferencas).min()))
+        melhor = np.argmin(distancias, axis=1)
+        linhas = np.arange(len(consultas))
+        return candidatos[linhas, melhor], distancias[linhas, melhor]
+
+    def identificar(self, codificacoes, tolerancia):
+        indices, distancias = self.melhores(codificacoes)
+        return np.where(distancias <= tolerancia, indices, -1), distancias
+
+
+def criar_comparador(tipo, galeria, **parametros):
+    """Comparador de duas etapas sobre os protótipos e as amostras de uma `GaleriaRostos`."""
+    amostras = {i: galeria.amostras_da_pessoa(i) for i, linhas in enumerate(galeria.amostras) if linhas}
+    comparador = ComparadorPrototipos(criar_indice(tipo, **parametros))
+    comparador.carregar(galeria.codificacoes, amostras)
+    return comparador
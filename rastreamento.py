@@ -0,0 +1,171 @@
+import itertools
+import numpy as np
+
+# --- Constantes ---
+INTERVALO_DETECCAO = 5      # Detecção completa a cada N quadros; 1 desliga o rastreamento
+LIMIAR_IOU = 0.3
+MAX_QUADROS_CHAVE_PERDIDOS = 1
+REIDENTIFICAR_A_CADA = 5    # Quadros-chave entre novas tentativas para trilhas desconhecidas
+
+
+# --- Conversões de caixas (todas as caixas internas são (x1, y1, x2, y2)) ---
+
+def de_location(location):
+    """(top, right, bottom, left) do face_recognition -> (x1, y1, x2, y2)."""
+    top, right, bottom, left = location
+    return (left, top, right, bottom)
+
+def para_location(caixa):
+    x1, y1, x2, y2 = (int(round(v)) for v in caixa)
+    return (y1, x2, y2, x1)
+
+def de_xywh(caixa):
+    """(x, y, w, h) do OpenCV -> (x1, y1, x2, y2)."""
+    x, y, w, h = caixa
+    return (x, y, x + w, y + h)
+
+def para_xywh(caixa):
+    x1, y1, x2, y2 = (int(round(v)) for v in caixa)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def matriz_iou(caixas_a, caixas_b):
+    """IoU de todos os pares (a x b), vetorizado."""
+    a = np.asarray(caixas_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(caixas_b, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersecao = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    uniao = area_a[:, None] + area_b[None, :] - intersecao
+    return np.where(uniao > 0, intersecao / np.maximum(uniao, 1e-9), 0.0)
+
+
+class Trilha:
+    """Um objeto seguido entre quadros, com a identidade em cache."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, caixa, indice_quadro):
+        self.id = next(self._ids)
+        self.caixa = tuple(float(v) for v in caixa)
+        self.velocidade = (0.0, 0.0, 0.0, 0.0)
+        self.ultimo_quadro_chave = indice_quadro
+        self.quadros_chave_perdidos = 0
+        self.identidade = None       # Definida pelo chamador (ex.: índice na galeria, -1 = desconhecido)
+        self.distancia = None
+        self.quadros_chave_sem_identidade = 0
+        self.rastreador_opencv = None
+
+    def corrigir(self, caixa, indice_quadro):
+        passos = max(1, indice_quadro - self.ultimo_quadro_chave)
+        self.velocidade = tuple((n - a) / passos for n, a in zip(caixa, self.caixa))
+        self.caixa = tuple(float(v) for v in caixa)
+        self.ultimo_quadro_chave = indice_quadro
+        self.quadros_chave_perdidos = 0
+
+    def prever(self):
+        self.caixa = tuple(c + v for c, v in zip(self.caixa, self.velocidade))
+
+
+class RastreadorTrilhas:
+    """Detecta só em quadros-chave (ou quando não há trilhas) e segue as caixas entre eles.
+
+    Nos quadros-chave as detecções são associadas às trilhas por IoU; as que sobram viram
+    trilhas novas, que são as únicas que precisam ser identificadas (codificação +
+    comparação). Entre quadros-chave as caixas andam com velocidade constante ou, se
+    `criar_rastreador` for informado (ex.: `cv2.TrackerMIL_create`), com um rastreador do OpenCV.
+    """
+
+    def __init__(self, intervalo_deteccao=INTERVALO_DETECCAO, limiar_iou=LIMIAR_IOU,
+                 max_perdidos=MAX_QUADROS_CHAVE_PERDIDOS, reidentificar_a_cada=REIDENTIFICAR_A_CADA,
+                 criar_rastreador=None):
+        self.intervalo_deteccao = max(1, intervalo_deteccao)
+        self.limiar_iou = limiar_iou
+        self.max_perdidos = max_perdidos
+        self.reidentificar_a_cada = reidentificar_a_cada
+        self.criar_rastreador = criar_rastreador
+        self.trilhas = []
+        self.indice_quadro = -1
+        self._proximo_quadro_chave = 0
+
+    def proximo_e_quadro_chave(self):
+        """Avança um quadro e diz se ele deve passar pela detecção completa."""
+        self.indice_quadro += 1
+        return self.indice_quadro >= self._proximo_quadro_chave or not self.trilhas
+
+    def forcar_quadro_chave(self):
+        self._proximo_quadro_chave = self.indice_quadro + 1
+
+    def associar(self, caixas, frame=None):
+        """Quadro-chave: associa as detecções às trilhas. Retorna as trilhas a identificar."""
+        self._proximo_quadro_chave = self.indice_quadro + self.intervalo_deteccao
+        caixas = [tuple(c) for c in caixas]
+        livres = set(range(len(caixas)))
+        associadas = set()
+
+        if self.trilhas and caixas:
+            iou = matriz_iou([t.caixa for t in self.trilhas], caixas)
+            # Associação gulosa pelos maiores IoU
+            for indice_plano in np.argsort(iou, axis=None)[::-1]:
+                t, c = np.unravel_index(indice_plano, iou.shape)
+                if iou[t, c] < self.limiar_iou:
+                    break
+                if t in associadas or c not in livres:
+                    continue
+                associadas.add(t)
+                livres.discard(c)
+                self.trilhas[t].corrigir(caixas[c], self.indice_quadro)
+                self._iniciar_opencv(self.trilhas[t], frame)
+
+        sobreviventes = []
+        for i, trilha in enumerate(self.trilhas):
+            if i not in associadas:
+                trilha.quadros_chave_perdidos += 1
+            if trilha.quadros_chave_perdidos <= self.max_perdidos:
+                sobreviventes.append(trilha)
+        self.trilhas = sobreviventes
+
+        a_identificar = []
+        for c in sorted(livres):
+            trilha = Trilha(caixas[c], self.indice_quadro)
+            self._iniciar_opencv(trilha, frame)
+            self.trilhas.append(trilha)
+            a_identificar.append(trilha)
+
+        # Trilhas ainda desconhecidas ganham uma nova tentativa de tempos em tempos
+        for trilha in self.trilhas:
+            if trilha in a_identificar or trilha.quadros_chave_perdidos:
+                continue
+            if trilha.identidade is None or trilha.identidade < 0:
+                trilha.quadros_chave_sem_identidade += 1
+                if trilha.quadros_chave_sem_identidade >= self.reidentificar_a_cada:
+                    trilha.quadros_chave_sem_identidade = 0
+                    a_identificar.append(trilha)
+        return a_identificar
+
+    def reidentificar_desconhecidas(self):
+        """Faz as trilhas desconhecidas serem identificadas de novo no próximo quadro-chave."""
+        for trilha in self.trilhas:
+            if trilha.identidade is None or trilha.identidade < 0:
+                trilha.quadros_chave_sem_identidade = self.reidentificar_a_cada
+
+    def seguir(self, frame=None):
+        """Quadro intermediário: move as caixas sem rodar o detector."""
+        for trilha in self.trilhas:
+            if trilha.rastreador_opencv is not None and frame is not None:
+                ok, (x, y, w, h) = trilha.rastreador_opencv.update(frame)
+                if ok:
+                    trilha.caixa = (x, y, x + w, y + h)
+                    continue
+            trilha.prever()
+        return self.trilhas
+
+    def _iniciar_opencv(self, trilha, frame):
+        if self.criar_rastreador is None or frame is None:
+            return
+        trilha.rastreador_opencv = self.criar_rastreador()
+        trilha.rastreador_opencv.init(frame, para_xywh(trilha.caixa))
@@ -0,0 +1,226 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# --- Constantes ---
+ARQUIVO_EVENTOS = 'eventos.db'   # .db = SQLite (WAL); .jsonl = uma linha JSON por evento
+TAMANHO_FILA = 4096
+LOTE_MAXIMO = 500                # Eventos por escrita (uma transação / um write)
+INTERVALO_GRAVACAO = 1.0         # Segundos: eventos esperam no máximo isso na fila
+INTERVALO_REPETICAO = 30.0       # Segundos sem ver a mesma trilha/identidade até ela gerar outro evento
+LIMITE_CHAVES_LEMBRADAS = 10000
+
+CAMPOS_EVENTO = ('timestamp', 'fonte', 'tipo', 'trilha', 'identidade', 'codigo', 'rotulo', 'distancia',
+                 'x1', 'y1', 'x2', 'y2')
+
+_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL, fonte TEXT, tipo TEXT NOT NULL, trilha INTEGER, identidade INTEGER,
+    codigo TEXT, rotulo TEXT, distancia REAL, x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+);
+CREATE INDEX IF NOT EXISTS eventos_timestamp ON eventos (timestamp);
+"""
+_INSERIR = f"INSERT INTO eventos ({', '.join(CAMPOS_EVENTO)}) VALUES ({', '.join('?' * len(CAMPOS_EVENTO))})"
+
+
+def _e_jsonl(caminho):
+    return caminho.lower().endswith('.jsonl')
+
+
+class RegistroEventos:
+    """Fluxo de eventos de reconhecimento/detecção (quem ou o quê foi visto, onde e quando).
+
+    `registrar` roda na thread de detecção e só faz a deduplicação e um `put_nowait`: cada
+    trilha (ou, sem rastreamento, cada identidade) gera um evento ao aparecer, e só volta a
+    gerar depois de `intervalo_repeticao` segundos sem ser vista, em vez de um por quadro.
+    Uma thread grava os eventos em lotes, a cada `lote_maximo` eventos ou
+    `intervalo_gravacao` segundos: em uma transação do SQLite (modo WAL, então
+    `consultar_eventos` lê enquanto o sistema grava) ou em um único write no JSONL.
+    Sem trilha, rostos desconhecidos (identidade -1) e carros compartilham uma chave.
+    """
+
+    def __init__(self, caminho=ARQUIVO_EVENTOS, fonte=None, intervalo_repeticao=INTERVALO_REPETICAO,
+                 lote_maximo=LOTE_MAXIMO, intervalo_gravacao=INTERVALO_GRAVACAO, tamanho_fila=TAMANHO_FILA):
+        self.caminho = caminho
+        self.fonte = None if fonte is None else str(fonte)
+        self.intervalo_repeticao = intervalo_repeticao
+        self.lote_maximo = lote_maximo
+        self.intervalo_gravacao = intervalo_gravacao
+        self.gravados = 0
+        self.repetidos = 0
+        self.descartados = 0
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self._visto_por_chave = {}
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._pronto = threading.Event()
+        self._erro = None
+        self._thread = threading.Thread(target=self._trabalhar, daemon=True)
+        self._thread.start()
+        self._pronto.wait()
+        if self._erro is not None:
+            raise self._erro  # Ex.: arquivo em uma pasta sem permissão de escrita
+
+    def registrar(self, tipo, timestamp=None, trilha=None, identidade=None, codigo=None, rotulo=None,
+                  distancia=None, caixa=None):
+        """Agenda um evento. Retorna False se foi deduplicado ou descartado por fila cheia.
+
+        `caixa` é (x1, y1, x2, y2) no quadro original.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        chave = (tipo, trilha, identidade)
+        visto = self._visto_por_chave.pop(chave, None)
+        self._visto_por_chave[chave] = timestamp  # Reinsere no fim: a ordem do dict é a da última vez vista
+        if len(self._visto_por_chave) > LIMITE_CHAVES_LEMBRADAS:
+            del self._visto_por_chave[next(iter(self._visto_por_chave))]
+        if visto is not None and timestamp - visto < self.intervalo_repeticao:
+            self.repetidos += 1
+            return False
+
+        x1, y1, x2, y2 = (int(v) for v in caixa) if caixa is not None else (None,) * 4  # Ex.: int32 da cascade
+        try:
+            self._fila.put_nowait((timestamp, self.fonte, tipo, trilha, identidade, codigo, rotulo,
+                                   None if distancia is None else round(float(distancia), 4), x1, y1, x2, y2))
+            return True
+        except queue.Full:
+            self.descartados += 1
+            return False
+
+    def _abrir(self):
+        if _e_jsonl(self.caminho):
+            return open(self.caminho, 'a', encoding='utf-8')
+        conexao = sqlite3.connect(self.caminho)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")  # No WAL, só perde o último lote se a máquina cair
+        conexao.executescript(_CRIAR_TABELA)
+        return conexao
+
+    def _trabalhar(self):
+        try:
+            destino = self._abrir()
+        except Exception as e:
+            self._erro = e
+            self._pronto.set()
+            return
+        self._pronto.set()
+        lote, encerrar = [], False
+        prazo = time.monotonic() + self.intervalo_gravacao
+        try:
+            while not encerrar:
+                try:
+                    item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+                    if item is None:
+                        encerrar = True
+                    else:
+                        lote.append(item)
+                        if len(lote) < self.lote_maximo:
+                            continue
+                except queue.Empty:
+                    pass
+                if lote:
+                    try:
+                        self._gravar(destino, lote)
+                        self.gravados += len(lote)
+                    except Exception as e:
+                        print(f"[Eventos] Erro ao gravar {len(lote)} eventos: {e}")
+                    lote = []
+                prazo = time.monotonic() + self.intervalo_gravacao
+        finally:
+            destino.close()
+
+    def _gravar(self, destino, lote):
+        if isinstance(destino, sqlite3.Connection):
+            with destino:  # Uma transação por lote
+                destino.executemany(_INSERIR, lote)
+        else:
+            destino.write(''.join(json.dumps(dict(zip(CAMPOS_EVENTO, e)), ensure_ascii=False) + '\n' for e in lote))
+            destino.flush()
+
+    def encerrar(self):
+        """Grava o que ainda está na fila e fecha o arquivo."""
+        if self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join()
+        print(f"[Eventos] {self.gravados} eventos gravados em '{self.caminho}', {self.repetidos} repetidos ignorados, "
+              f"{self.descartados} descartados por fila cheia.")
+
+
+# --- Consulta ---
+
+def _para_timestamp(momento):
+    """Epoch, datetime ou texto ISO ('2024-05-01 08:00') -> epoch."""
+    if momento is None or isinstance(momento, (int, float)):
+        return momento
+    if isinstance(momento, str):
+        momento = datetime.fromisoformat(momento)
+    return momento.timestamp()
+
+
+def consultar_eventos(caminho=ARQUIVO_EVENTOS, inicio=None, fim=None, tipo=None, rotulo=None, fonte=None, limite=None):
+    """Eventos com inicio <= timestamp < fim (e, opcionalmente, do `tipo`/`rotulo`/`fonte`), em ordem de tempo.
+
+    `inicio` e `fim` aceitam epoch, datetime ou texto ISO. Retorna uma lista de dicts.
+    """
+    inicio, fim = _para_timestamp(inicio), _para_timestamp(fim)
+    filtros = {'tipo': tipo, 'rotulo': rotulo, 'fonte': None if fonte is None else str(fonte)}
+    if _e_jsonl(caminho):
+        eventos = []
+        with open(caminho, encoding='utf-8') as f:
+            for linha in f:
+                evento = json.loads(linha)
+                if inicio is not None and evento['timestamp'] < inicio or fim is not None and evento['timestamp'] >= fim:
+                    continue
+                if any(valor is not None and evento[campo] != valor for campo, valor in filtros.items()):
+                    continue
+                eventos.append(evento)
+        eventos.sort(key=lambda e: e['timestamp'])
+        return eventos[:limite] if limite is not None else eventos
+
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append("timestamp >= ?")
+        parametros.append(inicio)
+    if fim is not None:
+        condicoes.append("timestamp < ?")
+        parametros.append(fim)
+    for campo, valor in filtros.items():
+        if valor is not None:
+            condicoes.append(f"{campo} = ?")
+            parametros.append(valor)
+    sql = f"SELECT {', '.join(CAMPOS_EVENTO)} FROM eventos"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += " ORDER BY timestamp"
+    if limite is not None:
+        sql += f" LIMIT {int(limite)}"
+    conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        return [dict(zip(CAMPOS_EVENTO, linha)) for linha in conexao.execute(sql, parametros)]
+    finally:
+        conexao.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lista os eventos de reconhecimento/detecção de um período.",
+                                     epilog="Ex.: python registro_eventos.py --desde '2024-05-01 08:00' --ate '2024-05-01 18:00' --tipo rosto")
+    parser.add_argument('arquivo', nargs='?', default=ARQUIVO_EVENTOS, help="eventos.db (SQLite) ou .jsonl")
+    parser.add_argument('--desde', help="Início (ISO, ex.: '2024-05-01 08:00')")
+    parser.add_argument('--ate', help="Fim, exclusivo (ISO)")
+    parser.add_argument('--tipo', choices=['rosto', 'carro'])
+    parser.add_argument('--rotulo', help="Nome da pessoa (ou 'Desconhecido', 'Carro')")
+    parser.add_argument('--fonte', help="Câmera ou arquivo de vídeo")
+    parser.add_argument('--limite', type=int)
+    args = parser.parse_args()
+
+    for evento in consultar_eventos(args.arquivo, args.desde, args.ate, args.tipo, args.rotulo, args.fonte, args.limite):
+        evento['hora'] = datetime.fromtimestamp(evento['timestamp']).isoformat(sep=' ', timespec='seconds')
+        print(json.dumps(evento, ensure_ascii=False))
@@ -0,0 +1,120 @@
+import threading
+import time
+from inicializacao import importacao_preguicosa
+from metricas import metricas, desenhar_overlay
+
+cv2 = importacao_preguicosa('cv2')
+Image = importacao_preguicosa('PIL.Image')
+ImageTk = importacao_preguicosa('PIL.ImageTk')
+
+# --- Constantes ---
+FPS_EXIBICAO = 30  # Limite de quadros por segundo na tela (independente do FPS do processamento)
+
+
+class RenderizadorVideo:
+    """Mostra quadros BGR em um `ttk.Label` sem tocar no Tk fora da thread principal.
+
+    `enviar` pode ser chamado de qualquer thread: descarta o quadro se ainda não passou
+    1/`fps_maximo` desde o último aceito e, caso contrário, reduz o quadro uma única vez
+    com `cv2.resize(INTER_AREA)` para caber no label (ou em `tamanho_maximo`) e o deixa
+    pendente. Um laço de `after` na thread do Tk pega o quadro pendente mais recente e o
+    copia (`paste`) para um `PhotoImage` reaproveitado, recriado só se o tamanho mudar.
+    Com o overlay de métricas ligado, as métricas com o prefixo `nome` são desenhadas
+    no quadro já reduzido. O laço termina com `parar` (chamado também quando o label é
+    destruído): os `after` pertencem ao interpretador, não ao widget, e continuariam
+    rodando depois de um Toplevel fechado.
+    """
+
+    def __init__(self, label, fps_maximo=FPS_EXIBICAO, tamanho_maximo=None, nome='video'):
+        self.label = label
+        self.nome = nome
+        self.intervalo = 1.0 / fps_maximo
+        self.tamanho_maximo = tamanho_maximo
+        self.exibidos = 0
+        self.descartados = 0
+
+        self._trava = threading.Lock()
+        self._pendente = None
+        self._ultimo_aceito = 0.0
+        self._pausado = False
+        self._foto = None
+        self._tamanho_label = None  # Atualizado pelo <Configure>, lido pelas threads de vídeo
+        self._parado = False
+        if tamanho_maximo is None:
+            self.label.bind('<Configure>', self._ao_redimensionar, add='+')
+        self.label.bind('<Destroy>', lambda evento: self.parar(), add='+')
+        self._agendamento = self.label.after(int(self.intervalo * 1000), self._desenhar)
+
+    def _ao_redimensionar(self, evento):
+        self._tamanho_label = (evento.width, evento.height)
+
+    def _limite(self):
+        return self.tamanho_maximo if self.tamanho_maximo is not None else self._tamanho_label
+
+    def enviar(self, frame):
+        """Agenda a exibição de um quadro BGR. Retorna False se foi descartado pelo limite de FPS."""
+        agora = time.perf_counter()
+        if self._pausado or agora - self._ultimo_aceito < self.intervalo:
+            self.descartados += 1
+            metricas.contar(f"{self.nome}.exibicao_descartados")
+            return False
+        self._ultimo_aceito = agora
+
+        altura, largura = frame.shape[:2]
+        limite = self._limite()
+        if limite is not None and limite[0] > 1 and limite[1] > 1 and (largura > limite[0] or altura > limite[1]):
+            # Reduz mantendo a proporção, como o thumbnail fazia
+            fator = min(limite[0] / largura, limite[1] / altura)
+            frame = cv2.resize(frame, (max(1, int(largura * fator)), max(1, int(altura * fator))), interpolation=cv2.INTER_AREA)
+        if metricas.overlay:
+            desenhar_overlay(frame, self.nome)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        with self._trava:
+            if self._pendente is not None:
+                self.descartados += 1  # A tela não acompanhou; vale o quadro mais novo
+                metricas.contar(f"{self.nome}.exibicao_descartados")
+            self._pendente = rgb
+        return True
+
+    def _desenhar(self):
+        if self._parado:
+            return
+        with self._trava:
+            rgb, self._pendente = self._pendente, None
+        if rgb is not None and not self._pausado:
+            inicio = time.perf_counter()
+            imagem = Image.fromarray(rgb)
+            if self._foto is None or (self._foto.width(), self._foto.height()) != imagem.size:
+                self._foto = ImageTk.PhotoImage('RGB', imagem.size)
+                self.label.config(image=self._foto, text="")
+                self.label.image = self._foto  # Mantém a referência
+            self._foto.paste(imagem)
+            self.exibidos += 1
+            metricas.registrar(f"{self.nome}.tk", time.perf_counter() - inicio)
+            metricas.marcar(f"{self.nome}.tela")
+        self._agendamento = self.label.after(int(self.intervalo * 1000), self._desenhar)
+
+    def parar(self):
+        """Encerra o laço de desenho de vez (ex.: ao fechar a janela). Thread do Tk."""
+        if self._parado:
+            return
+        self._parado = True
+        with self._trava:
+            self._pendente = None
+        try:
+            self.label.after_cancel(self._agendamento)
+        except Exception:
+            pass  # Interpretador já destruído
+
+    def limpar(self, texto=""):
+        """Para de exibir quadros (até `retomar`) e volta o label para só texto. Thread do Tk."""
+        self._pausado = True
+        with self._trava:
+            self._pendente = None
+        self._foto = None
+        self.label.config(image='', text=texto)
+        self.label.image = None
+
+    def retomar(self):
+        self._pausado = False
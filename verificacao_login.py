@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from inicializacao import importacao_preguicosa
+from metricas import metricas
+
+cv2 = importacao_preguicosa('cv2')
+face_recognition = importacao_preguicosa('face_recognition')
+
+# --- Constantes ---
+TOLERANCIA = 0.6
+TEMPO_LIMITE = 5.0       # Segundos até negar o acesso
+FRACAO_ROI = 0.6         # Lado da região central (fração do quadro) onde o rosto é procurado
+ESCALA_ROI = 0.4         # Redução da região central antes do HOG (menos pixels que 0.25 do quadro inteiro)
+JANELA_VOTOS = 5         # Últimos quadros com rosto que participam da votação
+LIMIAR_CONFIANCA = 0.6   # Fração da janela que precisa apontar a mesma pessoa (3 de 5)
+
+
+def regiao_central(altura, largura, fracao=FRACAO_ROI):
+    """Caixa (x1, y1, x2, y2) centrada no quadro, com `fracao` da largura e da altura."""
+    margem_x, margem_y = int(largura * (1 - fracao) / 2), int(altura * (1 - fracao) / 2)
+    return margem_x, margem_y, largura - margem_x, altura - margem_y
+
+
+def maior_rosto(locations):
+    """O rosto de maior área (o de quem está na frente da câmera)."""
+    return max(locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+
+
+class VerificadorLogin:
+    """Decide uma tentativa de login votando ao longo de vários quadros.
+
+    Em cada quadro procura rostos só na região central, codifica apenas o maior e vota
+    na pessoa mais próxima da galeria (ou em "desconhecido", acima da `tolerancia`).
+    A tentativa é aprovada assim que a mesma pessoa tem `limiar_confianca` dos votos da
+    janela deslizante, sem esperar o tempo limite; um quadro ruim isolado não aprova nem
+    derruba ninguém. `processar` roda na thread do pipeline; `decisao`, `esgotado` e
+    `encerrar_por_tempo` podem ser chamados da thread do Tk.
+    """
+
+    def __init__(self, comparador, tolerancia=TOLERANCIA, tempo_limite=TEMPO_LIMITE, janela=JANELA_VOTOS,
+                 limiar_confianca=LIMIAR_CONFIANCA, fracao_roi=FRACAO_ROI, escala=ESCALA_ROI):
+        self.comparador = comparador
+        self.tolerancia = tolerancia
+        self.tempo_limite = tempo_limite
+        self.janela = janela
+        self.limiar_confianca = limiar_confianca
+        self.fracao_roi = fracao_roi
+        self.escala = escala
+        self._trava = threading.RLock()  # Protege os votos e a decisão; _decidir roda com ela já tomada
+        self.iniciar()
+
+    def iniciar(self):
+        """Começa uma tentativa nova (zera os votos e o relógio da latência)."""
+        with self._trava:
+            self._votos = deque(maxlen=self.janela)
+            self.quadros = 0
+            self.decisao = None
+            self.inicio = time.perf_counter()
+
+    def esgotado(self):
+        return self.tempo_limite is not None and time.perf_counter() - self.inicio > self.tempo_limite
+
+    def votar(self, frame):
+        """(índice ou -1, distância) do maior rosto na região central, ou None se não há rosto."""
+        x1, y1, x2, y2 = regiao_central(*frame.shape[:2], self.fracao_roi)
+        with metricas.medir('login.redimensionar'):
+            regiao = cv2.resize(frame[y1:y2, x1:x2], (0, 0), fx=self.escala, fy=self.escala)
+            rgb = cv2.cvtColor(regiao, cv2.COLOR_BGR2RGB)
+        with metricas.medir('login.hog'):
+            locations = face_recognition.face_locations(rgb)
+        if not locations:
+            return None
+        with metricas.medir('login.codificacao_dlib'):
+            encodings = face_recognition.face_encodings(rgb, [maior_rosto(locations)])
+        with metricas.medir('login.comparacao'):
+            indices, distancias = self.comparador.melhores(encodings)
+        distancia = float(distancias[0])
+        return (int(indices[0]) if distancia <= self.tolerancia else -1), distancia
+
+    def lider(self):
+        """Pessoa com mais votos na janela: (índice, fração dos votos, distância média), ou (-1, 0, inf).
+
+        Chame com `_trava` tomada: a thread do pipeline anexa votos enquanto a do Tk pode encerrar.
+        """
+        por_pessoa = {}
+        for indice, distancia in self._votos:
+            if indice >= 0:
+                por_pessoa.setdefault(indice, []).append(distancia)
+        if not por_pessoa:
+            return -1, 0.0, float('inf')
+        # Empate em votos: vence a menor distância média
+        indice = max(por_pessoa, key=lambda i: (len(por_pessoa[i]), -sum(por_pessoa[i]) / len(por_pessoa[i])))
+        distancias = por_pessoa[indice]
+        return indice, len(distancias) / self.janela, sum(distancias) / len(distancias)
+
+    def processar(self, frame):
+        """Vota com um quadro. Retorna a decisão quando ela sai; None enquanto a tentativa continua."""
+        if self.decisao is not None or self.esgotado():
+            return self.decisao
+        self.quadros += 1
+        voto = self.votar(frame)
+        if voto is None:
+            return None
+        with self._trava:
+            self._votos.append(voto)
+            indice, confianca, distancia = self.lider()
+            if indice >= 0 and confianca >= self.limiar_confianca:
+                return self._decidir(indice, confianca, distancia)
+        return None
+
+    def encerrar_por_tempo(self):
+        """Nega a tentativa (a menos que a aprovação tenha acabado de sair) e retorna a decisão."""
+        with self._trava:
+            _, confianca, distancia = self.lider()
+            return self._decidir(-1, confianca, distancia)
+
+    def _decidir(self, indice, confianca, distancia):
+        with self._trava:
+            if self.decisao is not None:
+                return self.decisao  # A thread do pipeline e a do Tk decidiram ao mesmo tempo
+            latencia = time.perf_counter() - self.inicio
+            metricas.registrar('login.decisao', latencia)
+            self.decisao = {
+                'aprovado': indice >= 0,
+                'indice': indice,
+                'confianca': round(confianca, 3),
+                'distancia': round(distancia, 4),
+                'quadros': self.quadros,
+                'latencia_ms': round(latencia * 1000, 1),
+            }
+        print(f"[Login] {'Aprovado' if indice >= 0 else 'Negado'} em {latencia * 1000:.0f} ms "
+              f"({self.quadros} quadros, confiança {confianca:.2f})")
+        return self.decisao